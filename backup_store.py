@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+SD-WAN Content-Addressed Backup Store
+=====================================
+
+Deduplicated storage for configuration backups. Every file is stored
+once under its BLAKE2b hash, and each dated run becomes a small run
+manifest that points at those objects. It provides:
+- snapshot: store a run directory, copying only objects not seen before
+- Optional hard-linking of the run directory onto the stored objects
+- verify, restore and garbage collection of unreferenced objects
+
+The store lives next to the dated directories, e.g. backups/.store with
+objects/ and runs/ sub-directories. The file hashes of each snapshotted
+directory are cached under manifests/, never beside the data.
+
+Author: SD-WAN Automation Team
+Version: 1.0
+"""
+
+import os
+import sys
+import json
+import shutil
+import hashlib
+import argparse
+from datetime import datetime
+from file_manifest import HASH_ALGORITHM, hash_file, load_manifest, save_manifest, build_manifest
+
+class Colors:
+    """Color codes for terminal output"""
+    GREEN = '\033[92m'
+    RED = '\033[91m'
+    YELLOW = '\033[93m'
+    BLUE = '\033[94m'
+    CYAN = '\033[96m'
+    WHITE = '\033[97m'
+    BOLD = '\033[1m'
+    END = '\033[0m'
+
+STORE_DIR_NAME = '.store'
+RUN_VERSION = 1
+
+def store_for(run_dir):
+    """Return the store path shared by the dated directories next to run_dir"""
+    return os.path.join(os.path.dirname(os.path.normpath(run_dir)), STORE_DIR_NAME)
+
+class BackupStore:
+    def __init__(self, root):
+        self.root = root
+        self.objects_dir = os.path.join(root, 'objects')
+        self.runs_dir = os.path.join(root, 'runs')
+        self.manifests_dir = os.path.join(root, 'manifests')
+
+    def object_path(self, digest):
+        """Return the object file for a content hash"""
+        return os.path.join(self.objects_dir, digest[:2], digest)
+
+    def run_path(self, name):
+        """Return the run manifest path for a run name"""
+        return os.path.join(self.runs_dir, f"{name}.json")
+
+    def manifest_path(self, run_dir):
+        """Return the cached file manifest path for a source directory"""
+        source = os.path.abspath(run_dir).encode()
+        return os.path.join(self.manifests_dir, f"{hashlib.blake2b(source, digest_size=8).hexdigest()}.json")
+
+    def put(self, path, digest, link=False):
+        """Store a file under its hash; returns True if the object was new"""
+        dest = self.object_path(digest)
+        created = False
+        if not os.path.exists(dest):
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            tmp_path = f"{dest}.{os.getpid()}.tmp"
+            shutil.copyfile(path, tmp_path)
+            os.chmod(tmp_path, 0o444)
+            os.replace(tmp_path, dest)
+            created = True
+
+        # Point the run directory at the shared object so identical files use one inode
+        if link and not os.path.samefile(path, dest):
+            tmp_link = f"{path}.link.tmp"
+            try:
+                os.link(dest, tmp_link)
+                os.replace(tmp_link, path)
+            except OSError:
+                if os.path.exists(tmp_link):
+                    os.remove(tmp_link)
+        return created
+
+    def snapshot(self, run_dir, name=None, include=None, link=False, workers=None):
+        """Store the (included) files of run_dir and write its run manifest"""
+        name = name or os.path.basename(os.path.normpath(run_dir))
+        # Reuse hashes from the last snapshot of this directory, or from its post-check manifest
+        manifest_path = self.manifest_path(run_dir)
+        previous = load_manifest(run_dir, path=manifest_path) or load_manifest(run_dir)
+        manifest, changes = build_manifest(run_dir, previous=previous, workers=workers, include=include)
+
+        files = {}
+        stats = {'files': 0, 'bytes': 0, 'new_objects': 0, 'new_bytes': 0, 'errors': list(changes['errors'])}
+        for relpath, (size, _, digest) in sorted(manifest['files'].items()):
+            path = os.path.join(run_dir, relpath)
+            try:
+                if self.put(path, digest, link=link):
+                    stats['new_objects'] += 1
+                    stats['new_bytes'] += size
+                if link:
+                    # Linking changes the mtime but not the content, so keep the hash
+                    manifest['files'][relpath] = [size, os.stat(path).st_mtime_ns, digest]
+            except OSError as e:
+                stats['errors'].append(f"{relpath}: {str(e)}")
+                continue
+            files[relpath] = [size, digest]
+            stats['files'] += 1
+            stats['bytes'] += size
+
+        os.makedirs(self.manifests_dir, exist_ok=True)
+        save_manifest(run_dir, manifest, path=manifest_path)
+
+        run = {
+            'version': RUN_VERSION,
+            'algorithm': HASH_ALGORITHM,
+            'name': name,
+            'source': os.path.normpath(run_dir),
+            'created': datetime.now().isoformat(),
+            'files': files,
+            'stats': stats
+        }
+        os.makedirs(self.runs_dir, exist_ok=True)
+        path = self.run_path(name)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(run, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, path)
+        return run
+
+    def load_run(self, name):
+        """Load a run manifest, or None if the run is unknown"""
+        try:
+            with open(self.run_path(name), 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def runs(self):
+        """List run names, oldest first"""
+        if not os.path.isdir(self.runs_dir):
+            return []
+        return sorted(n[:-5] for n in os.listdir(self.runs_dir) if n.endswith('.json'))
+
+    def verify(self, name, deep=False):
+        """Check every object of a run exists with its size (and hash when deep)"""
+        run = self.load_run(name)
+        if run is None:
+            return None
+        result = {'files': len(run['files']), 'missing': [], 'corrupt': []}
+        for relpath, (size, digest) in run['files'].items():
+            path = self.object_path(digest)
+            try:
+                if os.path.getsize(path) != size or (deep and hash_file(path) != digest):
+                    result['corrupt'].append(relpath)
+            except OSError:
+                result['missing'].append(relpath)
+        return result
+
+    def restore(self, name, dest):
+        """Recreate a run directory from the store"""
+        run = self.load_run(name)
+        if run is None:
+            raise ValueError(f"Unknown run '{name}'")
+        for relpath, (_, digest) in run['files'].items():
+            target = os.path.join(dest, relpath)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copyfile(self.object_path(digest), target)
+        return len(run['files'])
+
+    def gc(self):
+        """Delete objects no run references; returns (objects, bytes) removed"""
+        referenced = set()
+        for name in self.runs():
+            run = self.load_run(name)
+            if run:
+                referenced.update(digest for _, digest in run['files'].values())
+
+        removed = freed = 0
+        if not os.path.isdir(self.objects_dir):
+            return removed, freed
+        for prefix in os.listdir(self.objects_dir):
+            prefix_dir = os.path.join(self.objects_dir, prefix)
+            for digest in os.listdir(prefix_dir):
+                if digest not in referenced:
+                    path = os.path.join(prefix_dir, digest)
+                    freed += os.path.getsize(path)
+                    os.remove(path)
+                    removed += 1
+        return removed, freed
+
+def format_size(size_bytes):
+    """Format a byte count for display"""
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if size_bytes < 1024.0:
+            return f"{size_bytes:.1f} {unit}"
+        size_bytes /= 1024.0
+    return f"{size_bytes:.1f} TB"
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='SD-WAN Content-Addressed Backup Store')
+    parser.add_argument('--store', help='Store directory (default: .store next to the run directory)')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    snapshot_parser = subparsers.add_parser('snapshot', help='Store a run directory')
+    snapshot_parser.add_argument('run_dir')
+    snapshot_parser.add_argument('--name', help='Run name (default: directory name)')
+    snapshot_parser.add_argument('--include', action='append',
+                                help='Only store files whose name matches this pattern (repeatable)')
+    snapshot_parser.add_argument('--link', action='store_true',
+                                help='Hard-link the run files onto the stored objects to reclaim space')
+
+    verify_parser = subparsers.add_parser('verify', help='Check a run against the store')
+    verify_parser.add_argument('run_dir')
+    verify_parser.add_argument('--name')
+    verify_parser.add_argument('--deep', action='store_true', help='Re-hash every object')
+
+    restore_parser = subparsers.add_parser('restore', help='Recreate a run directory')
+    restore_parser.add_argument('name')
+    restore_parser.add_argument('dest')
+
+    subparsers.add_parser('gc', help='Remove objects no run references')
+
+    try:
+        args = parser.parse_args()
+        if args.command in ('snapshot', 'verify'):
+            store = BackupStore(args.store or store_for(args.run_dir))
+            name = args.name or os.path.basename(os.path.normpath(args.run_dir))
+        elif not args.store:
+            parser.error('--store is required for this command')
+        else:
+            store = BackupStore(args.store)
+
+        if args.command == 'snapshot':
+            run = store.snapshot(args.run_dir, name=name, include=args.include, link=args.link)
+            stats = run['stats']
+            color = Colors.GREEN if not stats['errors'] else Colors.YELLOW
+            print(f"{color}Run '{name}': {stats['files']} files ({format_size(stats['bytes'])}), "
+                  f"{stats['new_objects']} new objects ({format_size(stats['new_bytes'])}){Colors.END}")
+            for error in stats['errors'][:5]:
+                print(f"  {Colors.RED}• {error}{Colors.END}")
+            sys.exit(0 if not stats['errors'] else 1)
+        elif args.command == 'verify':
+            result = store.verify(name, deep=args.deep)
+            if result is None:
+                print(f"{Colors.RED}No run '{name}' in {store.root}{Colors.END}")
+                sys.exit(1)
+            ok = not result['missing'] and not result['corrupt']
+            color = Colors.GREEN if ok else Colors.RED
+            print(f"{color}{result['files']} objects, {len(result['missing'])} missing, "
+                  f"{len(result['corrupt'])} corrupt{Colors.END}")
+            sys.exit(0 if ok else 1)
+        elif args.command == 'restore':
+            print(f"Restored {store.restore(args.name, args.dest)} files to {args.dest}")
+        elif args.command == 'gc':
+            removed, freed = store.gc()
+            print(f"Removed {removed} unreferenced objects ({format_size(freed)})")
+
+    except KeyboardInterrupt:
+        sys.exit(1)
+    except (ValueError, OSError) as e:
+        print(f"{Colors.RED}Error: {str(e)}{Colors.END}", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
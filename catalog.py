@@ -0,0 +1,463 @@
+#!/usr/bin/env python3
+"""
+SD-WAN Artifact Catalog
+=======================
+
+Persistent SQLite index over generated/, backups/ and lists/, updated by
+every collector and backup run, so lookups no longer walk directory trees.
+It records:
+- Runs (collect_all, per-device queries, event harvests, sastre backups and lists)
+- Artifacts per run with use case, dataset, size and newest record time
+- Which devices (system-ip and hostname) each artifact holds data for
+- The dated backup/list directories, refreshed only when a parent changes
+- Where each playbook lives in the project
+
+Queries such as "when did device 10.1.1.1 last report BFD?" are index lookups:
+    python3 catalog.py last 10.1.1.1 --dataset bfd
+
+Set SDWAN_CATALOG=off to stop collectors from updating it.
+
+Author: SD-WAN Automation Team
+Version: 1.0
+"""
+
+import os
+import re
+import sys
+import time
+import sqlite3
+import argparse
+import threading
+from datetime import datetime
+from compressed_io import CODEC_EXTENSIONS, plain_name
+from stats_store import (DEVICE_FIELDS, HOSTNAME_FIELDS, TIME_FIELDS, SKIPPED_SUFFIXES, dataset_for, numeric,
+                         iter_records, format_ms)
+
+class Colors:
+    """Color codes for terminal output"""
+    GREEN = '\033[92m'
+    RED = '\033[91m'
+    YELLOW = '\033[93m'
+    BLUE = '\033[94m'
+    CYAN = '\033[96m'
+    WHITE = '\033[97m'
+    BOLD = '\033[1m'
+    END = '\033[0m'
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'generated', 'catalog.sqlite')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    path TEXT NOT NULL,
+    started_ms INTEGER NOT NULL,
+    finished_ms INTEGER,
+    status TEXT,
+    files INTEGER NOT NULL DEFAULT 0,
+    bytes INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS artifacts (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    path TEXT NOT NULL UNIQUE,
+    use_case TEXT,
+    dataset TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    ts_ms INTEGER NOT NULL,
+    records INTEGER
+);
+CREATE TABLE IF NOT EXISTS artifact_devices (
+    artifact_id INTEGER NOT NULL REFERENCES artifacts(id) ON DELETE CASCADE,
+    device TEXT NOT NULL,
+    hostname TEXT,
+    dataset TEXT NOT NULL,
+    ts_ms INTEGER NOT NULL,
+    records INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS dir_scans (
+    base TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS dated_dirs (
+    base TEXT NOT NULL,
+    name TEXT NOT NULL,
+    day TEXT NOT NULL,
+    PRIMARY KEY (base, name)
+);
+CREATE TABLE IF NOT EXISTS playbooks (
+    path TEXT PRIMARY KEY,
+    root TEXT NOT NULL,
+    name TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_runs_kind ON runs (kind, started_ms);
+CREATE INDEX IF NOT EXISTS idx_runs_path ON runs (path);
+CREATE INDEX IF NOT EXISTS idx_artifacts_run ON artifacts (run_id);
+CREATE INDEX IF NOT EXISTS idx_artifacts_dataset ON artifacts (use_case, dataset, ts_ms);
+CREATE INDEX IF NOT EXISTS idx_devices_device ON artifact_devices (device, dataset, ts_ms);
+CREATE INDEX IF NOT EXISTS idx_devices_hostname ON artifact_devices (hostname, dataset, ts_ms);
+CREATE INDEX IF NOT EXISTS idx_devices_artifact ON artifact_devices (artifact_id);
+CREATE INDEX IF NOT EXISTS idx_dated_dirs_day ON dated_dirs (day);
+CREATE INDEX IF NOT EXISTS idx_playbooks_name ON playbooks (root, name);
+"""
+
+# Events name the device differently from the statistics endpoints
+CATALOG_DEVICE_FIELDS = DEVICE_FIELDS + ('system_ip',)
+CATALOG_HOSTNAME_FIELDS = HOSTNAME_FIELDS + ('host_name',)
+PLAYBOOK_EXTENSIONS = ('.yml', '.yaml')
+# Event window files are named events_<start>_<end>; they are all one dataset
+WINDOW_SUFFIX_RE = re.compile(r'_\d+_\d+$')
+
+def now_ms():
+    return int(time.time() * 1000)
+
+class DeviceTally:
+    """Per-device record counts and newest record time for one artifact"""
+
+    def __init__(self, fallback_ms=None):
+        self.fallback_ms = fallback_ms or now_ms()
+        self.devices = {}
+        self.records = 0
+
+    def add(self, record):
+        if not isinstance(record, dict):
+            return
+        self.records += 1
+        device = next((str(record[f]) for f in CATALOG_DEVICE_FIELDS if record.get(f)), None)
+        if device is None:
+            return
+        ts_ms = next((int(numeric(record[f])) for f in TIME_FIELDS if numeric(record.get(f)) is not None),
+                     self.fallback_ms)
+        entry = self.devices.setdefault(device, [None, 0, 0])
+        entry[0] = entry[0] or next((str(record[f]) for f in CATALOG_HOSTNAME_FIELDS if record.get(f)), None)
+        entry[1] += 1
+        entry[2] = max(entry[2], ts_ms)
+
+    def update(self, records):
+        for record in records:
+            self.add(record)
+        return self
+
+    def newest_ms(self):
+        return max((entry[2] for entry in self.devices.values()), default=self.fallback_ms)
+
+def dataset_of(path):
+    """Name the dataset of a file, folding per-device and per-window files onto one name"""
+    return WINDOW_SUFFIX_RE.sub('', dataset_for(plain_name(path)))
+
+def variants_of(path):
+    """Return a file's plain and compressed names"""
+    plain = plain_name(path)
+    return [plain] + [plain + extension for extension in CODEC_EXTENSIONS.values()]
+
+def records_of(data):
+    """Return the data[] records of a decoded API response"""
+    if isinstance(data, dict):
+        records = data.get('data', [])
+        return records if isinstance(records, list) else []
+    return data if isinstance(data, list) else []
+
+class RunRecorder:
+    """Collects a run's artifacts in memory (thread-safe); the catalog stores them when the run ends"""
+
+    def __init__(self, name, kind, path):
+        self.name = name
+        self.kind = kind
+        self.path = os.path.abspath(path)
+        self.started_ms = now_ms()
+        self.artifacts = []
+        self._lock = threading.Lock()
+
+    def add(self, path, data=None, tally=None, use_case=None, device=None, hostname=None):
+        """Record one written file; devices come from data, a DeviceTally, or device/hostname"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return
+        tally = tally or DeviceTally(stat.st_mtime_ns // 1_000_000).update(records_of(data))
+        if device and device not in tally.devices:
+            tally.devices[device] = [hostname, tally.records, tally.newest_ms()]
+        artifact = {
+            'path': os.path.abspath(path),
+            'use_case': use_case or os.path.basename(os.path.dirname(os.path.abspath(path))),
+            'dataset': dataset_of(path),
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'ts_ms': tally.newest_ms(),
+            'records': tally.records if (data is not None or tally.records) else None,
+            'devices': tally.devices
+        }
+        with self._lock:
+            self.artifacts.append(artifact)
+
+class Catalog:
+    def __init__(self, db_path=DEFAULT_DB_PATH):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        # Several collectors may finish at once; wait for the writer lock rather than fail
+        self.conn = sqlite3.connect(db_path, timeout=30)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA foreign_keys=ON')
+        self.conn.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Close the database connection"""
+        self.conn.close()
+
+    def begin_run(self, name, kind, path):
+        """Start recording a run"""
+        return RunRecorder(name, kind, path)
+
+    def finish_run(self, run, status='ok'):
+        """Store a run and its artifacts in one transaction; returns the run id"""
+        with self.conn:
+            cursor = self.conn.execute(
+                'INSERT INTO runs (name, kind, path, started_ms, finished_ms, status, files, bytes) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (run.name, run.kind, run.path, run.started_ms, now_ms(), status,
+                 len(run.artifacts), sum(a['size'] for a in run.artifacts)))
+            run_id = cursor.lastrowid
+            for artifact in run.artifacts:
+                # A rewritten file, possibly with other compression, now belongs to the newer run
+                variants = variants_of(artifact['path'])
+                self.conn.execute(f"DELETE FROM artifacts WHERE path IN ({', '.join('?' * len(variants))})", variants)
+                artifact_id = self.conn.execute(
+                    'INSERT INTO artifacts (run_id, path, use_case, dataset, size, mtime_ns, ts_ms, records) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                    (run_id, artifact['path'], artifact['use_case'], artifact['dataset'], artifact['size'],
+                     artifact['mtime_ns'], artifact['ts_ms'], artifact['records'])).lastrowid
+                self.conn.executemany(
+                    'INSERT INTO artifact_devices (artifact_id, device, hostname, dataset, ts_ms, records) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    [(artifact_id, device, hostname, artifact['dataset'], ts_ms, records)
+                     for device, (hostname, records, ts_ms) in artifact['devices'].items()])
+        return run_id
+
+    def has_run(self, path):
+        """Return True when a run for this directory is already catalogued"""
+        return self.conn.execute('SELECT 1 FROM runs WHERE path = ? LIMIT 1',
+                                 (os.path.abspath(path),)).fetchone() is not None
+
+    def index_directory(self, path, kind, name=None, parse=True):
+        """Catalogue an existing directory as one run, reading JSON files for their devices"""
+        run = self.begin_run(name or os.path.basename(os.path.normpath(path)), kind, path)
+        for root, _, files in os.walk(path):
+            for file in sorted(files):
+                filepath = os.path.join(root, file)
+                stem = plain_name(file)
+                if stem.endswith(SKIPPED_SUFFIXES) or stem.endswith('.tmp'):
+                    continue
+                tally = None
+                if parse and stem.endswith(('.json', '.ndjson')):
+                    try:
+                        tally = DeviceTally(os.stat(filepath).st_mtime_ns // 1_000_000).update(iter_records(filepath))
+                    except (ValueError, OSError):
+                        tally = None
+                run.add(filepath, tally=tally)
+        self.finish_run(run)
+        return run
+
+    def sync_dated_dirs(self, base):
+        """Refresh the YYYY-MM-DD sub-directories of base, but only if base changed since the last look"""
+        key = os.path.abspath(base)
+        try:
+            mtime_ns = os.stat(base).st_mtime_ns
+        except OSError:
+            return
+        row = self.conn.execute('SELECT mtime_ns FROM dir_scans WHERE base = ?', (key,)).fetchone()
+        if row and row[0] == mtime_ns:
+            return
+
+        dated = []
+        for item in os.listdir(base):
+            try:
+                day = datetime.strptime(item, '%Y-%m-%d').strftime('%Y-%m-%d')
+            except ValueError:
+                continue
+            if os.path.isdir(os.path.join(base, item)):
+                dated.append((key, item, day))
+        with self.conn:
+            self.conn.execute('DELETE FROM dated_dirs WHERE base = ?', (key,))
+            self.conn.executemany('INSERT INTO dated_dirs (base, name, day) VALUES (?, ?, ?)', dated)
+            self.conn.execute('INSERT OR REPLACE INTO dir_scans (base, mtime_ns) VALUES (?, ?)', (key, mtime_ns))
+
+    def latest_dated_dir(self, bases):
+        """Return the newest YYYY-MM-DD directory under any of bases, or None"""
+        keys = {}
+        for base in bases:
+            self.sync_dated_dirs(base)
+            keys.setdefault(os.path.abspath(base), base)
+        if not keys:
+            return None
+        placeholders = ', '.join('?' * len(keys))
+        # On the same day the base listed first wins, as with the directory scan
+        ranks = ' '.join(f"WHEN ? THEN {rank}" for rank in range(len(keys)))
+        row = self.conn.execute(f"SELECT base, name FROM dated_dirs WHERE base IN ({placeholders}) "
+                                f"ORDER BY day DESC, CASE base {ranks} END LIMIT 1",
+                                list(keys) * 2).fetchone()
+        return os.path.join(keys[row[0]], row[1]) if row else None
+
+    def index_playbooks(self, root):
+        """Record every playbook under root in one walk"""
+        key = os.path.abspath(root)
+        found = []
+        for current, dirs, files in os.walk(key):
+            dirs[:] = [d for d in dirs if not d.startswith('.') and d not in ('generated', 'backups', 'lists')]
+            found.extend((os.path.join(current, f), key, f) for f in files if f.endswith(PLAYBOOK_EXTENSIONS))
+        with self.conn:
+            self.conn.execute('DELETE FROM playbooks WHERE root = ?', (key,))
+            self.conn.executemany('INSERT OR REPLACE INTO playbooks (path, root, name) VALUES (?, ?, ?)', found)
+        return len(found)
+
+    def find_playbook(self, name, root):
+        """Return the path of a playbook under root, re-indexing only when the catalog is stale"""
+        key = os.path.abspath(root)
+        for attempt in range(2):
+            rows = self.conn.execute('SELECT path FROM playbooks WHERE root = ? AND name = ? ORDER BY length(path)',
+                                     (key, name)).fetchall()
+            for (path,) in rows:
+                if os.path.isfile(path):
+                    return path
+            if attempt == 0:
+                self.index_playbooks(root)
+        return None
+
+    def last_seen(self, device, dataset=None, limit=1):
+        """Newest artifacts holding data for a device (system-ip or hostname)"""
+        query = ('SELECT d.device, d.hostname, d.dataset, d.ts_ms, d.records, a.path, r.name '
+                 'FROM artifact_devices d JOIN artifacts a ON a.id = d.artifact_id JOIN runs r ON r.id = a.run_id '
+                 'WHERE (d.device = ? OR d.hostname = ?)')
+        params = [device, device]
+        if dataset:
+            query += ' AND d.dataset LIKE ?'
+            params.append(f"%{dataset}%")
+        query += ' ORDER BY d.ts_ms DESC LIMIT ?'
+        params.append(limit)
+        return self.conn.execute(query, params).fetchall()
+
+    def runs(self, kind=None, limit=20):
+        """Most recent runs, newest first"""
+        query = 'SELECT name, kind, path, started_ms, finished_ms, status, files, bytes FROM runs'
+        params = []
+        if kind:
+            query += ' WHERE kind = ?'
+            params.append(kind)
+        query += ' ORDER BY started_ms DESC LIMIT ?'
+        params.append(limit)
+        return self.conn.execute(query, params).fetchall()
+
+    def artifacts(self, run=None, use_case=None, dataset=None, limit=50):
+        """Artifacts of a run or use case, newest first"""
+        query = ('SELECT a.path, a.use_case, a.dataset, a.size, a.ts_ms, a.records, r.name '
+                 'FROM artifacts a JOIN runs r ON r.id = a.run_id WHERE 1 = 1')
+        params = []
+        if run:
+            query += ' AND r.name = ?'
+            params.append(run)
+        if use_case:
+            query += ' AND a.use_case = ?'
+            params.append(use_case)
+        if dataset:
+            query += ' AND a.dataset LIKE ?'
+            params.append(f"%{dataset}%")
+        query += ' ORDER BY a.ts_ms DESC LIMIT ?'
+        params.append(limit)
+        return self.conn.execute(query, params).fetchall()
+
+    def prune(self):
+        """Forget artifacts whose files no longer exist; returns the number removed"""
+        missing = [(artifact_id,) for artifact_id, path in self.conn.execute('SELECT id, path FROM artifacts')
+                   if not os.path.exists(path)]
+        with self.conn:
+            self.conn.executemany('DELETE FROM artifacts WHERE id = ?', missing)
+        return len(missing)
+
+def open_catalog(db_path=None):
+    """Open the catalog unless SDWAN_CATALOG=off; returns None when disabled or unusable"""
+    if os.environ.get('SDWAN_CATALOG', '').strip().lower() in ('0', 'off', 'false', 'no'):
+        return None
+    try:
+        return Catalog(db_path or os.environ.get('SDWAN_CATALOG_DB', DEFAULT_DB_PATH))
+    except (sqlite3.Error, OSError):
+        return None
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='SD-WAN Artifact Catalog')
+    parser.add_argument('--db', default=os.environ.get('SDWAN_CATALOG_DB', DEFAULT_DB_PATH),
+                       help='SQLite catalog path (default: generated/catalog.sqlite)')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    last_parser = subparsers.add_parser('last', help='When a device last reported data')
+    last_parser.add_argument('device', help='System IP, device id or hostname')
+    last_parser.add_argument('--dataset', help='Dataset name or part of it, e.g. bfd')
+    last_parser.add_argument('--limit', type=int, default=1)
+
+    runs_parser = subparsers.add_parser('runs', help='Most recent runs')
+    runs_parser.add_argument('--kind', help='collect, events, backup, list or device_<query>')
+    runs_parser.add_argument('--limit', type=int, default=20)
+
+    artifacts_parser = subparsers.add_parser('artifacts', help='Artifacts of a run or use case')
+    artifacts_parser.add_argument('--run')
+    artifacts_parser.add_argument('--use-case')
+    artifacts_parser.add_argument('--dataset')
+    artifacts_parser.add_argument('--limit', type=int, default=50)
+
+    index_parser = subparsers.add_parser('index', help='Catalogue an existing directory as a run')
+    index_parser.add_argument('path')
+    index_parser.add_argument('--kind', required=True, help='Run kind, e.g. backup, list or collect')
+    index_parser.add_argument('--name', help='Run name (default: directory name)')
+    index_parser.add_argument('--no-parse', action='store_true', help='Do not read JSON files for devices')
+
+    playbook_parser = subparsers.add_parser('playbook', help='Locate a playbook')
+    playbook_parser.add_argument('name')
+    playbook_parser.add_argument('--root', default='.')
+
+    subparsers.add_parser('prune', help='Forget artifacts whose files were deleted')
+
+    try:
+        args = parser.parse_args()
+        with Catalog(args.db) as catalog:
+            if args.command == 'last':
+                rows = catalog.last_seen(args.device, args.dataset, args.limit)
+                if not rows:
+                    print(f"{Colors.YELLOW}No data for {args.device}{Colors.END}")
+                    sys.exit(1)
+                for device, hostname, dataset, ts_ms, records, path, run in rows:
+                    print(f"{format_ms(ts_ms)}  {hostname or device:<20} {dataset:<24} {records:>6} records  {path} ({run})")
+            elif args.command == 'runs':
+                for name, kind, path, started_ms, finished_ms, status, files, size in catalog.runs(args.kind, args.limit):
+                    print(f"{format_ms(started_ms)}  {kind:<18} {name:<32} {files:>6} files {size:>12} bytes  {status}")
+            elif args.command == 'artifacts':
+                for path, use_case, dataset, size, ts_ms, records, run in catalog.artifacts(
+                        args.run, args.use_case, args.dataset, args.limit):
+                    print(f"{format_ms(ts_ms)}  {use_case or '-':<22} {dataset:<26} {size:>10}  {path}")
+            elif args.command == 'index':
+                run = catalog.index_directory(args.path, args.kind, name=args.name, parse=not args.no_parse)
+                devices = len({d for a in run.artifacts for d in a['devices']})
+                print(f"{Colors.GREEN}Run '{run.name}': {len(run.artifacts)} files, {devices} devices{Colors.END}")
+            elif args.command == 'playbook':
+                path = catalog.find_playbook(args.name, args.root)
+                if path is None:
+                    print(f"{Colors.RED}{args.name} not found under {args.root}{Colors.END}")
+                    sys.exit(1)
+                print(path)
+            elif args.command == 'prune':
+                print(f"Forgot {catalog.prune()} missing artifacts")
+
+    except KeyboardInterrupt:
+        sys.exit(1)
+    except sqlite3.Error as e:
+        print(f"{Colors.RED}Catalog error: {str(e)}{Colors.END}", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+SD-WAN Collect-All Orchestrator
+===============================
+
+Single entry point for a full telemetry sweep across the statistics use
+cases (34-36, 38-41). Instead of one ansible-playbook run per use case it:
+- Tests connectivity, logs in and fetches the inventory once
+- Builds a dependency DAG: connectivity -> endpoints and inventory ->
+  per-device queries -> summary
+- Runs independent branches concurrently over one shared vManage session
+- Fetches an endpoint used by several use cases only once
+- Writes the same per-use-case JSON files under generated/, optionally
+  as framed .gz/.zst files (--compress)
+
+Author: SD-WAN Automation Team
+Version: 1.0
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from datetime import datetime
+from vmanage_client import VManageClient, VManageError
+from tracing import TRACE_FILE_NAME, configure, get_tracer
+from compressed_io import available_codecs, resolve_codec, output_path, publish, open_output
+from device_collector import DeviceCollector
+from stats_store import StatsStore
+from catalog import open_catalog
+from dag_runner import run_dag
+
+class Colors:
+    """Color codes for terminal output"""
+    GREEN = '\033[92m'
+    RED = '\033[91m'
+    YELLOW = '\033[93m'
+    BLUE = '\033[94m'
+    CYAN = '\033[96m'
+    WHITE = '\033[97m'
+    BOLD = '\033[1m'
+    END = '\033[0m'
+
+CONTROLLERS_PATH = '/dataservice/system/device/controllers'
+INVENTORY_PATH = '/dataservice/device'
+
+# Per use case: output directory, inventory copy, endpoint files and per-device query
+USE_CASES = {
+    'device_statistics': {
+        'output_dir': 'device_statistics',
+        'inventory_file': 'device_list.json',
+        'endpoints': {
+            'interface_statistics.json': '/dataservice/device/interface/stats',
+            'memory_statistics.json': '/dataservice/device/memory',
+            'cpu_statistics.json': '/dataservice/device/cpu',
+            'disk_statistics.json': '/dataservice/device/disk',
+            'tunnel_statistics.json': '/dataservice/device/tunnel/statistics',
+            'app_route_statistics.json': '/dataservice/device/app-route/statistics',
+            'hardware_statistics.json': '/dataservice/device/hardware/status',
+            'environment_statistics.json': '/dataservice/device/hardware/environment',
+            'uptime_statistics.json': '/dataservice/device/system/status'
+        }
+    },
+    'interface_statistics': {
+        'output_dir': 'interface_statistics',
+        'inventory_file': 'devices_list.json',
+        'endpoints': {
+            'interface_statistics_all.json': '/dataservice/device/interface/stats',
+            'interface_counters.json': '/dataservice/device/counters',
+            'interface_operational.json': '/dataservice/device/interface',
+            'interface_health.json': '/dataservice/device/interface/health',
+            'tunnel_statistics.json': '/dataservice/device/tunnel/statistics',
+            'wan_interface_statistics.json': '/dataservice/device/wan/interface/stats'
+        },
+        'per_device': 'interface'
+    },
+    'tunnel_statistics': {
+        'output_dir': 'tunnel_statistics',
+        'inventory_file': 'devices_list.json',
+        'endpoints': {
+            'tunnel_statistics_all.json': '/dataservice/device/tunnel/statistics',
+            'tunnel_interface.json': '/dataservice/device/tunnel/interface',
+            'tunnel_operational_status.json': '/dataservice/device/tunnel/status',
+            'tunnel_performance.json': '/dataservice/device/tunnel/performance',
+            'tunnel_health.json': '/dataservice/device/tunnel/health',
+            'bfd_sessions.json': '/dataservice/device/bfd/sessions',
+            'omp_peers.json': '/dataservice/device/omp/peers',
+            'tloc_statistics.json': '/dataservice/device/tloc',
+            'control_connections.json': '/dataservice/device/control/connections'
+        },
+        'per_device': 'tunnel'
+    },
+    'bfd_sessions': {
+        'output_dir': 'bfd_sessions',
+        'inventory_file': 'devices_list.json',
+        'endpoints': {
+            'bfd_sessions.json': '/dataservice/device/bfd/sessions',
+            'bfd_summary.json': '/dataservice/device/bfd/summary',
+            'bfd_history.json': '/dataservice/device/bfd/history',
+            'bfd_links.json': '/dataservice/device/bfd/links'
+        },
+        'per_device': 'bfd'
+    },
+    'omp_peers': {
+        'output_dir': 'omp_peers',
+        'inventory_file': 'devices_list.json',
+        'endpoints': {
+            'omp_peers.json': '/dataservice/device/omp/peers',
+            'omp_summary.json': '/dataservice/device/omp/summary',
+            'omp_routes.json': '/dataservice/device/omp/routes',
+            'omp_advertised_routes.json': '/dataservice/device/omp/advertised-routes',
+            'omp_received_routes.json': '/dataservice/device/omp/received-routes'
+        },
+        'per_device': 'omp'
+    },
+    'control_connections': {
+        'output_dir': 'control_connections',
+        'inventory_file': 'devices_list.json',
+        'endpoints': {
+            'control_connections.json': '/dataservice/device/control/connections',
+            'control_summary.json': '/dataservice/device/control/summary',
+            'control_statistics.json': '/dataservice/device/control/stats',
+            'dtls_connections.json': '/dataservice/device/control/connections/dtls',
+            'tls_connections.json': '/dataservice/device/control/connections/tls'
+        },
+        'per_device': 'control'
+    },
+    'system_info': {
+        'output_dir': 'system_info',
+        'endpoints': {
+            'device_system_info.json': '/dataservice/device/system/info',
+            'system_counters.json': '/dataservice/device/counters',
+            'device_models.json': '/dataservice/device/models',
+            'device_controllers.json': CONTROLLERS_PATH,
+            'device_vedges.json': '/dataservice/system/device/vedges'
+        }
+    }
+}
+
+# Use cases whose snapshots are appended to the time-series store
+STATS_USE_CASES = ('device_statistics', 'interface_statistics', 'tunnel_statistics')
+
+def write_json(path, data, codec=None):
+    """Write JSON atomically, formatted like Ansible's to_nice_json"""
+    path = output_path(path, codec)
+    tmp_path = f"{path}.tmp"
+    with get_tracer().span('write', os.path.basename(os.path.dirname(path)) or '.') as span:
+        with open_output(tmp_path, codec) as f:
+            json.dump(data, f, indent=4, sort_keys=True)
+        span['bytes'] = os.path.getsize(tmp_path)
+        publish(tmp_path, path)
+    return path
+
+class CollectAll:
+    def __init__(self, client, generated_dir='generated', use_cases=None, workers=8,
+                 device_in_flight=20, per_device=True, codec=None, catalog_run=None):
+        self.client = client
+        self.generated_dir = generated_dir
+        self.use_cases = use_cases or list(USE_CASES)
+        self.workers = workers
+        self.device_in_flight = device_in_flight
+        self.per_device = per_device
+        self.codec = codec
+        self.catalog_run = catalog_run
+        self.inventory = None
+        self.node_results = {}
+
+    def use_case_dir(self, use_case):
+        """Return the generated/ sub-directory of a use case"""
+        return os.path.join(self.generated_dir, USE_CASES[use_case]['output_dir'])
+
+    def endpoint_targets(self):
+        """Map each unique endpoint to every file that stores it"""
+        targets = {}
+        for use_case in self.use_cases:
+            for filename, path in USE_CASES[use_case]['endpoints'].items():
+                targets.setdefault(path, []).append(os.path.join(self.use_case_dir(use_case), filename))
+        return targets
+
+    def record(self, path, data):
+        """Add a written file to the run's catalog entry"""
+        if self.catalog_run:
+            self.catalog_run.add(path, data=data)
+
+    def check_connectivity(self):
+        """Log in and confirm the controllers endpoint answers"""
+        result = self.client.fetch(CONTROLLERS_PATH)
+        if result['status'] != 200:
+            raise VManageError(f"Cannot reach vManage: {result['msg'] or result['status']}")
+        return {'controllers': len(result.get('json', {}).get('data', []))}
+
+    def fetch_inventory(self):
+        """Fetch the device inventory once and write every use case's copy"""
+        data = self.client.get_json(INVENTORY_PATH)
+        self.inventory = data.get('data', [])
+        self.record(write_json(os.path.join(self.generated_dir, 'devices_inventory.json'), data), data)
+        for use_case in self.use_cases:
+            inventory_file = USE_CASES[use_case].get('inventory_file')
+            if inventory_file:
+                self.record(write_json(os.path.join(self.use_case_dir(use_case), inventory_file), data), data)
+        return {'devices': len(self.inventory)}
+
+    def fetch_endpoint(self, path, files):
+        """Fetch one endpoint and write it to every use case that needs it"""
+        result = self.client.fetch(path)
+        if result['status'] != 200 or 'json' not in result:
+            raise VManageError(f"HTTP {result['status']} {result['msg']}".strip())
+        # Inventory copies stay plain JSON for the playbooks; the statistics dumps are compressed
+        for dest in files:
+            self.record(write_json(dest, result['json'], codec=self.codec), result['json'])
+        return {'files': len(files), 'elapsed': result['elapsed']}
+
+    def collect_devices(self, use_case):
+        """Run the use case's per-device query across the shared inventory"""
+        collector = DeviceCollector(self.client, USE_CASES[use_case]['per_device'],
+                                    self.use_case_dir(use_case),
+                                    max_in_flight=self.device_in_flight, codec=self.codec,
+                                    catalog_run=self.catalog_run)
+        summary = collector.run(devices=self.inventory)
+        if summary['devices'] and not summary['succeeded']:
+            raise VManageError(f"All {summary['devices']} device queries failed")
+        return {'devices': summary['devices'], 'succeeded': summary['succeeded'], 'failed': summary['failed']}
+
+    def get_plan(self):
+        """Return the DAG as (name, callable, dependencies) in report order"""
+        plan = [
+            ('connectivity', self.check_connectivity, []),
+            ('inventory', self.fetch_inventory, ['connectivity'])
+        ]
+        for path, files in self.endpoint_targets().items():
+            plan.append((f"endpoint {path}", lambda p=path, f=files: self.fetch_endpoint(p, f), ['connectivity']))
+        if self.per_device:
+            for use_case in self.use_cases:
+                if USE_CASES[use_case].get('per_device'):
+                    plan.append((f"devices {use_case}", lambda u=use_case: self.collect_devices(u), ['inventory']))
+        return plan
+
+    def run_node(self, name, func):
+        """Run one node and record its outcome and timing"""
+        start = time.monotonic()
+        with get_tracer().span('step', name) as span:
+            try:
+                detail = func()
+                ok, error = True, None
+            except (VManageError, ValueError, OSError) as e:
+                detail, ok, error = {}, False, str(e)
+            span['status'] = 'ok' if ok else 'error'
+        return {'name': name, 'ok': ok, 'error': error, 'detail': detail,
+                'seconds': round(time.monotonic() - start, 3)}
+
+    def run(self, on_node=None):
+        """Run the DAG, starting every node as soon as its dependencies succeed"""
+        for use_case in self.use_cases:
+            os.makedirs(self.use_case_dir(use_case), exist_ok=True)
+
+        plan = self.get_plan()
+        start = time.monotonic()
+
+        def skip_node(name, failed_dependency):
+            return {'name': name, 'ok': False, 'detail': {}, 'seconds': 0,
+                    'error': f"Skipped - depends on failed '{failed_dependency}'"}
+
+        def node_done(name, result):
+            self.node_results[name] = result
+            if on_node:
+                on_node(result)
+
+        run_dag(plan, self.run_node, skip_node, lambda result: result['ok'],
+                workers=self.workers, on_done=node_done)
+
+        nodes = [self.node_results[name] for name, _, _ in plan]
+        summary = {
+            'timestamp': datetime.now().isoformat(),
+            'use_cases': self.use_cases,
+            'nodes': nodes,
+            'succeeded': sum(1 for n in nodes if n['ok']),
+            'failed': sum(1 for n in nodes if not n['ok']),
+            'wall_seconds': round(time.monotonic() - start, 3),
+            'serial_seconds': round(sum(n['seconds'] for n in nodes), 3),
+            'workers': self.workers,
+            'rate_limiter': self.client.limiter.stats() if self.client.limiter else None
+        }
+        write_json(os.path.join(self.generated_dir, 'collect_all_summary.json'), summary)
+        return summary
+
+def print_node(result):
+    """Print one finished node"""
+    if result['ok']:
+        print(f"{Colors.GREEN}✓{Colors.END} {result['name']} ({result['seconds']}s)")
+    else:
+        print(f"{Colors.RED}✗{Colors.END} {result['name']}: {result['error']}")
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='SD-WAN Collect-All Orchestrator')
+    parser.add_argument('--use-case', '-u', action='append', choices=sorted(USE_CASES),
+                       help='Use case to collect (repeatable, default: all)')
+    parser.add_argument('--generated-dir', '-d', default='generated',
+                       help='Output root shared with the playbooks (default: generated)')
+    parser.add_argument('--workers', '-w', type=int, default=8,
+                       help='DAG nodes run at once (default: 8)')
+    parser.add_argument('--device-in-flight', '-n', type=int, default=20,
+                       help='Concurrent requests per per-device query (default: 20)')
+    parser.add_argument('--no-per-device', action='store_true',
+                       help='Skip the per-device queries')
+    parser.add_argument('--timeout', '-t', type=int, default=60,
+                       help='Per-request timeout in seconds (default: 60)')
+    parser.add_argument('--no-store', action='store_true',
+                       help='Do not append statistics to the time-series store')
+    parser.add_argument('--compress', choices=available_codecs() + ['off'],
+                       help='Write endpoint and per-device files as framed .gz/.zst (default: $SDWAN_COMPRESS or off)')
+
+    try:
+        args = parser.parse_args()
+        configure(os.path.join(args.generated_dir, TRACE_FILE_NAME))
+        pool_size = args.workers + args.device_in_flight
+        codec = resolve_codec(args.compress)
+        catalog = open_catalog()
+        catalog_run = catalog.begin_run(f"collect_all_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
+                                        'collect', args.generated_dir) if catalog else None
+
+        with VManageClient.from_env(timeout=args.timeout, pool_size=pool_size) as client:
+            orchestrator = CollectAll(client, args.generated_dir, use_cases=args.use_case,
+                                      workers=args.workers,
+                                      device_in_flight=args.device_in_flight,
+                                      per_device=not args.no_per_device,
+                                      codec=codec,
+                                      catalog_run=catalog_run)
+            summary = orchestrator.run(on_node=print_node)
+
+        if catalog:
+            with catalog:
+                catalog.finish_run(catalog_run, status='ok' if summary['failed'] == 0 else 'partial')
+            print(f"{Colors.CYAN}Catalog: {len(catalog_run.artifacts)} files indexed{Colors.END}")
+
+        if not args.no_store:
+            stats_dirs = [orchestrator.use_case_dir(u) for u in orchestrator.use_cases if u in STATS_USE_CASES]
+            if stats_dirs:
+                with StatsStore() as store:
+                    stored = store.ingest(stats_dirs)
+                print(f"{Colors.CYAN}Time-series store: {stored['samples']} samples from {stored['files']} files{Colors.END}")
+
+        color = Colors.GREEN if summary['failed'] == 0 else Colors.YELLOW
+        print(f"\n{color}{summary['succeeded']}/{len(summary['nodes'])} collection steps succeeded "
+              f"in {summary['wall_seconds']}s ({summary['serial_seconds']}s if run one after another){Colors.END}")
+        sys.exit(0 if summary['failed'] == 0 else 1)
+
+    except KeyboardInterrupt:
+        print(f"\n{Colors.YELLOW}Collection interrupted by user{Colors.END}")
+        sys.exit(1)
+    except VManageError as e:
+        print(f"\n{Colors.RED}vManage error: {str(e)}{Colors.END}")
+        sys.exit(1)
+    except ValueError as e:
+        print(f"{Colors.RED}Error: {str(e)}{Colors.END}", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
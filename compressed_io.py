@@ -0,0 +1,281 @@
+"""
+SD-WAN Compressed Output Files
+==============================
+
+Framed gzip or zstd output for the JSON dumps under generated/. Data is
+compressed on the fly in independent frames, and every file ends with a
+small footer frame that standard tools ignore (an empty gzip member with
+the footer in its extra field, or a zstd skippable frame). The footer
+holds the codec, compressed and uncompressed sizes, line count and the
+BLAKE2b hash of the uncompressed content, so:
+- A file's completeness and size are checked from its last few bytes
+- Reading a file to the end verifies the content against the footer
+- gzip -dc / zstd -dc still decompress the files as usual
+
+Compression is chosen with SDWAN_COMPRESS (gzip, zstd or off) or the
+--compress option of the collector scripts. zstd needs the zstandard
+package.
+
+Author: SD-WAN Automation Team
+Version: 1.0
+"""
+
+import io
+import os
+import gzip
+import json
+import zlib
+import struct
+import hashlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+FOOTER_FORMAT = 'sdwan-frames/1'
+FRAME_SIZE = 4 * 1024 * 1024
+CODEC_EXTENSIONS = {'gzip': '.gz', 'zstd': '.zst'}
+DEFAULT_LEVELS = {'gzip': 6, 'zstd': 3}
+# Footer frames: an empty gzip member carrying an 'SF' extra subfield, or a zstd skippable frame
+GZIP_FOOTER_HEADER = b'\x1f\x8b\x08\x04\x00\x00\x00\x00\x00\xff'
+GZIP_EMPTY_MEMBER_TAIL = b'\x03\x00' + b'\x00' * 8
+ZSTD_SKIPPABLE_MAGIC = 0x184D2A5E
+MAX_FOOTER_BYTES = 65000
+
+class CompressedDataError(ValueError):
+    """Raised when a compressed file is truncated or does not match its footer"""
+
+def available_codecs():
+    """Return the codecs usable in this environment"""
+    return ['gzip', 'zstd'] if zstandard is not None else ['gzip']
+
+def resolve_codec(name=None):
+    """Return the codec to write with, from name or SDWAN_COMPRESS; None means uncompressed"""
+    name = (name or os.environ.get('SDWAN_COMPRESS', '')).strip().lower()
+    if name in ('', 'off', 'none', 'no', 'false', '0'):
+        return None
+    if name in ('gz', 'zst'):
+        name = {'gz': 'gzip', 'zst': 'zstd'}[name]
+    if name not in CODEC_EXTENSIONS:
+        raise ValueError(f"Unknown compression '{name}' (choose from gzip, zstd, off)")
+    if name == 'zstd' and zstandard is None:
+        raise ValueError("zstd compression needs the zstandard package (pip install zstandard)")
+    return name
+
+def codec_of(path):
+    """Return the codec a file name implies, or None for plain files"""
+    for codec, extension in CODEC_EXTENSIONS.items():
+        if path.endswith(extension):
+            return codec
+    return None
+
+def plain_name(path):
+    """Strip a compression extension from a file name"""
+    codec = codec_of(path)
+    return path[:-len(CODEC_EXTENSIONS[codec])] if codec else path
+
+def output_path(path, codec=None):
+    """Return the file name to write for a plain path and codec"""
+    return path + CODEC_EXTENSIONS[codec] if codec else path
+
+def publish(tmp_path, path):
+    """Move a finished file into place and drop its variants with other compression"""
+    os.replace(tmp_path, path)
+    plain = plain_name(path)
+    for other in [plain] + [plain + extension for extension in CODEC_EXTENSIONS.values()]:
+        if other != path and os.path.exists(other):
+            os.remove(other)
+
+class FrameWriter(io.RawIOBase):
+    """Binary writer that compresses into independent frames and appends the footer on close"""
+
+    def __init__(self, fileobj, codec='gzip', level=None, frame_size=FRAME_SIZE, metadata=None):
+        super().__init__()
+        if codec == 'zstd' and zstandard is None:
+            raise ValueError("zstd compression needs the zstandard package (pip install zstandard)")
+        self.fileobj = fileobj
+        self.codec = codec
+        self.level = level if level is not None else DEFAULT_LEVELS[codec]
+        self.frame_size = frame_size
+        self.metadata = dict(metadata or {})
+        self.pending = bytearray()
+        self.digest = hashlib.blake2b()
+        self.raw_bytes = 0
+        self.compressed_bytes = 0
+        self.frames = 0
+        self.lines = 0
+        self.compressor = zstandard.ZstdCompressor(level=self.level) if codec == 'zstd' else None
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self.pending += data
+        self.digest.update(data)
+        self.raw_bytes += len(data)
+        self.lines += data.count(b'\n')
+        while len(self.pending) >= self.frame_size:
+            self._frame(bytes(self.pending[:self.frame_size]))
+            del self.pending[:self.frame_size]
+        return len(data)
+
+    def _frame(self, data):
+        """Compress one independent frame"""
+        if self.codec == 'zstd':
+            frame = self.compressor.compress(data)
+        else:
+            compressor = zlib.compressobj(self.level, zlib.DEFLATED, 31)
+            frame = compressor.compress(data) + compressor.flush()
+        self.fileobj.write(frame)
+        self.compressed_bytes += len(frame)
+        self.frames += 1
+
+    def footer(self):
+        """Return the footer frame describing everything written so far"""
+        payload = json.dumps(dict(self.metadata, **{
+            'format': FOOTER_FORMAT,
+            'codec': self.codec,
+            'frames': self.frames,
+            'compressed_bytes': self.compressed_bytes,
+            'raw_bytes': self.raw_bytes,
+            'lines': self.lines,
+            'blake2b': self.digest.hexdigest()
+        }), separators=(',', ':')).encode()
+        if len(payload) > MAX_FOOTER_BYTES:
+            raise ValueError("Footer metadata is too large")
+        payload += struct.pack('<I', len(payload))
+        if self.codec == 'zstd':
+            return struct.pack('<II', ZSTD_SKIPPABLE_MAGIC, len(payload)) + payload
+        subfield = b'SF' + struct.pack('<H', len(payload)) + payload
+        return GZIP_FOOTER_HEADER + struct.pack('<H', len(subfield)) + subfield + GZIP_EMPTY_MEMBER_TAIL
+
+    def close(self):
+        if not self.closed:
+            # Even an empty file gets one data frame, so it stays a valid gzip/zstd stream
+            if self.pending or not self.frames:
+                self._frame(bytes(self.pending))
+                self.pending.clear()
+            self.fileobj.write(self.footer())
+            self.fileobj.close()
+        super().close()
+
+def open_output(path, codec=None, mode='w', level=None, metadata=None):
+    """Open path for writing, compressing when a codec is given"""
+    if codec is None:
+        return open(path, mode)
+    writer = FrameWriter(open(path, 'wb'), codec, level=level, metadata=metadata)
+    if 'b' in mode:
+        return writer
+    return io.TextIOWrapper(io.BufferedWriter(writer, FRAME_SIZE), encoding='utf-8', newline='')
+
+def read_footer(path):
+    """Read the footer from the end of a compressed file; None if it is missing or damaged"""
+    codec = codec_of(path)
+    if codec is None:
+        return None
+    try:
+        with open(path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            tail_size = len(GZIP_EMPTY_MEMBER_TAIL) if codec == 'gzip' else 0
+            if size < tail_size + 4:
+                return None
+            f.seek(size - tail_size - 4)
+            tail = f.read()
+            if codec == 'gzip' and tail[4:] != GZIP_EMPTY_MEMBER_TAIL:
+                return None
+            length = struct.unpack('<I', tail[:4])[0]
+            if length > MAX_FOOTER_BYTES:
+                return None
+
+            # Frame header in front of the payload: gzip header and extra field, or skippable magic
+            header_size = len(GZIP_FOOTER_HEADER) + 6 if codec == 'gzip' else 8
+            frame_start = size - tail_size - 4 - length - header_size
+            if frame_start < 0:
+                return None
+            f.seek(frame_start)
+            header = f.read(header_size)
+            payload = f.read(length)
+    except OSError:
+        return None
+
+    if codec == 'gzip':
+        expected = GZIP_FOOTER_HEADER + struct.pack('<H', length + 8) + b'SF' + struct.pack('<H', length + 4)
+    else:
+        expected = struct.pack('<II', ZSTD_SKIPPABLE_MAGIC, length + 4)
+    if header != expected:
+        return None
+    try:
+        footer = json.loads(payload)
+    except ValueError:
+        return None
+    if footer.get('format') != FOOTER_FORMAT or footer.get('codec') != codec:
+        return None
+    # Everything in front of the footer frame must be the data frames it describes
+    footer['complete'] = footer.get('compressed_bytes') == frame_start
+    footer['file_bytes'] = size
+    return footer
+
+class FrameReader(io.RawIOBase):
+    """Decompressing reader that checks the content against the footer at end of file"""
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+        self.codec = codec_of(path)
+        self.footer = read_footer(path)
+        if self.footer is None or not self.footer['complete']:
+            raise CompressedDataError(f"{os.path.basename(path)}: missing or damaged frame footer (truncated?)")
+        self.fileobj = open(path, 'rb')
+        if self.codec == 'zstd':
+            self.stream = zstandard.ZstdDecompressor().stream_reader(self.fileobj, read_across_frames=True)
+        else:
+            self.stream = gzip.GzipFile(fileobj=self.fileobj, mode='rb')
+        self.digest = hashlib.blake2b()
+        self.raw_bytes = 0
+        self.verified = False
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        try:
+            data = self.stream.read(len(buffer))
+        except (EOFError, OSError, zlib.error) as e:
+            raise CompressedDataError(f"{os.path.basename(self.path)}: corrupt frame: {str(e)}")
+        except Exception as e:
+            if zstandard is not None and isinstance(e, zstandard.ZstdError):
+                raise CompressedDataError(f"{os.path.basename(self.path)}: corrupt frame: {str(e)}")
+            raise
+        if not data:
+            self.verify()
+            return 0
+        buffer[:len(data)] = data
+        self.digest.update(data)
+        self.raw_bytes += len(data)
+        return len(data)
+
+    def verify(self):
+        """Compare what was read with the footer"""
+        if self.verified:
+            return
+        self.verified = True
+        if self.raw_bytes != self.footer['raw_bytes'] or self.digest.hexdigest() != self.footer['blake2b']:
+            raise CompressedDataError(f"{os.path.basename(self.path)}: content does not match its frame footer")
+
+    def close(self):
+        if not self.closed:
+            self.stream.close()
+            self.fileobj.close()
+        super().close()
+
+def open_input(path, mode='r'):
+    """Open a plain or compressed file for reading; compressed files are checked at end of file"""
+    if codec_of(path) is None:
+        return open(path, mode)
+    reader = io.BufferedReader(FrameReader(path), FRAME_SIZE)
+    if 'b' in mode:
+        return reader
+    return io.TextIOWrapper(reader, encoding='utf-8')
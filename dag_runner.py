@@ -0,0 +1,53 @@
+"""
+SD-WAN Dependency Scheduler
+===========================
+
+Runs a plan of named steps concurrently while honouring their
+dependencies. Shared by the pre-check and the collect-all orchestrator:
+- Starts every step as soon as all of its dependencies have finished
+- Never runs a step whose dependency failed; it is skipped instead
+- Submits ready steps in plan order, so the plan also sets priority
+- Reports each finished or skipped step from the calling thread
+
+Author: SD-WAN Automation Team
+Version: 1.0
+"""
+
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+def run_dag(plan, run, skip, ok, workers=8, on_done=None):
+    """Run (name, task, dependencies) steps and return {name: result}
+
+    run(name, task) is called in a worker thread; skip(name, failed_dependency)
+    builds the result of a step that is not run; ok(result) tells whether
+    dependants may start. on_done(name, result) sees every step as it ends.
+    """
+    order = [name for name, _, _ in plan]
+    pending = {name: (task, deps) for name, task, deps in plan}
+    results = {}
+
+    def finish(name, result):
+        results[name] = result
+        if on_done:
+            on_done(name, result)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        running = {}
+        while pending or running:
+            # Submit (or skip) every step whose dependencies are resolved
+            for name in [n for n in order if n in pending]:
+                task, deps = pending[name]
+                if not all(dep in results for dep in deps):
+                    continue
+                del pending[name]
+                failed = [dep for dep in deps if not ok(results[dep])]
+                if failed:
+                    finish(name, skip(name, failed[0]))
+                else:
+                    running[executor.submit(run, name, task)] = name
+
+            if running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    finish(running.pop(future), future.result())
+    return results
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+SD-WAN Per-Device Collector
+===========================
+
+Runs per-device dataservice queries (BFD sessions, tunnel, interface and
+system statistics, OMP peers, control connections) across the whole
+inventory with bounded concurrency over one shared vManage session.
+It provides:
+- A configurable in-flight request limit
+- A per-device time budget with retry and exponential backoff
+- Client-side pacing through the shared adaptive rate limiter
+- One result file per device, written as soon as it arrives and
+  optionally compressed (--compress gzip|zstd)
+
+Author: SD-WAN Automation Team
+Version: 1.0
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from vmanage_client import VManageClient, VManageError
+from rate_limiter import THROTTLE_STATUS
+from catalog import open_catalog
+from device_queries import DEVICE_QUERIES, RETRYABLE_STATUS, device_id_of, safe_name
+from tracing import TRACE_FILE_NAME, configure, get_tracer
+from compressed_io import available_codecs, resolve_codec, output_path, publish, open_output
+
+class Colors:
+    """Color codes for terminal output"""
+    GREEN = '\033[92m'
+    RED = '\033[91m'
+    YELLOW = '\033[93m'
+    BLUE = '\033[94m'
+    CYAN = '\033[96m'
+    WHITE = '\033[97m'
+    BOLD = '\033[1m'
+    END = '\033[0m'
+
+class DeviceCollector:
+    def __init__(self, client, query, output_dir, max_in_flight=20,
+                 request_timeout=60, device_timeout=180, retries=3, backoff=1.0, codec=None,
+                 catalog_run=None):
+        if query not in DEVICE_QUERIES:
+            raise ValueError(f"Unknown query '{query}' (choose from {', '.join(DEVICE_QUERIES)})")
+        self.client = client
+        self.query = query
+        self.spec = DEVICE_QUERIES[query]
+        self.output_dir = output_dir
+        self.max_in_flight = max_in_flight
+        self.request_timeout = request_timeout
+        self.device_timeout = device_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.codec = codec
+        self.catalog_run = catalog_run
+        self.retry_status = self.retryable_status(client)
+        self._results_lock = threading.Lock()
+
+    @staticmethod
+    def retryable_status(client):
+        """Return the statuses collect_device retries itself"""
+        # A paced client already retries throttled responses (throttle_retries times) inside
+        # fetch; retrying them here as well would multiply the attempts per device
+        if getattr(client, 'limiter', None) is not None and getattr(client, 'throttle_retries', 0):
+            return RETRYABLE_STATUS - THROTTLE_STATUS
+        return RETRYABLE_STATUS
+
+    def load_inventory(self):
+        """Fetch the device inventory from /dataservice/device"""
+        return self.client.get_json('/dataservice/device').get('data', [])
+
+    def device_file(self, device):
+        """Return the output file path for a device"""
+        path = os.path.join(self.output_dir, f"{self.spec['prefix']}_{safe_name(device_id_of(device))}.json")
+        return output_path(path, self.codec)
+
+    def write_json(self, path, data, codec=None):
+        """Write JSON atomically so partial files are never left behind"""
+        tmp_path = f"{path}.tmp"
+        with get_tracer().span('write', self.spec['output_dir']) as span:
+            with open_output(tmp_path, codec) as f:
+                json.dump(data, f, indent=2)
+            span['bytes'] = os.path.getsize(tmp_path)
+            publish(tmp_path, path)
+
+    def collect_device(self, device):
+        """Query one device, retrying with backoff inside its time budget"""
+        device_id = device_id_of(device)
+        record = {
+            'device_id': device_id,
+            'hostname': device.get('host-name') or device.get('hostname'),
+            'status': None,
+            'attempts': 0,
+            'elapsed': 0.0,
+            'file': None,
+            'error': None
+        }
+        start = time.monotonic()
+        deadline = start + self.device_timeout
+
+        for attempt in range(self.retries + 1):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                record['error'] = f"Device time budget of {self.device_timeout}s exhausted"
+                break
+
+            record['attempts'] = attempt + 1
+            result = self.client.fetch(self.spec['path'], params={'deviceId': device_id},
+                                       timeout=min(self.request_timeout, remaining))
+            record['status'] = result['status']
+
+            if result['status'] == 200:
+                record['file'] = self.device_file(device)
+                try:
+                    self.write_json(record['file'], result.get('json', {}), codec=self.codec)
+                    if self.catalog_run:
+                        self.catalog_run.add(record['file'], data=result.get('json', {}),
+                                             device=str(device.get('system-ip') or device_id),
+                                             hostname=record['hostname'])
+                except OSError as e:
+                    # A disk error fails this device only; the rest of the inventory is still collected
+                    record.update(status=-1, file=None, error=f"Could not store result: {str(e)}")
+                    break
+                record['error'] = None
+                break
+
+            record['error'] = result.get('msg') or f"HTTP {result['status']}"
+            if result['status'] not in self.retry_status or attempt == self.retries:
+                break
+
+            # Exponential backoff with jitter, never sleeping past the deadline
+            delay = self.backoff * (2 ** attempt) * random.uniform(0.5, 1.5)
+            time.sleep(max(0, min(delay, deadline - time.monotonic())))
+
+        record['elapsed'] = round(time.monotonic() - start, 3)
+        return record
+
+    def run(self, devices=None, on_result=None):
+        """Collect every device with at most max_in_flight requests outstanding"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        if devices is None:
+            devices = self.load_inventory()
+        devices = [d for d in devices if device_id_of(d)]
+
+        results_path = os.path.join(self.output_dir, f"{self.query}_collection_results.ndjson")
+        results = []
+        start = time.monotonic()
+
+        with open(results_path, 'w') as results_file, \
+                ThreadPoolExecutor(max_workers=self.max_in_flight) as executor:
+            futures = [executor.submit(self.collect_device, device) for device in devices]
+            for future in as_completed(futures):
+                record = future.result()
+                # One line per device as it completes, so progress survives an interrupted run
+                with self._results_lock:
+                    results.append(record)
+                    results_file.write(json.dumps(record) + "\n")
+                    results_file.flush()
+                if on_result:
+                    on_result(record)
+
+        summary = {
+            'query': self.query,
+            'path': self.spec['path'],
+            'timestamp': datetime.now().isoformat(),
+            'devices': len(devices),
+            'succeeded': sum(1 for r in results if r['status'] == 200),
+            'failed': sum(1 for r in results if r['status'] != 200),
+            'retried': sum(1 for r in results if r['attempts'] > 1),
+            'max_in_flight': self.max_in_flight,
+            'rate_limiter': self.client.limiter.stats() if self.client.limiter else None,
+            'wall_seconds': round(time.monotonic() - start, 3),
+            'results_file': results_path
+        }
+        self.write_json(os.path.join(self.output_dir, f"{self.query}_collection_summary.json"), summary)
+        return summary
+
+def print_result(record):
+    """Print one per-device result line"""
+    if record['status'] == 200:
+        print(f"{Colors.GREEN}✓{Colors.END} {record['device_id']} ({record['elapsed']}s, {record['attempts']} attempt(s))")
+    else:
+        print(f"{Colors.RED}✗{Colors.END} {record['device_id']}: {record['error']}")
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='SD-WAN Per-Device Collector')
+    parser.add_argument('query', choices=sorted(DEVICE_QUERIES),
+                       help='Per-device query to run across the inventory')
+    parser.add_argument('--output-dir', '-d',
+                       help='Output directory (default: generated/<query dir>)')
+    parser.add_argument('--max-in-flight', '-n', type=int, default=20,
+                       help='Maximum concurrent device requests (default: 20)')
+    parser.add_argument('--timeout', '-t', type=int, default=60,
+                       help='Per-request timeout in seconds (default: 60)')
+    parser.add_argument('--device-timeout', type=int, default=180,
+                       help='Total time budget per device including retries (default: 180)')
+    parser.add_argument('--retries', '-r', type=int, default=3,
+                       help='Retries for failed requests; throttled (429/503) ones are retried by the client (default: 3)')
+    parser.add_argument('--backoff', type=float, default=1.0,
+                       help='Base backoff in seconds, doubled per retry (default: 1.0)')
+    parser.add_argument('--quiet', '-q', action='store_true',
+                       help='Do not print a line per device')
+    parser.add_argument('--compress', choices=available_codecs() + ['off'],
+                       help='Write per-device files as framed .gz/.zst (default: $SDWAN_COMPRESS or off)')
+
+    try:
+        args = parser.parse_args()
+        output_dir = args.output_dir or os.path.join('generated', DEVICE_QUERIES[args.query]['output_dir'])
+        configure(os.path.join(output_dir, TRACE_FILE_NAME))
+        codec = resolve_codec(args.compress)
+        catalog = open_catalog()
+        catalog_run = catalog.begin_run(f"{args.query}_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
+                                        f"device_{args.query}", output_dir) if catalog else None
+
+        with VManageClient.from_env(timeout=args.timeout, pool_size=args.max_in_flight) as client:
+            collector = DeviceCollector(
+                client, args.query, output_dir,
+                max_in_flight=args.max_in_flight,
+                request_timeout=args.timeout,
+                device_timeout=args.device_timeout,
+                retries=args.retries,
+                backoff=args.backoff,
+                codec=codec,
+                catalog_run=catalog_run
+            )
+            summary = collector.run(on_result=None if args.quiet else print_result)
+
+        if catalog:
+            with catalog:
+                catalog.finish_run(catalog_run, status='ok' if summary['failed'] == 0 else 'partial')
+
+        color = Colors.GREEN if summary['failed'] == 0 else Colors.YELLOW
+        print(f"\n{color}{summary['succeeded']}/{summary['devices']} devices collected "
+              f"in {summary['wall_seconds']}s ({summary['retried']} retried){Colors.END}")
+        sys.exit(0 if summary['failed'] == 0 else 1)
+
+    except KeyboardInterrupt:
+        print(f"\n{Colors.YELLOW}Collection interrupted by user{Colors.END}")
+        sys.exit(1)
+    except VManageError as e:
+        print(f"\n{Colors.RED}vManage error: {str(e)}{Colors.END}")
+        sys.exit(1)
+    except ValueError as e:
+        print(f"{Colors.RED}Error: {str(e)}{Colors.END}", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+SD-WAN Per-Device Query Definitions
+===================================
+
+The per-device dataservice queries and the helpers shared by the
+collectors, the stats store and the catalog. Kept free of other local
+imports so any module can use them without an import cycle:
+- DEVICE_QUERIES: API path, output sub-directory and file prefix
+- RETRYABLE_STATUS: status codes worth retrying
+- device_id_of / safe_name: per-device file naming
+
+Author: SD-WAN Automation Team
+Version: 1.0
+"""
+
+import re
+
+# Per-device queries: API path, output sub-directory and per-device file prefix
+DEVICE_QUERIES = {
+    'bfd': {
+        'path': '/dataservice/device/bfd/sessions',
+        'output_dir': 'bfd_sessions',
+        'prefix': 'device_bfd_sessions'
+    },
+    'tunnel': {
+        'path': '/dataservice/device/tunnel/statistics',
+        'output_dir': 'tunnel_statistics',
+        'prefix': 'tunnel_stats'
+    },
+    'interface': {
+        'path': '/dataservice/device/interface/stats',
+        'output_dir': 'interface_statistics',
+        'prefix': 'interface_stats'
+    },
+    'system': {
+        'path': '/dataservice/device/system/info',
+        'output_dir': 'system_info',
+        'prefix': 'system_info'
+    },
+    'omp': {
+        'path': '/dataservice/device/omp/peers',
+        'output_dir': 'omp_peers',
+        'prefix': 'device_omp_peers'
+    },
+    'control': {
+        'path': '/dataservice/device/control/connections',
+        'output_dir': 'control_connections',
+        'prefix': 'device_control_connections'
+    }
+}
+
+# Status codes worth retrying: throttling, overload and transport failures (-1)
+RETRYABLE_STATUS = {-1, 429, 500, 502, 503, 504}
+
+def device_id_of(device):
+    """Return the deviceId used by per-device dataservice queries"""
+    return device.get('deviceId') or device.get('system-ip') or device.get('system_ip')
+
+def safe_name(value):
+    """Make a value safe to use in a file name"""
+    return re.sub(r'[^A-Za-z0-9_.-]', '_', str(value))
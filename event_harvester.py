@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+SD-WAN Event Harvester
+======================
+
+Incremental replacement for the single /dataservice/event request in
+use case 32. It:
+- Splits the requested period into fixed time windows
+- Pages through each window with the event scroll API
+- Persists a resume cursor in generated/, so reruns only fetch new events
+- Stops short of now by a settle delay, so late-indexed events are not
+  skipped past by the cursor
+- Fetches several windows at once when backfilling
+- Optionally writes the window files as framed .gz/.zst (--compress)
+
+Author: SD-WAN Automation Team
+Version: 1.0
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from vmanage_client import VManageClient, VManageError
+from tracing import TRACE_FILE_NAME, configure
+from compressed_io import available_codecs, resolve_codec, output_path, publish, open_output
+from catalog import DeviceTally, open_catalog
+
+class Colors:
+    """Color codes for terminal output"""
+    GREEN = '\033[92m'
+    RED = '\033[91m'
+    YELLOW = '\033[93m'
+    BLUE = '\033[94m'
+    CYAN = '\033[96m'
+    WHITE = '\033[97m'
+    BOLD = '\033[1m'
+    END = '\033[0m'
+
+EVENT_PAGE_PATH = '/dataservice/event/page'
+
+def ms_to_iso(ms):
+    """Format epoch milliseconds as a UTC ISO timestamp"""
+    return datetime.fromtimestamp(ms / 1000, tz=timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+class EventCursor:
+    """Resume cursor persisted as JSON under the generated directory"""
+
+    def __init__(self, path):
+        self.path = path
+        self.last_end_ms = None
+        self.completed = set()
+        self.load()
+
+    def load(self):
+        """Load the cursor from disk if one exists"""
+        if os.path.exists(self.path):
+            with open(self.path, 'r') as f:
+                state = json.load(f)
+            self.last_end_ms = state.get('last_end_ms')
+            self.completed = {tuple(w) for w in state.get('completed_windows', [])}
+
+    def save(self):
+        """Write the cursor atomically"""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                'last_end_ms': self.last_end_ms,
+                'last_end': ms_to_iso(self.last_end_ms) if self.last_end_ms else None,
+                'completed_windows': sorted(self.completed),
+                'updated': datetime.now().isoformat()
+            }, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def mark_done(self, window, windows):
+        """Record a finished window and advance past every contiguous finished window"""
+        # A window replanned with a later end supersedes the shorter one from an earlier run
+        self.completed = {w for w in self.completed if w[0] != window[0]}
+        self.completed.add(window)
+        for start, end in windows:
+            if self.last_end_ms is not None and end <= self.last_end_ms:
+                continue  # already behind the cursor
+            if (start, end) not in self.completed:
+                break
+            self.last_end_ms = end
+            self.completed.discard((start, end))
+
+class EventHarvester:
+    def __init__(self, client, output_dir, window_minutes=15, page_size=5000,
+                 max_windows_in_flight=4, timeout=120, codec=None, catalog_run=None, settle_seconds=120):
+        self.client = client
+        self.output_dir = output_dir
+        self.events_dir = os.path.join(output_dir, 'events')
+        self.window_ms = window_minutes * 60 * 1000
+        self.page_size = page_size
+        self.max_windows_in_flight = max_windows_in_flight
+        self.timeout = timeout
+        self.codec = codec
+        self.catalog_run = catalog_run
+        self.settle_ms = settle_seconds * 1000
+        self.cursor = EventCursor(os.path.join(output_dir, 'events_cursor.json'))
+        self._cursor_lock = threading.Lock()
+
+    def plan_windows(self, start_ms, end_ms):
+        """Split [start_ms, end_ms) into contiguous windows aligned to multiples of the window size"""
+        # Aligned windows keep their start when replanned, so a re-fetch replaces the same file
+        windows = []
+        window_start = start_ms
+        while window_start < end_ms:
+            window_end = min((window_start // self.window_ms + 1) * self.window_ms, end_ms)
+            windows.append((window_start, window_end))
+            window_start = window_end
+        return windows
+
+    def window_query(self, start_ms, end_ms):
+        """Build the scroll query for one window (end exclusive to avoid boundary duplicates)"""
+        return {
+            'query': {
+                'condition': 'AND',
+                'rules': [{
+                    'value': [str(start_ms), str(end_ms - 1)],
+                    'field': 'entry_time',
+                    'type': 'date',
+                    'operator': 'between'
+                }]
+            },
+            'size': self.page_size
+        }
+
+    def remove_superseded(self, start_ms, dest):
+        """Delete files of an earlier, shorter fetch of the window starting at start_ms"""
+        prefix = f"events_{start_ms}_"
+        for name in os.listdir(self.events_dir):
+            path = os.path.join(self.events_dir, name)
+            if name.startswith(prefix) and path != dest and not name.endswith('.tmp'):
+                os.remove(path)
+
+    def fetch_window(self, window):
+        """Page through one window and write its events as NDJSON"""
+        start_ms, end_ms = window
+        query = self.window_query(start_ms, end_ms)
+        dest = output_path(os.path.join(self.events_dir, f"events_{start_ms}_{end_ms}.ndjson"), self.codec)
+        tmp_path = f"{dest}.tmp"
+        events = 0
+        pages = 0
+        scroll_id = None
+        tally = DeviceTally(end_ms)
+
+        with open_output(tmp_path, self.codec) as f:
+            while True:
+                params = {'scrollId': scroll_id} if scroll_id else None
+                response = self.client.request('POST', EVENT_PAGE_PATH, params=params,
+                                               json=query, timeout=self.timeout)
+                if response.status_code != 200:
+                    raise VManageError(f"Event page for {ms_to_iso(start_ms)} returned HTTP {response.status_code}")
+                body = response.json()
+                pages += 1
+
+                for event in body.get('data', []):
+                    f.write(json.dumps(event, separators=(',', ':')))
+                    f.write('\n')
+                    tally.add(event)
+                    events += 1
+
+                page_info = body.get('pageInfo', {})
+                scroll_id = page_info.get('scrollId')
+                if not page_info.get('hasMoreData') or not scroll_id:
+                    break
+
+        # Only a fully paged window becomes visible, so an interrupted run refetches it
+        publish(tmp_path, dest)
+        self.remove_superseded(start_ms, dest)
+        if self.catalog_run:
+            self.catalog_run.add(dest, tally=tally, use_case='events')
+        return {'window': window, 'file': dest, 'events': events, 'pages': pages}
+
+    def harvest(self, since_ms=None, until_ms=None, lookback_hours=24, on_window=None):
+        """Fetch every window newer than the cursor (or since_ms) up to until_ms"""
+        os.makedirs(self.events_dir, exist_ok=True)
+        now_ms = int(time.time() * 1000)
+        # Events are indexed some time after entry_time; windows closer to now than the
+        # settle delay would be marked done before all their events are searchable
+        until_ms = until_ms or (now_ms - self.settle_ms)
+        if since_ms is None:
+            since_ms = self.cursor.last_end_ms or (now_ms - lookback_hours * 3600 * 1000)
+
+        windows = self.plan_windows(since_ms, until_ms)
+        pending = [w for w in windows if w not in self.cursor.completed]
+        results = []
+        errors = []
+        start = time.monotonic()
+
+        with ThreadPoolExecutor(max_workers=self.max_windows_in_flight) as executor:
+            futures = {executor.submit(self.fetch_window, w): w for w in pending}
+            for future in as_completed(futures):
+                window = futures[future]
+                try:
+                    result = future.result()
+                except (VManageError, ValueError, OSError) as e:
+                    errors.append({'window': window, 'error': str(e)})
+                    continue
+                results.append(result)
+                with self._cursor_lock:
+                    self.cursor.mark_done(window, windows)
+                    self.cursor.save()
+                if on_window:
+                    on_window(result)
+
+        return {
+            'since': ms_to_iso(since_ms),
+            'until': ms_to_iso(until_ms),
+            'windows': len(windows),
+            'fetched_windows': len(results),
+            'failed_windows': len(errors),
+            'events': sum(r['events'] for r in results),
+            'pages': sum(r['pages'] for r in results),
+            'cursor': ms_to_iso(self.cursor.last_end_ms) if self.cursor.last_end_ms else None,
+            'wall_seconds': round(time.monotonic() - start, 3),
+            'errors': errors
+        }
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='SD-WAN Event Harvester')
+    parser.add_argument('--output-dir', '-d', default='generated',
+                       help='Generated directory holding events/ and the cursor (default: generated)')
+    parser.add_argument('--window-minutes', '-w', type=int, default=15,
+                       help='Size of each time window in minutes (default: 15)')
+    parser.add_argument('--page-size', type=int, default=5000,
+                       help='Events per scroll page (default: 5000)')
+    parser.add_argument('--parallel', '-p', type=int, default=4,
+                       help='Windows fetched at once, useful when backfilling (default: 4)')
+    parser.add_argument('--lookback-hours', type=int, default=24,
+                       help='Period to fetch when no cursor exists yet (default: 24)')
+    parser.add_argument('--settle-seconds', type=int, default=120,
+                       help='Leave events newer than this for the next run, as they may not be indexed yet (default: 120)')
+    parser.add_argument('--since',
+                       help='Backfill from this UTC time (YYYY-MM-DDTHH:MM) instead of the cursor')
+    parser.add_argument('--timeout', '-t', type=int, default=120,
+                       help='Per-page request timeout in seconds (default: 120)')
+    parser.add_argument('--compress', choices=available_codecs() + ['off'],
+                       help='Write window files as framed .gz/.zst (default: $SDWAN_COMPRESS or off)')
+
+    try:
+        args = parser.parse_args()
+        configure(os.path.join(args.output_dir, TRACE_FILE_NAME))
+        codec = resolve_codec(args.compress)
+        since_ms = None
+        if args.since:
+            since = datetime.strptime(args.since, '%Y-%m-%dT%H:%M').replace(tzinfo=timezone.utc)
+            since_ms = int(since.timestamp() * 1000)
+        catalog = open_catalog()
+        catalog_run = catalog.begin_run(f"events_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
+                                        'events', args.output_dir) if catalog else None
+
+        with VManageClient.from_env(timeout=args.timeout, pool_size=args.parallel) as client:
+            harvester = EventHarvester(client, args.output_dir,
+                                       window_minutes=args.window_minutes,
+                                       page_size=args.page_size,
+                                       max_windows_in_flight=args.parallel,
+                                       timeout=args.timeout,
+                                       codec=codec,
+                                       catalog_run=catalog_run,
+                                       settle_seconds=args.settle_seconds)
+            summary = harvester.harvest(
+                since_ms=since_ms,
+                lookback_hours=args.lookback_hours,
+                on_window=lambda r: print(f"  {ms_to_iso(r['window'][0])}: {r['events']} events ({r['pages']} pages)")
+            )
+
+        with open(os.path.join(args.output_dir, 'events_harvest_summary.json'), 'w') as f:
+            json.dump(summary, f, indent=2)
+        if catalog:
+            with catalog:
+                catalog.finish_run(catalog_run, status='ok' if not summary['failed_windows'] else 'partial')
+
+        color = Colors.GREEN if not summary['failed_windows'] else Colors.YELLOW
+        print(f"{color}{summary['events']} events from {summary['fetched_windows']}/{summary['windows']} windows "
+              f"in {summary['wall_seconds']}s, cursor at {summary['cursor']}{Colors.END}")
+        for error in summary['errors'][:3]:
+            print(f"  {Colors.RED}• {ms_to_iso(error['window'][0])}: {error['error']}{Colors.END}")
+        sys.exit(0 if not summary['failed_windows'] else 1)
+
+    except KeyboardInterrupt:
+        print(f"\n{Colors.YELLOW}Harvest interrupted by user{Colors.END}")
+        sys.exit(1)
+    except VManageError as e:
+        print(f"\n{Colors.RED}vManage error: {str(e)}{Colors.END}")
+        sys.exit(1)
+    except ValueError as e:
+        print(f"{Colors.RED}Error: {str(e)}{Colors.END}", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""
+SD-WAN Operation File Manifest
+==============================
+
+Persisted (path, size, mtime, hash) manifest for a backup or list
+operation directory. The manifest lives next to the directory as
+<operation_dir>.manifest.json, so later post-checks only re-hash files
+whose size or mtime changed and can report added, removed and changed
+files. Backup archives are verified against the same manifest in a single
+streaming pass per archive.
+
+Author: SD-WAN Automation Team
+Version: 1.0
+"""
+
+import os
+import json
+import hashlib
+import tarfile
+from datetime import datetime
+from fnmatch import fnmatch
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+MANIFEST_VERSION = 1
+HASH_ALGORITHM = 'blake2b'
+HASH_BUFFER_SIZE = 1024 * 1024
+
+def hash_file(filepath, algorithm=HASH_ALGORITHM, buffer_size=HASH_BUFFER_SIZE):
+    """Hash a file with a large reusable read buffer"""
+    digest = hashlib.new(algorithm)
+    buffer = bytearray(buffer_size)
+    view = memoryview(buffer)
+    with open(filepath, 'rb', buffering=0) as f:
+        while True:
+            read = f.readinto(buffer)
+            if not read:
+                break
+            digest.update(view[:read])
+    return digest.hexdigest()
+
+def manifest_path_for(operation_dir):
+    """Return the manifest path stored next to an operation directory"""
+    return os.path.normpath(operation_dir) + '.manifest.json'
+
+def load_manifest(operation_dir, path=None):
+    """Load the manifest for an operation directory, or None if missing or unusable"""
+    path = path or manifest_path_for(operation_dir)
+    try:
+        with open(path, 'r') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get('version') != MANIFEST_VERSION or manifest.get('algorithm') != HASH_ALGORITHM:
+        return None
+    return manifest
+
+def save_manifest(operation_dir, manifest, path=None):
+    """Write the manifest atomically"""
+    path = path or manifest_path_for(operation_dir)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+    return path
+
+def scan_tree(operation_dir):
+    """Yield (relative path, size, mtime_ns) for every file in one os.scandir pass"""
+    root = os.path.normpath(operation_dir)
+    prefix_len = len(root) + 1
+    stack = [root]
+    while stack:
+        current = stack.pop()
+        try:
+            entries = os.scandir(current)
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir():
+                        # Like os.walk, do not descend into symlinked directories
+                        if not entry.is_symlink():
+                            stack.append(entry.path)
+                        continue
+                    stat = entry.stat()
+                except OSError:
+                    # Reported as unreadable by the caller
+                    yield entry.path[prefix_len:], None, None
+                    continue
+                yield entry.path[prefix_len:], stat.st_size, stat.st_mtime_ns
+
+def _hash_or_error(filepath):
+    """Hash a file in a worker, returning (digest, error)"""
+    try:
+        return hash_file(filepath), None
+    except OSError as e:
+        return None, str(e)
+
+def build_manifest(operation_dir, previous=None, force=False, workers=None, include=None):
+    """Build a fresh manifest, re-hashing only files whose size or mtime changed
+
+    The tree is scanned once; changed files are hashed on a thread pool
+    (hashlib releases the GIL while digesting). Returns (manifest, changes)
+    where changes lists added, removed and changed paths, re-hash counts,
+    unreadable files and the newest file mtime seen during the scan.
+    With include, only files whose name matches one of the patterns are listed.
+    """
+    previous_files = (previous or {}).get('files', {})
+    if include:
+        previous_files = {
+            p: v for p, v in previous_files.items() if any(fnmatch(os.path.basename(p), i) for i in include)
+        }
+    old_files = previous_files if not force else {}
+    files = {}
+    changes = {
+        'added': [], 'removed': [], 'changed': [], 'rehashed': 0, 'reused': 0,
+        'errors': [], 'newest_mtime_ns': None
+    }
+    unreadable = set()
+    to_hash = []
+
+    for relpath, size, mtime_ns in scan_tree(operation_dir):
+        if include and not any(fnmatch(os.path.basename(relpath), pattern) for pattern in include):
+            continue
+        if size is None:
+            unreadable.add(relpath)
+            changes['errors'].append(f"{relpath}: cannot stat file")
+            continue
+        if changes['newest_mtime_ns'] is None or mtime_ns > changes['newest_mtime_ns']:
+            changes['newest_mtime_ns'] = mtime_ns
+
+        old = old_files.get(relpath)
+        if old and old[0] == size and old[1] == mtime_ns:
+            files[relpath] = old
+            changes['reused'] += 1
+        else:
+            to_hash.append((relpath, size, mtime_ns, old))
+
+    workers = workers or os.cpu_count() or 1
+    paths = [os.path.join(operation_dir, item[0]) for item in to_hash]
+    if workers > 1 and len(paths) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            digests = list(executor.map(_hash_or_error, paths))
+    else:
+        digests = [_hash_or_error(path) for path in paths]
+
+    for (relpath, size, mtime_ns, old), (digest, error) in zip(to_hash, digests):
+        if error:
+            unreadable.add(relpath)
+            changes['errors'].append(f"{relpath}: {error}")
+            continue
+        changes['rehashed'] += 1
+        files[relpath] = [size, mtime_ns, digest]
+
+        if old is None:
+            changes['added'].append(relpath)
+        elif old[2] != digest:
+            changes['changed'].append(relpath)
+
+    if previous and not force:
+        changes['removed'] = sorted(set(old_files) - set(files) - unreadable)
+    elif previous:
+        changes['added'] = sorted(set(files) - set(previous_files))
+        changes['removed'] = sorted(set(previous_files) - set(files) - unreadable)
+        changes['changed'] = sorted(p for p in files if p in previous_files and previous_files[p][2] != files[p][2])
+
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'algorithm': HASH_ALGORITHM,
+        'operation_dir': os.path.normpath(operation_dir),
+        'generated': datetime.now().isoformat(),
+        'files': files
+    }
+    return manifest, changes
+
+def match_member(name, expected):
+    """Map an archive member name onto a manifest path by trimming leading components"""
+    # Drop './' prefixes as whole components; lstrip('./') would also eat a dotfile's dot
+    while name.startswith('./'):
+        name = name[2:]
+    parts = name.lstrip('/').split('/')
+    for i in range(len(parts)):
+        candidate = '/'.join(parts[i:])
+        for path in (candidate, f"data/{candidate}"):
+            if path in expected:
+                return path
+    return None
+
+def verify_archive(archive_path, expected, buffer_size=HASH_BUFFER_SIZE):
+    """Stream every member of a .tar.gz once, hashing it and comparing with expected
+
+    expected maps manifest paths to (size, hash). Members that do not map onto
+    a manifest path are counted as unmatched rather than failures.
+    """
+    result = {
+        'archive': archive_path,
+        'files': 0,
+        'bytes': 0,
+        'verified': 0,
+        'unmatched': 0,
+        'mismatched': [],
+        'error': None
+    }
+    try:
+        with tarfile.open(archive_path, 'r|gz') as tar:
+            for member in tar:
+                if not member.isfile():
+                    continue
+                result['files'] += 1
+                digest = hashlib.new(HASH_ALGORITHM)
+                member_file = tar.extractfile(member)
+                for chunk in iter(lambda: member_file.read(buffer_size), b''):
+                    digest.update(chunk)
+                    result['bytes'] += len(chunk)
+
+                path = match_member(member.name, expected)
+                if path is None:
+                    result['unmatched'] += 1
+                elif expected[path][0] != member.size or expected[path][1] != digest.hexdigest():
+                    result['mismatched'].append(f"{member.name}: differs from {path}")
+                else:
+                    result['verified'] += 1
+    except (tarfile.TarError, EOFError, OSError, ValueError) as e:
+        result['error'] = f"{type(e).__name__}: {str(e)}"
+    return result
+
+def verify_archives(archive_paths, expected, workers=None):
+    """Verify several archives at once, one process per archive"""
+    workers = min(workers or os.cpu_count() or 1, len(archive_paths))
+    if workers <= 1:
+        return [verify_archive(path, expected) for path in archive_paths]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(verify_archive, archive_paths, [expected] * len(archive_paths)))
@@ -0,0 +1,577 @@
+#!/usr/bin/env python3
+"""
+SD-WAN Resident Job Scheduler
+=============================
+
+Long-running replacement for starting the numbered playbooks from cron,
+which pays Python, Ansible and Jinja start-up plus a vManage login for
+every use case on every interval. It:
+- Runs the collectors in-process (collect_all use cases, events,
+  templates, policy graph, device monitor) over one logged-in session
+  and a warm response cache; template and monitor jobs, which look
+  for changes, use a second session that never reads the cache
+- Takes a job spec per use case: interval, priority, timeout and the
+  requests a job may have in flight (max_concurrency)
+- Caps the jobs hitting vManage at once (--max-jobs), starting due jobs
+  by priority
+- Never starts a job while its previous run is still going; the missed
+  ticks are coalesced into the next run
+- Batches collect jobs that are due together into one collect_all run,
+  so shared endpoints and the inventory are fetched once
+- Records every run with its scheduling lag and runtime in
+  generated/scheduler/job_history.ndjson (see the report command)
+- Still runs a playbook as a job when it has no in-process collector
+- Records a job that raises as failed and keeps scheduling the others
+
+Author: SD-WAN Automation Team
+Version: 1.0
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import signal
+import argparse
+import threading
+import subprocess
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from vmanage_client import VManageClient, VManageError
+from response_cache import ResponseCache
+from tracing import TRACE_FILE_NAME, configure
+from collect_all import USE_CASES, STATS_USE_CASES, CollectAll
+from event_harvester import EventHarvester
+from template_collector import TemplateCollector
+from policy_graph import PolicyGraphBuilder
+from monitor_daemon import DeviceMonitor, running_pid, daemonize
+from stats_store import StatsStore
+from catalog import open_catalog
+
+class Colors:
+    """Color codes for terminal output"""
+    GREEN = '\033[92m'
+    RED = '\033[91m'
+    YELLOW = '\033[93m'
+    BLUE = '\033[94m'
+    CYAN = '\033[96m'
+    WHITE = '\033[97m'
+    BOLD = '\033[1m'
+    END = '\033[0m'
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+HISTORY_FILE = 'job_history.ndjson'
+STATE_FILE = 'scheduler_state.json'
+
+# Per job: numbered use case, runner type, interval and timeout in seconds,
+# priority (lower starts first when slots are short) and requests in flight
+JOBS = {
+    'monitor_devices': {'use_case': 14, 'type': 'monitor', 'interval': 60, 'timeout': 60,
+                        'priority': 0, 'max_concurrency': 4},
+    'control_connections': {'use_case': 40, 'type': 'collect', 'interval': 300, 'timeout': 600,
+                            'priority': 1, 'max_concurrency': 20},
+    'bfd_sessions': {'use_case': 38, 'type': 'collect', 'interval': 300, 'timeout': 600,
+                     'priority': 1, 'max_concurrency': 20},
+    'omp_peers': {'use_case': 39, 'type': 'collect', 'interval': 300, 'timeout': 600,
+                  'priority': 1, 'max_concurrency': 20},
+    'events': {'use_case': 32, 'type': 'events', 'interval': 300, 'timeout': 600,
+               'priority': 1, 'max_concurrency': 4},
+    'tunnel_statistics': {'use_case': 36, 'type': 'collect', 'interval': 900, 'timeout': 900,
+                          'priority': 2, 'max_concurrency': 20},
+    'interface_statistics': {'use_case': 35, 'type': 'collect', 'interval': 900, 'timeout': 900,
+                             'priority': 2, 'max_concurrency': 20},
+    'device_statistics': {'use_case': 34, 'type': 'collect', 'interval': 900, 'timeout': 900,
+                          'priority': 2, 'max_concurrency': 8},
+    'system_info': {'use_case': 41, 'type': 'collect', 'interval': 3600, 'timeout': 900,
+                    'priority': 3, 'max_concurrency': 8},
+    'templates': {'use_case': 19, 'type': 'templates', 'interval': 3600, 'timeout': 1800,
+                  'priority': 3, 'max_concurrency': 16},
+    'policy_graph': {'use_case': 21, 'type': 'policy_graph', 'interval': 3600, 'timeout': 600,
+                     'priority': 3, 'max_concurrency': 8}
+}
+JOB_TYPES = ('collect', 'events', 'templates', 'policy_graph', 'monitor', 'playbook')
+JOB_FIELDS = ('use_case', 'type', 'interval', 'timeout', 'priority', 'max_concurrency',
+              'enabled', 'playbook', 'extra_vars')
+
+def write_json(path, data):
+    """Write JSON atomically so readers never see a partial file"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+def iso(epoch):
+    """Format epoch seconds as a local ISO timestamp"""
+    return datetime.fromtimestamp(epoch).isoformat(timespec='seconds')
+
+def load_jobs(spec_file=None, selected=None):
+    """Return the job specs, with overrides and extra jobs from a JSON spec file"""
+    jobs = {name: dict(spec) for name, spec in JOBS.items()}
+    if spec_file:
+        with open(spec_file, 'r') as f:
+            overrides = json.load(f)
+        for name, spec in overrides.items():
+            unknown = set(spec) - set(JOB_FIELDS)
+            if unknown:
+                raise ValueError(f"Job '{name}': unknown field(s) {', '.join(sorted(unknown))}")
+            jobs[name] = dict(jobs.get(name, {'priority': 5, 'max_concurrency': 8}), **spec)
+
+    for name, spec in list(jobs.items()):
+        if not spec.get('enabled', True) or (selected and name not in selected):
+            del jobs[name]
+            continue
+        if spec.get('type') not in JOB_TYPES:
+            raise ValueError(f"Job '{name}': type must be one of {', '.join(JOB_TYPES)}")
+        if spec['type'] == 'collect' and name not in USE_CASES:
+            raise ValueError(f"Job '{name}': collect jobs are named after a collect_all use case")
+        if spec['type'] == 'playbook' and not spec.get('playbook'):
+            raise ValueError(f"Job '{name}': playbook jobs need a 'playbook' file name")
+        for field in ('interval', 'timeout'):
+            if not isinstance(spec.get(field), (int, float)) or spec[field] <= 0:
+                raise ValueError(f"Job '{name}': {field} must be a positive number of seconds")
+    missing = sorted(set(selected or []) - set(jobs))
+    if missing:
+        raise ValueError(f"Unknown or disabled job(s): {', '.join(missing)}")
+    return jobs
+
+def find_playbook(name, catalog=None):
+    """Return the path of a playbook in the repository"""
+    if catalog:
+        return catalog.find_playbook(name, REPO_DIR)
+    for root, dirs, files in os.walk(REPO_DIR):
+        dirs[:] = [d for d in dirs if not d.startswith('.') and d != 'generated']
+        if name in files:
+            return os.path.join(root, name)
+    return None
+
+# Job types that detect changes and so must not be served cached lists
+FRESH_JOB_TYPES = ('templates', 'monitor')
+
+class JobScheduler:
+    def __init__(self, client, jobs, generated_dir='generated', max_jobs=4, catalog=None, fresh_client=None):
+        self.client = client
+        self.fresh_client = fresh_client or client
+        self.jobs = jobs
+        self.generated_dir = generated_dir
+        self.output_dir = os.path.join(generated_dir, 'scheduler')
+        self.max_jobs = max_jobs
+        self.catalog = catalog
+        self.history_path = os.path.join(self.output_dir, HISTORY_FILE)
+        self.state_path = os.path.join(self.output_dir, STATE_FILE)
+        self.state = {}
+        self.stats = {name: {'runs': 0, 'failed': 0, 'coalesced': 0} for name in jobs}
+        self.started = time.monotonic()
+        # Set on shutdown so a running monitor job ends its poll early
+        self._stop = threading.Event()
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.load_state()
+        for name, spec in self.jobs.items():
+            if spec['type'] == 'playbook':
+                spec['path'] = find_playbook(spec['playbook'], catalog)
+                if not spec['path']:
+                    raise ValueError(f"Job '{name}': playbook {spec['playbook']} not found")
+
+    def load_state(self):
+        """Resume the cadence left by a previous run"""
+        try:
+            with open(self.state_path, 'r') as f:
+                self.state = json.load(f).get('jobs', {})
+        except (OSError, ValueError):
+            self.state = {}
+
+    def save_state(self):
+        """Persist when each job last started so a restart keeps its cadence"""
+        write_json(self.state_path, {'saved': datetime.now().isoformat(), 'jobs': self.state})
+
+    def first_due(self, name):
+        """Return the epoch time a job is first due after start-up"""
+        last = self.state.get(name, {}).get('last_started')
+        # A job that fell due while the scheduler was down is due now, not back then
+        return max(last + self.jobs[name]['interval'], time.time()) if last else time.time()
+
+    def begin_catalog_run(self, kind, label):
+        """Start a catalog run for a collector that records its files"""
+        if not self.catalog:
+            return None
+        return self.catalog.begin_run(f"{label}_{datetime.now().strftime('%Y%m%d_%H%M%S')}", kind, self.generated_dir)
+
+    def run_collect(self, names, catalog_run):
+        """Run several collect_all use cases as one DAG over the shared session"""
+        in_flight = max(self.jobs[name]['max_concurrency'] for name in names)
+        orchestrator = CollectAll(self.client, self.generated_dir, use_cases=names,
+                                  workers=min(8, in_flight), device_in_flight=in_flight,
+                                  catalog_run=catalog_run)
+        summary = orchestrator.run()
+        failed = [node['name'] for node in summary['nodes'] if not node['ok']]
+        status = 'ok' if not failed else ('failed' if not summary['succeeded'] else 'partial')
+        detail = {'steps': len(summary['nodes']), 'failed_steps': failed[:5]}
+        stats_dirs = [orchestrator.use_case_dir(u) for u in names if u in STATS_USE_CASES]
+        if stats_dirs:
+            # The files are collected either way; a store failure only makes the run partial
+            try:
+                with StatsStore() as store:
+                    store.ingest(stats_dirs)
+            except Exception as e:
+                status = 'partial' if status == 'ok' else status
+                detail['error'] = f"Stats store: {str(e)}"
+        return status, detail
+
+    def run_events(self, name, catalog_run):
+        harvester = EventHarvester(self.client, self.generated_dir,
+                                   max_windows_in_flight=self.jobs[name]['max_concurrency'],
+                                   catalog_run=catalog_run)
+        summary = harvester.harvest()
+        return ('ok' if not summary['failed_windows'] else 'partial'), {
+            'events': summary['events'], 'windows': summary['fetched_windows'], 'cursor': summary['cursor']}
+
+    def run_templates(self, name, catalog_run):
+        collector = TemplateCollector(self.fresh_client, self.generated_dir,
+                                      max_in_flight=self.jobs[name]['max_concurrency'],
+                                      catalog_run=catalog_run)
+        changeset = collector.run()
+        return ('ok' if not changeset['failed'] else 'partial'), {
+            'changes': len(changeset['changes']), 'failed': len(changeset['failed'])}
+
+    def run_policy_graph(self, name, catalog_run):
+        builder = PolicyGraphBuilder(self.client, os.path.join(self.generated_dir, 'policy_graph'),
+                                     workers=self.jobs[name]['max_concurrency'])
+        graph, sources = builder.build()
+        summary = builder.save(graph, sources)
+        failed = [source for source, status in sources.items() if status.get('error')]
+        return ('ok' if not failed else 'partial'), {'edges': summary['edges'], 'failed_sources': failed}
+
+    def run_monitor(self, name, catalog_run):
+        monitor = DeviceMonitor(self.fresh_client, os.path.join(self.generated_dir, 'monitoring'),
+                                workers=self.jobs[name]['max_concurrency'],
+                                timeout=min(30, self.jobs[name]['timeout']))
+        summary = monitor.run(self._stop, once=True)
+        changes = sum(stats['changes'] for stats in summary['watches'].values())
+        return ('ok' if not summary['failing'] else 'partial'), {'devices': summary['devices'], 'changes': changes}
+
+    def run_playbook(self, name, catalog_run):
+        """Run a playbook that has no in-process collector, killing it at its timeout"""
+        spec = self.jobs[name]
+        command = ['ansible-playbook', spec['path']]
+        if spec.get('extra_vars'):
+            command += ['-e', json.dumps(spec['extra_vars'])]
+        try:
+            result = subprocess.run(command, capture_output=True, text=True, timeout=spec['timeout'],
+                                    cwd=os.path.dirname(spec['path']))
+        except subprocess.TimeoutExpired:
+            return 'timeout', {'error': f"Killed after {spec['timeout']}s"}
+        except OSError as e:
+            return 'failed', {'error': str(e)}
+        tail = result.stdout.strip().splitlines()[-1:] or result.stderr.strip().splitlines()[-1:]
+        return ('ok' if result.returncode == 0 else 'failed'), {'returncode': result.returncode, 'output': tail}
+
+    def execute(self, names, catalog_run):
+        """Run one batch in a worker thread; returns (status, detail, error, runtime)"""
+        start = time.monotonic()
+        spec = self.jobs[names[0]]
+        try:
+            if spec['type'] == 'collect':
+                status, detail = self.run_collect(names, catalog_run)
+            else:
+                status, detail = getattr(self, f"run_{spec['type']}")(names[0], catalog_run)
+            error = detail.pop('error', None)
+        except Exception as e:
+            # Whatever a job raises, the scheduler records it and keeps running the others
+            status, detail, error = 'failed', {}, f"{type(e).__name__}: {str(e)}"
+        runtime = time.monotonic() - start
+        # In-process collectors cannot be killed; a run past its timeout is reported as such
+        if status != 'failed' and runtime > max(self.jobs[n]['timeout'] for n in names):
+            status = 'timeout'
+        return status, detail, error, runtime
+
+    def record(self, batch, outcome):
+        """Append one history line per job in a finished batch"""
+        status, detail, error, runtime = outcome
+        finished = time.time()
+        lines = []
+        for name in batch['names']:
+            due, coalesced = batch['due'][name], batch['coalesced'][name]
+            entry = {
+                'job': name,
+                'type': self.jobs[name]['type'],
+                'use_case': self.jobs[name].get('use_case'),
+                'due': iso(due),
+                'started': iso(batch['started']),
+                'finished': iso(finished),
+                'lag_seconds': round(batch['started'] - due, 3),
+                'runtime_seconds': round(runtime, 3),
+                'status': status,
+                'error': error,
+                'coalesced': coalesced,
+                'batch': batch['names'] if len(batch['names']) > 1 else None,
+                'detail': detail
+            }
+            lines.append(json.dumps(entry, separators=(',', ':')))
+            self.stats[name]['runs'] += 1
+            self.stats[name]['failed'] += status != 'ok'
+            self.state[name] = {'last_started': batch['started'], 'last_status': status,
+                                'last_runtime': entry['runtime_seconds']}
+        with open(self.history_path, 'a') as f:
+            f.write('\n'.join(lines) + '\n')
+        self.save_state()
+
+    def complete(self, batch, outcome, on_finish=None):
+        """Store a finished batch's catalog run and history"""
+        # The catalog connection belongs to the scheduler thread, so runs are stored here
+        if batch['catalog_run']:
+            try:
+                self.catalog.finish_run(batch['catalog_run'], status='ok' if outcome[0] == 'ok' else 'partial')
+            except Exception as e:
+                outcome[1]['catalog_error'] = str(e)
+        try:
+            self.record(batch, outcome)
+        except OSError as e:
+            print(f"{Colors.RED}Could not record {'+'.join(batch['names'])}: {str(e)}{Colors.END}",
+                  file=sys.stderr, flush=True)
+        if on_finish:
+            on_finish(batch, outcome)
+
+    def pick(self, due, running_names, now):
+        """Return the next batch of due jobs by priority, or None"""
+        ready = sorted((name for name in self.jobs if due[name] <= now and name not in running_names),
+                       key=lambda name: (self.jobs[name]['priority'], due[name], name))
+        if not ready:
+            return None
+        names = [ready[0]]
+        if self.jobs[ready[0]]['type'] == 'collect':
+            names += [name for name in ready[1:] if self.jobs[name]['type'] == 'collect']
+        return names
+
+    def run(self, stop, once=False, on_finish=None):
+        """Start due jobs with at most max_jobs running until stop is set (or each once)"""
+        due = {name: time.time() if once else self.first_due(name) for name in self.jobs}
+        finished_once = set()
+
+        with ThreadPoolExecutor(max_workers=self.max_jobs) as executor:
+            running = {}
+            while not stop.is_set():
+                now = time.time()
+                running_names = {name for batch in running.values() for name in batch['names']}
+                # A job still running when its next tick arrives absorbs that tick instead of overlapping
+                for name in running_names:
+                    if due[name] <= now:
+                        missed = math.floor((now - due[name]) / self.jobs[name]['interval']) + 1
+                        due[name] += missed * self.jobs[name]['interval']
+                        self.stats[name]['coalesced'] += missed
+                        owner = next(b for b in running.values() if name in b['names'])
+                        owner['coalesced'][name] += missed
+
+                while len(running) < self.max_jobs:
+                    names = self.pick(due, running_names | (finished_once if once else set()), now)
+                    if not names:
+                        break
+                    kind = self.jobs[names[0]]['type']
+                    label = 'scheduler_' + ('collect' if kind == 'collect' else names[0])
+                    catalog_run = self.begin_catalog_run(
+                        {'collect': 'collect', 'events': 'events', 'templates': 'templates'}.get(kind), label
+                    ) if kind in ('collect', 'events', 'templates') else None
+                    batch = {'names': names, 'started': now, 'catalog_run': catalog_run,
+                             'due': {n: due[n] for n in names}, 'coalesced': {n: 0 for n in names}}
+                    for name in names:
+                        due[name] += self.jobs[name]['interval']
+                        if due[name] <= now:
+                            # Started late by more than an interval: skip the ticks instead of catching up
+                            missed = math.floor((now - due[name]) / self.jobs[name]['interval']) + 1
+                            due[name] += missed * self.jobs[name]['interval']
+                            batch['coalesced'][name] += missed
+                            self.stats[name]['coalesced'] += missed
+                    running[executor.submit(self.execute, names, catalog_run)] = batch
+                    running_names.update(names)
+
+                if not running:
+                    if once and finished_once >= set(self.jobs):
+                        break
+                    stop.wait(max(min(due.values()) - time.time(), 0.05))
+                    continue
+
+                idle = [due[name] for name in self.jobs if name not in running_names]
+                timeout = max(min(idle) - time.time(), 0.05) if idle and len(running) < self.max_jobs else None
+                done, _ = wait(running, timeout=timeout if timeout is not None else 1.0,
+                               return_when=FIRST_COMPLETED)
+                for future in done:
+                    batch = running.pop(future)
+                    self.complete(batch, future.result(), on_finish)
+                    finished_once.update(batch['names'])
+
+            self._stop.set()
+            for future, batch in running.items():
+                self.complete(batch, future.result(), on_finish)
+
+        summary = self.summary()
+        write_json(os.path.join(self.output_dir, 'scheduler_summary.json'), summary)
+        return summary
+
+    def summary(self):
+        """Return counters for the summary file"""
+        return {
+            'timestamp': datetime.now().isoformat(),
+            'uptime_seconds': round(time.monotonic() - self.started, 3),
+            'max_jobs': self.max_jobs,
+            'jobs': self.stats,
+            'failed': sorted(name for name, stats in self.stats.items() if stats['failed']),
+            'rate_limiter': self.client.limiter.stats() if self.client.limiter else None
+        }
+
+def percentile(values, fraction):
+    """Return the value at a fraction of the sorted values (nearest rank)"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))]
+
+def load_history(path, job=None, last=None):
+    """Read history entries grouped by job, keeping the newest `last` of each"""
+    history = {}
+    try:
+        with open(path, 'r') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if job and entry['job'] != job:
+                    continue
+                history.setdefault(entry['job'], []).append(entry)
+    except FileNotFoundError:
+        return {}
+    return {name: entries[-last:] if last else entries for name, entries in history.items()}
+
+def print_report(history):
+    """Print runs, lag and runtime per job"""
+    print(f"{Colors.BOLD}{'job':<22} {'runs':>5} {'fail':>5} {'lag p50':>8} {'lag p95':>8} {'lag max':>8} "
+          f"{'run p50':>8} {'run max':>8}  last{Colors.END}")
+    for name, entries in sorted(history.items()):
+        lags = [e['lag_seconds'] for e in entries]
+        runtimes = [e['runtime_seconds'] for e in entries]
+        failed = sum(1 for e in entries if e['status'] != 'ok')
+        color = Colors.GREEN if entries[-1]['status'] == 'ok' else Colors.RED
+        print(f"{name:<22} {len(entries):>5} {failed:>5} {percentile(lags, 0.5):>8.1f} {percentile(lags, 0.95):>8.1f} "
+              f"{max(lags):>8.1f} {percentile(runtimes, 0.5):>8.1f} {max(runtimes):>8.1f}  "
+              f"{color}{entries[-1]['status']}{Colors.END} {entries[-1]['finished']}")
+
+def print_finish(batch, outcome):
+    """Print one finished batch"""
+    status, detail, error, runtime = outcome
+    color = {'ok': Colors.GREEN, 'partial': Colors.YELLOW}.get(status, Colors.RED)
+    lag = max(batch['started'] - due for due in batch['due'].values())
+    print(f"{datetime.now().isoformat(timespec='seconds')} {color}{status}{Colors.END} "
+          f"{'+'.join(batch['names'])} {runtime:.1f}s (lag {lag:.1f}s) {error or ''}".rstrip(), flush=True)
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='SD-WAN Resident Job Scheduler')
+    parser.add_argument('--generated-dir', '-d', default='generated',
+                       help='Output root shared with the playbooks (default: generated)')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='Run jobs on their intervals until stopped')
+    run_parser.add_argument('--jobs', metavar='FILE',
+                            help='JSON job specs overriding or adding to the built-in jobs')
+    run_parser.add_argument('--job', action='append',
+                            help='Only run this job (repeatable, default: all enabled jobs)')
+    run_parser.add_argument('--max-jobs', '-j', type=int, default=4,
+                            help='Jobs hitting vManage at once (default: 4)')
+    run_parser.add_argument('--timeout', '-t', type=int, default=60,
+                            help='Per-request timeout in seconds (default: 60)')
+    run_parser.add_argument('--once', action='store_true',
+                            help='Run every job once, by priority and within --max-jobs, then exit')
+    run_parser.add_argument('--duration', type=float,
+                            help='Stop after this many seconds')
+    run_parser.add_argument('--pid-file',
+                            help='Exit quietly if the scheduler recorded here is already running')
+    run_parser.add_argument('--detach', action='store_true',
+                            help='Run in the background, logging to scheduler.log in generated/scheduler')
+
+    report_parser = subparsers.add_parser('report', help='Show run counts, scheduling lag and runtimes per job')
+    report_parser.add_argument('--job', help='Only this job')
+    report_parser.add_argument('--last', type=int, help='Only the newest N runs of each job')
+
+    jobs_parser = subparsers.add_parser('jobs', help='List the job specs')
+    jobs_parser.add_argument('--jobs', metavar='FILE', help='JSON job specs to merge in')
+
+    try:
+        args = parser.parse_args()
+        output_dir = os.path.join(args.generated_dir, 'scheduler')
+
+        if args.command == 'report':
+            history = load_history(os.path.join(output_dir, HISTORY_FILE), job=args.job, last=args.last)
+            if not history:
+                print(f"{Colors.YELLOW}No job history in {output_dir}{Colors.END}")
+                sys.exit(1)
+            print_report(history)
+            sys.exit(0)
+
+        if args.command == 'jobs':
+            for name, spec in sorted(load_jobs(args.jobs).items(), key=lambda item: (item[1]['priority'], item[0])):
+                print(f"  {name:<22} {spec['type']:<12} every {spec['interval']:>5}s  timeout {spec['timeout']:>5}s  "
+                      f"priority {spec['priority']}  in flight {spec['max_concurrency']}")
+            sys.exit(0)
+
+        jobs = load_jobs(args.jobs, selected=args.job)
+        os.makedirs(output_dir, exist_ok=True)
+        if args.pid_file:
+            pid = running_pid(args.pid_file)
+            if pid:
+                print(f"{Colors.CYAN}Scheduler already running (pid {pid}){Colors.END}")
+                sys.exit(0)
+        if args.detach:
+            daemonize(os.path.join(output_dir, 'scheduler.log'))
+        if args.pid_file:
+            with open(args.pid_file, 'w') as f:
+                f.write(f"{os.getpid()}\n")
+
+        stop = threading.Event()
+        signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+        signal.signal(signal.SIGINT, lambda signum, frame: stop.set())
+        if args.duration:
+            timer = threading.Timer(args.duration, stop.set)
+            timer.daemon = True
+            timer.start()
+
+        configure(os.path.join(output_dir, TRACE_FILE_NAME))
+        catalog = open_catalog()
+        pool_size = args.max_jobs * max(spec['max_concurrency'] for spec in jobs.values())
+        fresh_client = None
+        try:
+            # Change detection needs live lists: those jobs get a session that only writes the cache
+            if any(spec['type'] in FRESH_JOB_TYPES for spec in jobs.values()):
+                fresh_client = VManageClient.from_env(timeout=args.timeout, pool_size=pool_size,
+                                                      cache=ResponseCache.from_env(bypass=True))
+            # One login and one connection pool serve every other job for the life of the scheduler
+            with VManageClient.from_env(timeout=args.timeout, pool_size=pool_size) as client:
+                scheduler = JobScheduler(client, jobs, args.generated_dir, max_jobs=args.max_jobs,
+                                         catalog=catalog, fresh_client=fresh_client)
+                print(f"{Colors.BLUE}Scheduling {len(jobs)} jobs on {client.host}, "
+                      f"{args.max_jobs} at a time{Colors.END}", flush=True)
+                summary = scheduler.run(stop, once=args.once, on_finish=print_finish)
+        finally:
+            stop.set()
+            if fresh_client:
+                fresh_client.close()
+            if catalog:
+                catalog.close()
+            if args.pid_file and running_pid(args.pid_file) == os.getpid():
+                os.remove(args.pid_file)
+
+        runs = sum(stats['runs'] for stats in summary['jobs'].values())
+        color = Colors.GREEN if not summary['failed'] else Colors.YELLOW
+        print(f"\n{color}{runs} job runs in {summary['uptime_seconds']:.0f}s"
+              f"{', not ok: ' + ', '.join(summary['failed']) if summary['failed'] else ''}{Colors.END}")
+        sys.exit(0 if not summary['failed'] else 1)
+
+    except KeyboardInterrupt:
+        print(f"\n{Colors.YELLOW}Scheduler interrupted by user{Colors.END}")
+        sys.exit(1)
+    except ValueError as e:
+        print(f"{Colors.RED}Error: {str(e)}{Colors.END}", file=sys.stderr)
+        sys.exit(1)
+    except VManageError as e:
+        print(f"\n{Colors.RED}vManage error: {str(e)}{Colors.END}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,935 @@
+#!/usr/bin/env python3
+"""
+SD-WAN Mock vManage Server
+==========================
+
+Local stand-in for the vManage dataservice API so collection speed can be
+measured and regression-tested offline. It provides:
+- Session login (j_security_check, client/token, logout)
+- Inventory, BFD, tunnel, interface, OMP, control-connection and event endpoints
+- Generic per-device records for any other /dataservice/device/* path
+- Template endpoints, with optional template churn over time
+- Policy lists, definitions and policies that reference each other
+- Synthetic fabrics of 100 to 20,000+ devices, generated deterministically from a seed
+- Configurable latency, jitter, error injection and a concurrency limit (HTTP 429)
+
+Large responses are streamed with chunked encoding, so a 20,000-device
+fabric is served without building whole documents in memory. Point the
+collectors at it with VMANAGE_HOST=127.0.0.1 and VMANAGE_PORT=<port>;
+the `generate` command writes the same fixtures to disk instead.
+
+Author: SD-WAN Automation Team
+Version: 1.0
+"""
+
+import os
+import re
+import sys
+import ssl
+import json
+import time
+import random
+import shutil
+import argparse
+import secrets
+import tempfile
+import threading
+import subprocess
+from urllib.parse import urlsplit, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+class Colors:
+    """Color codes for terminal output"""
+    GREEN = '\033[92m'
+    RED = '\033[91m'
+    YELLOW = '\033[93m'
+    BLUE = '\033[94m'
+    CYAN = '\033[96m'
+    WHITE = '\033[97m'
+    BOLD = '\033[1m'
+    END = '\033[0m'
+
+LOGIN_PAGE = (b'<html><head><title>Cisco vManage</title></head><body>'
+              b'<form method="POST" action="j_security_check"></form></body></html>')
+COLORS = ['mpls', 'biz-internet', 'public-internet', 'lte']
+VERSION = '20.9.3'
+DAY_MS = 24 * 3600 * 1000
+
+class Fabric:
+    """Deterministic synthetic SD-WAN fabric"""
+
+    def __init__(self, devices=100, seed=1, sessions_per_device=4, interfaces_per_device=3,
+                 events_per_device=10, templates=20, policies=10, template_churn=0):
+        self.seed = seed
+        self.sessions_per_device = sessions_per_device
+        self.interfaces_per_device = interfaces_per_device
+        self.templates = templates
+        self.policies = policies
+        self.template_churn = template_churn
+        self.started_ms = int(time.time() * 1000)
+        # Events are evenly spaced, starting one day before the server started and continuing
+        self.event_origin_ms = self.started_ms - DAY_MS
+        self.event_interval_ms = max(DAY_MS // max(devices * events_per_device, 1), 1)
+
+        controllers = max(devices // 200, 1)
+        self.devices = []
+        for index in range(devices):
+            if index == 0:
+                device_type, model = 'vmanage', 'vmanage'
+            elif index <= controllers:
+                device_type, model = 'vsmart', 'vsmart'
+            elif index <= 2 * controllers:
+                device_type, model = 'vbond', 'vedge-cloud'
+            else:
+                device_type, model = 'vedge', random.Random(seed + index).choice(['vedge-C8000V', 'vedge-ISR-4331', 'vedge-C1111-8P'])
+            self.devices.append(self.device_record(index, device_type, model))
+        self.by_system_ip = {d['system-ip']: i for i, d in enumerate(self.devices)}
+        self.edges = [i for i, d in enumerate(self.devices) if d['device-type'] == 'vedge']
+        self.edge_position = {index: position for position, index in enumerate(self.edges)}
+        self.vsmarts = [i for i, d in enumerate(self.devices) if d['device-type'] == 'vsmart']
+        self.controllers = [i for i, d in enumerate(self.devices) if d['device-type'] in ('vsmart', 'vmanage')][:4]
+
+    def rng(self, *parts):
+        """Return a random generator seeded by the fabric seed and the given parts"""
+        return random.Random(':'.join(str(part) for part in (self.seed,) + parts))
+
+    def device_record(self, index, device_type, model):
+        """Build one /dataservice/device record"""
+        number = index + 1
+        system_ip = f"10.{number // 65536 % 256}.{number // 256 % 256}.{number % 256}"
+        hostname = f"{device_type}-{number:05d}"
+        return {
+            'deviceId': system_ip,
+            'system-ip': system_ip,
+            'host-name': hostname,
+            'local-system-ip': system_ip,
+            'device-type': device_type,
+            'device-model': model,
+            'personality': device_type,
+            'site-id': str(100 + index // 2 if device_type == 'vedge' else 1),
+            'region-id': str(1 + (index // 2) % 4 if device_type == 'vedge' else 0),
+            'status': 'normal',
+            'reachability': 'reachable',
+            'version': VERSION,
+            'uuid': f"{self.seed:08x}-{number:04x}-4000-8000-{number:012x}",
+            'board-serial': f"SN{self.seed:04d}{number:07d}",
+            'uptime-date': self.started_ms - 86400000 * (1 + index % 30),
+            'lastupdated': self.started_ms
+        }
+
+    def device_index(self, device_id):
+        """Return the index of a device by system IP / deviceId, or None"""
+        return self.by_system_ip.get(device_id)
+
+    def peer(self, index, k):
+        """Return a deterministic BFD/tunnel peer edge for an edge"""
+        return self.edges[(self.edge_position[index] + 7 * (k + 1)) % len(self.edges)]
+
+    def counter(self, base, rate):
+        """Return a monotonically growing counter value"""
+        return int(base + rate * (time.time() * 1000 - self.started_ms + DAY_MS) / 1000)
+
+    def bfd_sessions(self, index):
+        """BFD sessions of one edge"""
+        device = self.devices[index]
+        if device['device-type'] != 'vedge' or len(self.edges) < 2:
+            return []
+        sessions = []
+        for k in range(self.sessions_per_device):
+            peer = self.devices[self.peer(index, k)]
+            rng = self.rng('bfd', index, k)
+            up = rng.random() > 0.02
+            sessions.append({
+                'vdevice-name': device['system-ip'],
+                'system-ip': device['system-ip'],
+                'hostname': device['host-name'],
+                'site-id': device['site-id'],
+                'remote-system-ip': peer['system-ip'],
+                'local-color': COLORS[k % len(COLORS)],
+                'remote-color': COLORS[(k + index) % len(COLORS)],
+                'src-ip': f"192.0.{index % 256}.{k + 1}",
+                'dst-ip': f"198.51.{self.by_system_ip[peer['system-ip']] % 256}.{k + 1}",
+                'src-port': 12346,
+                'dst-port': 12346,
+                'proto': 'ipsec',
+                'detect-multiplier': 7,
+                'tx-interval': 1000,
+                'rx-interval': 1000,
+                'state': 'up' if up else 'down',
+                'transitions': rng.randint(0, 12),
+                'tx-packets': self.counter(rng.randint(10 ** 5, 10 ** 6), 1),
+                'rx-packets': self.counter(rng.randint(10 ** 5, 10 ** 6), 1),
+                'uptime': f"{rng.randint(0, 40)}:{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}",
+                'downtime': '' if up else 'NA',
+                'last-failure-reason': 'NA',
+                'lastupdated': int(time.time() * 1000)
+            })
+        return sessions
+
+    def bfd_summary(self, index):
+        """BFD summary of one edge"""
+        sessions = self.bfd_sessions(index)
+        if not sessions:
+            return []
+        device = self.devices[index]
+        up = sum(1 for s in sessions if s['state'] == 'up')
+        return [{
+            'system-ip': device['system-ip'],
+            'hostname': device['host-name'],
+            'site-id': device['site-id'],
+            'sessions-total': len(sessions),
+            'sessions-up': up,
+            'sessions-down': len(sessions) - up,
+            'sessions-flap': sum(s['transitions'] for s in sessions),
+            'percentage-up': round(100.0 * up / len(sessions), 1),
+            'lastupdated': int(time.time() * 1000),
+            'entry_time': int(time.time() * 1000)
+        }]
+
+    def bfd_history(self, index):
+        """BFD state-change history of one edge"""
+        history = []
+        for session in self.bfd_sessions(index):
+            for event in range(session['transitions'] % 3):
+                history.append(dict(session, **{
+                    'event': 'down' if event % 2 == 0 else 'up',
+                    'event-time': self.started_ms - (event + 1) * 3600000,
+                    'state': 'down' if event % 2 == 0 else 'up'
+                }))
+        return history
+
+    def bfd_links(self, index):
+        """BFD TLOC links of one edge"""
+        links = []
+        for session in self.bfd_sessions(index):
+            rng = self.rng('link', index, session['local-color'])
+            links.append(dict(
+                {k: session[k] for k in ('system-ip', 'hostname', 'site-id', 'remote-system-ip', 'remote-color', 'state')},
+                **{
+                    'interface': 'GigabitEthernet1',
+                    'public-ip': session['src-ip'], 'public-port': 12346,
+                    'private-ip': session['src-ip'], 'private-port': 12346,
+                    'color': session['local-color'],
+                    'admin-state': 'up', 'oper-state': session['state'],
+                    'remote-public-ip': session['dst-ip'], 'remote-public-port': 12346,
+                    'protocol': 'ipsec', 'encap': 'ipsec',
+                    'loss-percentage': round(rng.random() * 2, 2),
+                    'latency': rng.randint(5, 120), 'jitter': rng.randint(0, 20),
+                    'tx-bandwidth': rng.randint(10, 1000), 'rx-bandwidth': rng.randint(10, 1000),
+                    'quality': rng.choice(['good', 'good', 'good', 'fair', 'poor'])
+                }
+            ))
+        return links
+
+    def tunnel_statistics(self, index):
+        """Tunnel statistics of one edge"""
+        stats = []
+        for session in self.bfd_sessions(index):
+            rng = self.rng('tunnel', index, session['local-color'], session['remote-system-ip'])
+            stats.append({
+                'vdevice-name': session['system-ip'],
+                'vdevice-host-name': session['hostname'],
+                'system-ip': session['remote-system-ip'],
+                'source-ip': session['src-ip'],
+                'dest-ip': session['dst-ip'],
+                'source-color': session['local-color'],
+                'remote-color': session['remote-color'],
+                'tunnel-protocol': 'IPSEC',
+                'tx_pkts': self.counter(rng.randint(10 ** 6, 10 ** 7), rng.randint(50, 500)),
+                'rx_pkts': self.counter(rng.randint(10 ** 6, 10 ** 7), rng.randint(50, 500)),
+                'tx_octets': self.counter(rng.randint(10 ** 9, 10 ** 10), rng.randint(10 ** 4, 10 ** 5)),
+                'rx_octets': self.counter(rng.randint(10 ** 9, 10 ** 10), rng.randint(10 ** 4, 10 ** 5)),
+                'lastupdated': int(time.time() * 1000)
+            })
+        return stats
+
+    def interface_stats(self, index):
+        """Interface statistics of one device"""
+        device = self.devices[index]
+        stats = []
+        for k in range(self.interfaces_per_device):
+            rng = self.rng('interface', index, k)
+            stats.append({
+                'vdevice-name': device['system-ip'],
+                'vdevice-host-name': device['host-name'],
+                'ifname': f"GigabitEthernet{k + 1}",
+                'vpn-id': '0' if k == 0 else str(k * 10),
+                'admin-status': 'if-state-up',
+                'oper-status': 'if-oper-state-ready' if rng.random() > 0.03 else 'if-oper-state-down',
+                'rx-packets': self.counter(rng.randint(10 ** 6, 10 ** 8), rng.randint(100, 5000)),
+                'tx-packets': self.counter(rng.randint(10 ** 6, 10 ** 8), rng.randint(100, 5000)),
+                'rx-octets': self.counter(rng.randint(10 ** 9, 10 ** 11), rng.randint(10 ** 5, 10 ** 6)),
+                'tx-octets': self.counter(rng.randint(10 ** 9, 10 ** 11), rng.randint(10 ** 5, 10 ** 6)),
+                'rx-errors': rng.randint(0, 10),
+                'tx-errors': rng.randint(0, 10),
+                'lastupdated': int(time.time() * 1000)
+            })
+        return stats
+
+    def system_info(self, index):
+        """System status of one device"""
+        device = self.devices[index]
+        rng = self.rng('system', index, int(time.time() // 60))
+        return [{
+            'vdevice-name': device['system-ip'],
+            'vdevice-host-name': device['host-name'],
+            'system-ip': device['system-ip'],
+            'version': VERSION,
+            'cpu_user': round(rng.random() * 40, 2),
+            'cpu_system': round(rng.random() * 10, 2),
+            'mem_used': rng.randint(2 * 10 ** 9, 6 * 10 ** 9),
+            'mem_total': 8 * 10 ** 9,
+            'disk_used': rng.randint(10 ** 9, 5 * 10 ** 9),
+            'uptime': device['uptime-date'],
+            'lastupdated': int(time.time() * 1000)
+        }]
+
+    def omp_peers(self, index):
+        """OMP peers of one device"""
+        device = self.devices[index]
+        if device['device-type'] == 'vedge':
+            # Each edge peers with two vSmarts, like a typical redundant overlay
+            peers = [self.vsmarts[(index + j) % len(self.vsmarts)] for j in range(min(2, len(self.vsmarts)))]
+        else:
+            peers = self.edges[:50] if device['device-type'] == 'vsmart' else []
+        return [{
+            'vdevice-name': device['system-ip'],
+            'vdevice-host-name': device['host-name'],
+            'peer': self.devices[p]['system-ip'],
+            'type': self.devices[p]['device-type'],
+            'domain-id': '1',
+            'site-id': self.devices[p]['site-id'],
+            'state': 'up',
+            'up-time': '7:01:02:03',
+            'routes-received': self.rng('omp', index, p).randint(10, 500),
+            'routes-installed': self.rng('omp', index, p).randint(5, 250)
+        } for p in peers]
+
+    def control_connections(self, index):
+        """Control connections of one device"""
+        device = self.devices[index]
+        if device['device-type'] != 'vedge':
+            return []
+        return [{
+            'vdevice-name': device['system-ip'],
+            'vdevice-host-name': device['host-name'],
+            'peer-type': self.devices[c]['device-type'],
+            'system-ip': self.devices[c]['system-ip'],
+            'local-color': COLORS[0],
+            'remote-color': 'default',
+            'protocol': 'dtls',
+            'state': 'up',
+            'uptime': '7:01:02:03'
+        } for c in self.controllers]
+
+    def generic_stats(self, index, path):
+        """One generic statistics record per device for endpoints without a dedicated generator"""
+        device = self.devices[index]
+        rng = self.rng(path, index)
+        return [{
+            'vdevice-name': device['system-ip'],
+            'vdevice-host-name': device['host-name'],
+            'system-ip': device['system-ip'],
+            'status': 'up',
+            'value': rng.randint(0, 100),
+            'count': self.counter(rng.randint(10 ** 3, 10 ** 6), rng.randint(1, 100)),
+            'lastupdated': int(time.time() * 1000)
+        }]
+
+    def event(self, number):
+        """Return event number `number` in the evenly spaced event stream"""
+        rng = self.rng('event', number)
+        device = self.devices[number % len(self.devices)]
+        return {
+            'id': f"event-{self.seed}-{number}",
+            'entry_time': self.event_origin_ms + number * self.event_interval_ms,
+            'eventname': rng.choice(['bfd-state-change', 'interface-state-change', 'control-connection-state-change', 'omp-peer-state-change']),
+            'severity_level': rng.choice(['minor', 'minor', 'major', 'critical']),
+            'component': rng.choice(['BFD', 'VPN', 'Control', 'OMP']),
+            'host_name': device['host-name'],
+            'system_ip': device['system-ip'],
+            'details': 'new-state=up' if rng.random() > 0.3 else 'new-state=down'
+        }
+
+    def event_range(self, start_ms, end_ms):
+        """Return the (first, last+1) event numbers with start_ms <= entry_time <= end_ms"""
+        now_ms = int(time.time() * 1000)
+        end_ms = min(end_ms, now_ms)
+        first = max(0, -(-(start_ms - self.event_origin_ms) // self.event_interval_ms))
+        last = max(first, (end_ms - self.event_origin_ms) // self.event_interval_ms + 1)
+        return first, last
+
+    def template_updated(self, kind, k):
+        """Return (lastUpdatedOn, version) of a template; with churn about 1% change every interval"""
+        original = self.started_ms - k * 3600000
+        if not self.template_churn:
+            return original, 1
+        generation = int((time.time() * 1000 - self.started_ms) // (self.template_churn * 1000))
+        # Template k is updated in every generation h where (h + offset) is a multiple of 100
+        offset = (k * 7919 + len(kind)) % 100
+        latest = generation - (generation + offset) % 100
+        first = 100 - offset if offset else 100
+        if latest < first:
+            return original, 1
+        return self.started_ms + int(latest * self.template_churn * 1000), 2 + (latest - first) // 100
+
+    def template_index(self, template_id):
+        """Return (kind, index) for a template id, or (None, None)"""
+        match = re.match(rf"^(dt|ft)-{self.seed}-(\d+)$", template_id or '')
+        if not match:
+            return None, None
+        kind, k = match.group(1), int(match.group(2))
+        limit = self.templates if kind == 'dt' else self.templates * 3
+        return (kind, k) if k < limit else (None, None)
+
+    def device_templates(self):
+        """Device templates"""
+        return [self.device_template(k) for k in range(self.templates)]
+
+    def device_template(self, k):
+        """One device template summary"""
+        updated, version = self.template_updated('dt', k)
+        return {
+            'templateId': f"dt-{self.seed}-{k:04d}",
+            'templateName': f"DT-EDGE-{k:03d}",
+            'templateDescription': f"Synthetic device template {k}",
+            'deviceType': 'vedge-C8000V',
+            'deviceRole': 'sdwan-edge',
+            'configType': 'template',
+            'factoryDefault': False,
+            'devicesAttached': len(self.edges) // max(self.templates, 1),
+            'templateAttached': 12,
+            'lastUpdatedBy': 'admin',
+            'lastUpdatedOn': updated,
+            'templateVersion': version
+        }
+
+    def device_template_input(self, k):
+        """Variables of one device template, as config/input returns them"""
+        template = self.device_template(k)
+        properties = ['csv-status', 'csv-deviceId', 'csv-deviceIP', 'csv-host-name', '//system/host-name',
+                      '//system/system-ip', '//system/site-id', f"/1/vpn_{k}_if_name/interface/if-name"]
+        return {
+            'header': {
+                'generatedOn': int(time.time() * 1000),
+                'templateId': template['templateId'],
+                'lastUpdatedOn': template['lastUpdatedOn'],
+                'columns': [{'property': p, 'title': p.rsplit('/', 1)[-1], 'dataType': 'string', 'editable': not p.startswith('csv-')}
+                            for p in properties]
+            },
+            'data': [{'templateName': template['templateName'], 'columns': [{'property': p, 'dataType': 'string'} for p in properties]}]
+        }
+
+    def feature_templates(self):
+        """Feature templates"""
+        return [self.feature_template(k) for k in range(self.templates * 3)]
+
+    def feature_template(self, k, definition=False):
+        """One feature template, with its definition as template/feature/object returns it"""
+        kinds = ['cisco_system', 'cisco_vpn', 'cisco_vpn_interface', 'cisco_bfd', 'cisco_omp', 'cisco_logging']
+        updated, version = self.template_updated('ft', k)
+        template = {
+            'templateId': f"ft-{self.seed}-{k:04d}",
+            'templateName': f"FT-{kinds[k % len(kinds)].upper()}-{k:03d}",
+            'templateDescription': f"Synthetic feature template {k}",
+            'templateType': kinds[k % len(kinds)],
+            'deviceType': ['vedge-C8000V'],
+            'factoryDefault': False,
+            'devicesAttached': len(self.edges) // max(self.templates, 1),
+            'attachedMastersCount': 1,
+            'lastUpdatedBy': 'admin',
+            'lastUpdatedOn': updated,
+            'templateVersion': version
+        }
+        if definition:
+            template['templateDefinition'] = {
+                'description': {'vipObjectType': 'object', 'vipType': 'constant', 'vipValue': f"Revision {version}"},
+                'timer': {'vipObjectType': 'object', 'vipType': 'variableName', 'vipVariableName': f"timer_{k}"}
+            }
+        return template
+
+    def policies_of(self, kind):
+        """Policies or policy lists/definitions of one kind"""
+        return [{
+            'policyId': f"{kind}-{self.seed}-{k:04d}",
+            'listId': f"{kind}-{self.seed}-{k:04d}",
+            'definitionId': f"{kind}-{self.seed}-{k:04d}",
+            'name': f"{kind.upper()}-{k:03d}",
+            'policyName': f"{kind.upper()}-{k:03d}",
+            'policyDescription': f"Synthetic {kind} policy {k}",
+            'type': kind,
+            'isPolicyActivated': k == 0,
+            'entries': [{'value': f"10.{k}.0.0/16"}],
+            'lastUpdated': self.started_ms - k * 3600000
+        } for k in range(self.policies)]
+
+    def policy_objects(self):
+        """Policy lists, definitions and policies that reference each other like a real fabric"""
+        if getattr(self, '_policy_objects', None):
+            return self._policy_objects
+        values = {
+            'site': lambda k: {'siteId': str(100 + k)},
+            'vpn': lambda k: {'vpn': str(k + 1)},
+            'prefix': lambda k: {'ipPrefix': f"10.{k % 256}.0.0/16"},
+            'dataprefix': lambda k: {'ipPrefix': f"172.16.{k % 256}.0/24"},
+            'app': lambda k: {'app': f"app-{k}"},
+            'color': lambda k: {'color': ['mpls', 'biz-internet', 'public-internet', 'lte'][k % 4]},
+            'slaClass': lambda k: {'name': f"SLA-{k}", 'latency': str(100 + k), 'loss': '1', 'jitter': '50'},
+            'policer': lambda k: {'burst': '15000', 'rate': str(1000000 * (k + 1)), 'exceed': 'drop'},
+            'community': lambda k: {'community': f"65000:{k}"}
+        }
+        lists = {}
+        for list_type, value in values.items():
+            for k in range(self.policies):
+                list_id = f"list-{list_type}-{self.seed}-{k:04d}"
+                lists[list_id] = {'listId': list_id, 'name': f"{list_type.upper()}-LIST-{k:03d}", 'type': list_type,
+                                  'entries': [value(k)], 'lastUpdated': self.started_ms - k * 3600000,
+                                  'references': [], 'referenceCount': 0}
+
+        # Each definition type matches on, or acts with, lists of these types
+        uses = {
+            'data': ('dataprefix', 'app'), 'control': ('prefix', 'color', 'community'), 'approute': ('app', 'slaClass'),
+            'qosmap': ('policer',), 'acl': ('dataprefix', 'policer'), 'vpnmembershipgroup': ('site', 'vpn')
+        }
+        definitions = {}
+        for definition_type, list_types in uses.items():
+            for k in range(self.policies):
+                rng = self.rng('policy-definition', definition_type, k)
+                definition_id = f"def-{definition_type}-{self.seed}-{k:04d}"
+                # Only the first two thirds of each list type are used, so the rest show up as unused
+                refs = [f"list-{t}-{self.seed}-{rng.randrange(max(self.policies * 2 // 3, 1)):04d}" for t in list_types]
+                if definition_type == 'vpnmembershipgroup':
+                    body = {'definition': {'sites': [{'siteList': refs[0], 'vpnList': [refs[1]]}]}}
+                else:
+                    body = {'sequences': [{
+                        'sequenceId': 10,
+                        'sequenceName': f"seq-{k}",
+                        'baseAction': 'accept',
+                        'match': {'entries': [{'field': 'list', 'ref': ref} for ref in refs[:-1] or refs]},
+                        'actions': [{'type': 'set', 'parameter': [{'field': 'list', 'ref': refs[-1]}]}]
+                    }]}
+                definitions[definition_id] = dict({
+                    'definitionId': definition_id, 'name': f"{definition_type.upper()}-DEF-{k:03d}",
+                    'type': definition_type, 'description': f"Synthetic {definition_type} definition {k}",
+                    'lastUpdated': self.started_ms - k * 3600000, 'references': [], 'referenceCount': 0
+                }, **body)
+                for ref in refs:
+                    lists[ref]['references'].append({'id': definition_id, 'property': 'definitionId'})
+
+        policies = {'vsmart': {}, 'vedge': {}}
+        central_types = ('data', 'control', 'approute', 'vpnmembershipgroup')
+        for kind, definition_types in (('vsmart', central_types), ('vedge', ('acl', 'qosmap'))):
+            for k in range(self.policies):
+                rng = self.rng('policy', kind, k)
+                policy_id = f"policy-{kind}-{self.seed}-{k:04d}"
+                assembly = []
+                for definition_type in definition_types:
+                    definition_id = f"def-{definition_type}-{self.seed}-{rng.randrange(max(self.policies * 2 // 3, 1)):04d}"
+                    entry = {'definitionId': definition_id, 'type': definition_type}
+                    if kind == 'vsmart' and definition_type != 'vpnmembershipgroup':
+                        entry['entries'] = [{'direction': 'service',
+                                             'siteLists': [f"list-site-{self.seed}-{rng.randrange(self.policies):04d}"],
+                                             'vpnLists': [f"list-vpn-{self.seed}-{rng.randrange(self.policies):04d}"]}]
+                    assembly.append(entry)
+                    definitions[definition_id]['references'].append({'id': policy_id, 'property': 'policyId'})
+                    for site_list in [ref for e in entry.get('entries', []) for ref in e['siteLists'] + e['vpnLists']]:
+                        lists[site_list]['references'].append({'id': policy_id, 'property': 'policyId'})
+                policies[kind][policy_id] = {
+                    'policyId': policy_id, 'policyName': f"{kind.upper()}-POLICY-{k:03d}",
+                    'policyDescription': f"Synthetic {kind} policy {k}", 'policyType': 'feature',
+                    'isPolicyActivated': k == 0, 'lastUpdatedOn': self.started_ms - k * 3600000,
+                    'policyDefinition': json.dumps({'assembly': assembly})
+                }
+
+        for item in list(lists.values()) + list(definitions.values()):
+            item['referenceCount'] = len(item['references'])
+        self._policy_objects = {'lists': lists, 'definitions': definitions, 'policies': policies}
+        return self._policy_objects
+
+    def definition_summaries(self, definition_type):
+        """Definitions of one type as the list endpoint returns them, without sequences"""
+        return [{k: v for k, v in d.items() if k not in ('sequences', 'definition')}
+                for d in self.policy_objects()['definitions'].values() if d['type'] == definition_type]
+
+# Per-device endpoints: fabric-wide without deviceId, one device with ?deviceId=
+DEVICE_ENDPOINTS = {
+    '/dataservice/device/bfd/sessions': Fabric.bfd_sessions,
+    '/dataservice/device/bfd/summary': Fabric.bfd_summary,
+    '/dataservice/device/bfd/links': Fabric.bfd_links,
+    '/dataservice/device/bfd/history': Fabric.bfd_history,
+    '/dataservice/device/tunnel/statistics': Fabric.tunnel_statistics,
+    '/dataservice/device/interface/stats': Fabric.interface_stats,
+    '/dataservice/device/interface': Fabric.interface_stats,
+    '/dataservice/device/system/info': Fabric.system_info,
+    '/dataservice/device/system/status': Fabric.system_info,
+    '/dataservice/device/omp/peers': Fabric.omp_peers,
+    '/dataservice/device/control/connections': Fabric.control_connections
+}
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'MockvManage/1.0'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def send_body(self, status, body, content_type='application/json', headers=None):
+        """Send a complete response with a Content-Length"""
+        if isinstance(body, str):
+            body = body.encode()
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_json(self, status, message, headers=None):
+        """Send a vManage-style error document"""
+        error = {'error': {'message': message, 'details': message, 'code': f"MOCK{status}"}}
+        self.send_body(status, json.dumps(error), headers=headers)
+
+    def send_records(self, records, header=None):
+        """Stream {"header": ..., "data": [...]} with chunked encoding"""
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        def chunk(text):
+            data = text.encode()
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+
+        pending = [json.dumps({'header': header or {'generatedOn': int(time.time() * 1000)}})[:-1] + ',"data":[']
+        size = len(pending[0])
+        first = True
+        for record in records:
+            text = json.dumps(record, separators=(',', ':'))
+            pending.append(text if first else ',' + text)
+            size += len(text) + 1
+            first = False
+            if size >= 64 * 1024:
+                chunk(''.join(pending))
+                pending, size = [], 0
+        pending.append(']}')
+        chunk(''.join(pending))
+        self.wfile.write(b"0\r\n\r\n")
+
+    def authenticated(self):
+        """Return True when the request carries a live session cookie"""
+        cookie = self.headers.get('Cookie', '')
+        match = re.search(r'JSESSIONID=([A-Za-z0-9]+)', cookie)
+        return bool(match and match.group(1) in self.server.sessions)
+
+    def inject(self):
+        """Apply latency and error injection; returns True if a response was already sent"""
+        server = self.server
+        delay = server.latency + (random.uniform(-server.jitter, server.jitter) if server.jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+        if server.error_rate and random.random() < server.error_rate:
+            status = random.choice([500, 503])
+            self.send_error_json(status, 'Injected server error', headers={'Retry-After': '1'} if status == 503 else None)
+            return True
+        return False
+
+    def read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        body = self.read_body()
+        if url.path == '/j_security_check':
+            form = parse_qs(body.decode())
+            username = form.get('j_username', [''])[0]
+            password = form.get('j_password', [''])[0]
+            if self.server.username and (username, password) != (self.server.username, self.server.password):
+                # vManage answers a failed login with the login page, not an error status
+                self.send_body(200, LOGIN_PAGE, content_type='text/html')
+                return
+            session_id = secrets.token_hex(16)
+            with self.server.lock:
+                self.server.sessions[session_id] = secrets.token_hex(32)
+            self.send_body(200, b'', content_type='text/html',
+                           headers={'Set-Cookie': f"JSESSIONID={session_id}; Path=/; Secure; HttpOnly"})
+            return
+        self.handle_api(url, body)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == '/logout':
+            self.send_body(200, b'', content_type='text/html')
+            return
+        self.handle_api(url, None)
+
+    def handle_api(self, url, body):
+        """Serve an authenticated /dataservice request"""
+        server = self.server
+        if not url.path.startswith('/dataservice/'):
+            self.send_error_json(404, f"Unknown path {url.path}")
+            return
+        if not self.authenticated():
+            self.send_body(200, LOGIN_PAGE, content_type='text/html')
+            return
+
+        with server.lock:
+            over_limit = server.max_concurrent and server.in_flight >= server.max_concurrent
+            if not over_limit:
+                server.in_flight += 1
+            server.requests += 1
+        if over_limit:
+            self.send_error_json(429, 'Too many concurrent requests', headers={'Retry-After': '1'})
+            return
+        try:
+            if self.inject():
+                return
+            self.route(url.path.rstrip('/'), parse_qs(url.query), body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def route(self, path, query, body):
+        """Dispatch one API path"""
+        fabric = self.server.fabric
+        device_id = query.get('deviceId', [None])[0]
+
+        if path == '/dataservice/client/token':
+            match = re.search(r'JSESSIONID=([A-Za-z0-9]+)', self.headers.get('Cookie', ''))
+            self.send_body(200, self.server.sessions[match.group(1)], content_type='text/plain')
+        elif path == '/dataservice/device':
+            self.send_records(fabric.devices)
+        elif path == '/dataservice/system/device/controllers':
+            self.send_records(d for d in fabric.devices if d['device-type'] != 'vedge')
+        elif path == '/dataservice/system/device/vedges':
+            self.send_records(d for d in fabric.devices if d['device-type'] == 'vedge')
+        elif path.startswith('/dataservice/device/'):
+            generate = DEVICE_ENDPOINTS.get(path, lambda fabric, index: fabric.generic_stats(index, path))
+            if device_id is not None:
+                index = fabric.device_index(device_id)
+                if index is None:
+                    self.send_error_json(400, f"Invalid deviceId {device_id}")
+                    return
+                self.send_records(generate(fabric, index))
+            else:
+                self.send_records(record for index in range(len(fabric.devices)) for record in generate(fabric, index))
+        elif path == '/dataservice/event':
+            first, last = fabric.event_range(fabric.started_ms - DAY_MS, int(time.time() * 1000))
+            self.send_records(fabric.event(n) for n in range(first, last))
+        elif path == '/dataservice/event/page':
+            self.event_page(query, body)
+        elif path == '/dataservice/template/device':
+            self.send_records(fabric.device_templates())
+        elif path == '/dataservice/template/feature':
+            self.send_records(fabric.feature_templates())
+        elif path.startswith('/dataservice/template/device/config/input/'):
+            kind, k = fabric.template_index(path.rsplit('/', 1)[1])
+            if kind != 'dt':
+                self.send_error_json(404, f"Unknown device template {path.rsplit('/', 1)[1]}")
+                return
+            self.send_body(200, json.dumps(fabric.device_template_input(k)))
+        elif path.startswith('/dataservice/template/feature/object/'):
+            kind, k = fabric.template_index(path.rsplit('/', 1)[1])
+            if kind != 'ft':
+                self.send_error_json(404, f"Unknown feature template {path.rsplit('/', 1)[1]}")
+                return
+            self.send_body(200, json.dumps(fabric.feature_template(k, definition=True)))
+        elif path.startswith('/dataservice/template/device/config/attached/'):
+            self.send_records({'deviceIP': fabric.devices[i]['system-ip'], 'host-name': fabric.devices[i]['host-name'],
+                               'uuid': fabric.devices[i]['uuid']} for i in fabric.edges[:100])
+        elif path.rstrip('/') == '/dataservice/template/policy/list':
+            self.send_records(fabric.policy_objects()['lists'].values())
+        elif path.startswith('/dataservice/template/policy/list/'):
+            list_type = path.rsplit('/', 1)[1]
+            self.send_records(l for l in fabric.policy_objects()['lists'].values() if l['type'] == list_type)
+        elif re.match(r'^/dataservice/template/policy/definition/[^/]+/[^/]+$', path):
+            definition = fabric.policy_objects()['definitions'].get(path.rsplit('/', 1)[1])
+            if definition is None:
+                self.send_error_json(404, f"Unknown policy definition {path.rsplit('/', 1)[1]}")
+                return
+            self.send_body(200, json.dumps(definition))
+        elif path.startswith('/dataservice/template/policy/definition/'):
+            self.send_records(fabric.definition_summaries(path.rsplit('/', 1)[1]))
+        elif re.match(r'^/dataservice/template/policy/(vsmart|vedge)/?$', path):
+            self.send_records(fabric.policy_objects()['policies'][path.rstrip('/').rsplit('/', 1)[1]].values())
+        elif re.match(r'^/dataservice/template/policy/(vsmart|vedge)/definition/[^/]+$', path):
+            kind = path.split('/')[4]
+            policy = fabric.policy_objects()['policies'][kind].get(path.rsplit('/', 1)[1])
+            if policy is None:
+                self.send_error_json(404, f"Unknown {kind} policy {path.rsplit('/', 1)[1]}")
+                return
+            self.send_body(200, json.dumps(dict(policy, policyDefinition=json.loads(policy['policyDefinition']))))
+        elif path.startswith('/dataservice/template/policy/'):
+            self.send_records(fabric.policies_of(path.split('/')[4]))
+        else:
+            self.send_error_json(404, f"Unknown path {path}")
+
+    def event_page(self, query, body):
+        """Serve the event scroll API used by event_harvester"""
+        fabric = self.server.fabric
+        scroll_id = query.get('scrollId', [None])[0]
+        try:
+            if scroll_id:
+                first, last, size = (int(part) for part in scroll_id.split('-'))
+            else:
+                request = json.loads(body or b'{}')
+                rule = request['query']['rules'][0]
+                start_ms, end_ms = (int(v) for v in rule['value'])
+                size = int(request.get('size', 1000))
+                first, last = fabric.event_range(start_ms, end_ms)
+        except (ValueError, KeyError, IndexError, TypeError):
+            self.send_error_json(400, 'Invalid event query')
+            return
+
+        page_end = min(first + size, last)
+        more = page_end < last
+        page_info = {'hasMoreData': more, 'count': page_end - first}
+        if more:
+            page_info['scrollId'] = f"{page_end}-{last}-{size}"
+        self.send_records((fabric.event(n) for n in range(first, page_end)), header={'pageInfo': page_info})
+
+class MockVManageServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, fabric, username='admin', password='admin', latency=0.0,
+                 jitter=0.0, error_rate=0.0, max_concurrent=0, verbose=False):
+        super().__init__(address, MockHandler)
+        self.fabric = fabric
+        self.username = username
+        self.password = password
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.max_concurrent = max_concurrent
+        self.verbose = verbose
+        self.sessions = {}
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.requests = 0
+
+    def enable_tls(self, cert_file=None, key_file=None):
+        """Serve HTTPS, generating a throw-away self-signed certificate if none is given"""
+        if not cert_file:
+            cert_dir = tempfile.mkdtemp(prefix='mock_vmanage_')
+            cert_file = os.path.join(cert_dir, 'cert.pem')
+            key_file = os.path.join(cert_dir, 'key.pem')
+            if not shutil.which('openssl'):
+                raise RuntimeError("openssl is needed to generate a certificate (or pass --cert/--key)")
+            subprocess.run(['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '7',
+                            '-subj', '/CN=localhost', '-keyout', key_file, '-out', cert_file],
+                           check=True, capture_output=True)
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(cert_file, key_file)
+        self.socket = context.wrap_socket(self.socket, server_side=True)
+
+def write_fixtures(fabric, output_dir):
+    """Write the fabric's responses to JSON files, one per endpoint"""
+    os.makedirs(output_dir, exist_ok=True)
+    documents = {
+        'device': lambda: fabric.devices,
+        'controllers': lambda: (d for d in fabric.devices if d['device-type'] != 'vedge'),
+        'vedges': lambda: (d for d in fabric.devices if d['device-type'] == 'vedge'),
+        'device_templates': fabric.device_templates,
+        'feature_templates': fabric.feature_templates,
+        'events': lambda: (fabric.event(n) for n in range(*fabric.event_range(fabric.started_ms - DAY_MS, fabric.started_ms)))
+    }
+    for path, generate in DEVICE_ENDPOINTS.items():
+        name = path[len('/dataservice/device/'):].replace('/', '_')
+        documents.setdefault(name, lambda generate=generate: (
+            record for index in range(len(fabric.devices)) for record in generate(fabric, index)))
+
+    written = {}
+    for name, generate in documents.items():
+        path = os.path.join(output_dir, f"{name}.json")
+        count = 0
+        with open(path, 'w') as f:
+            f.write('{"data":[')
+            for count, record in enumerate(generate(), 1):
+                f.write((',' if count > 1 else '') + json.dumps(record, separators=(',', ':')))
+            f.write(']}\n')
+        written[name] = count
+    return written
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='SD-WAN Mock vManage Server')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    for name, help_text in (('serve', 'Run the mock dataservice API'),
+                            ('generate', 'Write fabric fixtures to JSON files')):
+        sub = subparsers.add_parser(name, help=help_text)
+        sub.add_argument('--devices', '-n', type=int, default=100,
+                         help='Devices in the synthetic fabric (default: 100)')
+        sub.add_argument('--seed', type=int, default=1,
+                         help='Seed for the generated fabric (default: 1)')
+        sub.add_argument('--sessions-per-device', type=int, default=4,
+                         help='BFD sessions / tunnels per edge (default: 4)')
+        sub.add_argument('--events-per-device', type=int, default=10,
+                         help='Events per device per day (default: 10)')
+        sub.add_argument('--templates', type=int, default=20,
+                         help='Device templates; three feature templates are generated per device template (default: 20)')
+        sub.add_argument('--policies', type=int, default=10,
+                         help='Policies, definitions and lists generated per type (default: 10)')
+
+    serve = subparsers.choices['serve']
+    serve.add_argument('--bind', default='127.0.0.1', help='Address to listen on (default: 127.0.0.1)')
+    serve.add_argument('--port', '-p', type=int, default=8443, help='Port to listen on (default: 8443)')
+    serve.add_argument('--username', default='admin', help='Accepted username (default: admin)')
+    serve.add_argument('--password', default='admin', help='Accepted password (default: admin)')
+    serve.add_argument('--latency-ms', type=float, default=0.0, help='Added latency per API request')
+    serve.add_argument('--jitter-ms', type=float, default=0.0, help='Random +/- jitter on the latency')
+    serve.add_argument('--error-rate', type=float, default=0.0,
+                       help='Fraction of API requests answered with HTTP 500/503 (default: 0)')
+    serve.add_argument('--max-concurrent', type=int, default=0,
+                       help='Answer HTTP 429 above this many concurrent API requests (default: unlimited)')
+    serve.add_argument('--cert', help='TLS certificate (default: generated self-signed)')
+    serve.add_argument('--key', help='TLS private key')
+    serve.add_argument('--template-churn', type=float, default=0.0,
+                       help='Seconds between template updates; about 1%% of templates change each time (default: off)')
+    serve.add_argument('--verbose', '-v', action='store_true', help='Log every request')
+
+    generate = subparsers.choices['generate']
+    generate.add_argument('--output-dir', '-d', required=True, help='Directory for the fixture files')
+
+    args = parser.parse_args()
+    fabric = Fabric(devices=args.devices, seed=args.seed, sessions_per_device=args.sessions_per_device,
+                    events_per_device=args.events_per_device, templates=args.templates, policies=args.policies,
+                    template_churn=getattr(args, 'template_churn', 0.0))
+
+    if args.command == 'generate':
+        start = time.monotonic()
+        written = write_fixtures(fabric, args.output_dir)
+        for name, count in written.items():
+            print(f"  {name}.json: {count} records")
+        print(f"{Colors.GREEN}Wrote {len(written)} fixtures for {len(fabric.devices)} devices "
+              f"in {time.monotonic() - start:.1f}s{Colors.END}")
+        sys.exit(0)
+
+    try:
+        server = MockVManageServer((args.bind, args.port), fabric, username=args.username,
+                                   password=args.password, latency=args.latency_ms / 1000.0,
+                                   jitter=args.jitter_ms / 1000.0, error_rate=args.error_rate,
+                                   max_concurrent=args.max_concurrent, verbose=args.verbose)
+        server.enable_tls(args.cert, args.key)
+    except (OSError, RuntimeError, subprocess.CalledProcessError) as e:
+        print(f"{Colors.RED}Error: {str(e)}{Colors.END}", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"{Colors.GREEN}Mock vManage with {len(fabric.devices)} devices on "
+          f"https://{args.bind}:{server.server_address[1]}{Colors.END}")
+    print(f"{Colors.CYAN}export VMANAGE_HOST={args.bind} VMANAGE_PORT={server.server_address[1]} "
+          f"VMANAGE_USERNAME={args.username} VMANAGE_PASSWORD={args.password}{Colors.END}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n{Colors.YELLOW}Served {server.requests} API requests{Colors.END}")
+    finally:
+        server.server_close()
+    sys.exit(0)
+
+if __name__ == "__main__":
+    main()
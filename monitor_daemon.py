@@ -0,0 +1,466 @@
+#!/usr/bin/env python3
+"""
+SD-WAN Resident Device Monitor
+==============================
+
+Long-running replacement for running use case 14 (monitor_devices.yml)
+from cron. It:
+- Keeps one authenticated vManage session open between polls
+- Polls each monitoring endpoint on its own interval
+- Keeps the inventory in memory and rewrites it only when it changed
+- Appends state changes (device down, BFD flap, control connection loss)
+  to generated/monitoring/state_changes.ndjson instead of full snapshots
+- Remembers the last state across restarts, so --once works from cron too
+
+Author: SD-WAN Automation Team
+Version: 1.0
+"""
+
+import os
+import sys
+import json
+import time
+import signal
+import hashlib
+import argparse
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from requests import RequestException
+from vmanage_client import VManageClient, VManageError
+
+class Colors:
+    """Color codes for terminal output"""
+    GREEN = '\033[92m'
+    RED = '\033[91m'
+    YELLOW = '\033[93m'
+    BLUE = '\033[94m'
+    CYAN = '\033[96m'
+    WHITE = '\033[97m'
+    BOLD = '\033[1m'
+    END = '\033[0m'
+
+INVENTORY_PATH = '/dataservice/device'
+INVENTORY_INTERVAL = 300
+# An unknown device in a poll re-reads the inventory early, but not more often than this
+INVENTORY_MIN_INTERVAL = 30
+# Fields that identify the fabric; reachability and timestamps change without the inventory changing
+INVENTORY_FIELDS = ('system-ip', 'uuid', 'host-name', 'device-type', 'device-model', 'site-id', 'version')
+
+# Per endpoint: poll interval, record identity, state fields and counters whose increase is an event
+WATCHES = {
+    'device_status': {
+        'path': '/dataservice/device/monitor',
+        'interval': 30,
+        'label': 'device',
+        'key': ('system-ip',),
+        'state': ('reachability', 'status'),
+        'counters': {}
+    },
+    'device_counters': {
+        'path': '/dataservice/device/counters',
+        'interval': 60,
+        'label': 'device',
+        'key': ('system-ip',),
+        'state': (),
+        'counters': {'rebootCount': 'reboot', 'crashCount': 'crash'}
+    },
+    'control_connections': {
+        'path': '/dataservice/device/control/connections',
+        'interval': 15,
+        'label': 'control_connection',
+        'key': ('vdevice-name', 'peer-type', 'system-ip', 'local-color'),
+        'state': ('state',),
+        'counters': {}
+    },
+    'bfd_sessions': {
+        'path': '/dataservice/device/bfd/sessions',
+        'interval': 15,
+        'label': 'bfd',
+        'key': ('system-ip', 'remote-system-ip', 'local-color', 'remote-color'),
+        'state': ('state',),
+        'counters': {'transitions': 'flap'}
+    },
+    'omp_peers': {
+        'path': '/dataservice/device/omp/peers',
+        'interval': 30,
+        'label': 'omp_peer',
+        'key': ('vdevice-name', 'peer'),
+        'state': ('state',),
+        'counters': {}
+    }
+}
+
+DOWN_STATES = {'down', 'unreachable', 'disconnected', 'init'}
+
+CHANGES_FILE = 'state_changes.ndjson'
+STATE_FILE = 'monitor_state.json'
+INVENTORY_FILE = 'devices_inventory.json'
+SUMMARY_FILE = 'monitor_summary.json'
+
+def write_json(path, data):
+    """Write JSON atomically so readers never see a partial file"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+def parse_intervals(values):
+    """Parse NAME=SECONDS interval overrides"""
+    intervals = {}
+    for value in values or []:
+        name, _, seconds = value.partition('=')
+        if name not in WATCHES and name != 'inventory':
+            raise ValueError(f"Unknown watch '{name}' (choose from inventory, {', '.join(WATCHES)})")
+        intervals[name] = float(seconds)
+    return intervals
+
+def change_kind(before, after):
+    """Classify a state transition as down, up or changed"""
+    if any(str(value).lower() in DOWN_STATES for value in after if value is not None):
+        return 'down'
+    if any(str(value).lower() in DOWN_STATES for value in before if value is not None):
+        return 'up'
+    return 'changed'
+
+class DeviceMonitor:
+    def __init__(self, client, output_dir, watches=None, intervals=None, workers=4, timeout=30):
+        self.client = client
+        self.output_dir = output_dir
+        self.watches = {name: dict(WATCHES[name]) for name in (watches or WATCHES)}
+        self.inventory_interval = INVENTORY_INTERVAL
+        for name, seconds in (intervals or {}).items():
+            if name == 'inventory':
+                self.inventory_interval = seconds
+            elif name in self.watches:
+                self.watches[name]['interval'] = seconds
+        self.workers = workers
+        self.timeout = timeout
+
+        self.inventory = {}
+        self.inventory_fingerprint = None
+        self.inventory_stale = False
+        # watch -> record key -> [device, state values, counter values]
+        self.states = {}
+        self.failing = set()
+        self.stats = {name: {'polls': 0, 'errors': 0, 'changes': 0} for name in ['inventory'] + list(self.watches)}
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+
+        os.makedirs(output_dir, exist_ok=True)
+        self.changes_path = os.path.join(output_dir, CHANGES_FILE)
+        self.state_path = os.path.join(output_dir, STATE_FILE)
+        self.load_state()
+
+    def load_state(self):
+        """Resume from the state left by a previous run"""
+        try:
+            with open(self.state_path, 'r') as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return
+        self.inventory = saved.get('inventory', {})
+        self.inventory_fingerprint = saved.get('inventory_fingerprint')
+        self.states = {name: state for name, state in saved.get('states', {}).items() if name in self.watches}
+
+    def save_state(self):
+        """Persist the last seen state so a restart only reports real changes"""
+        with self._lock:
+            write_json(self.state_path, {
+                'saved': datetime.now().isoformat(),
+                'inventory_fingerprint': self.inventory_fingerprint,
+                'inventory': self.inventory,
+                'states': self.states
+            })
+
+    def emit(self, changes):
+        """Append state changes to the changes file"""
+        if not changes:
+            return
+        with self._lock, open(self.changes_path, 'a') as f:
+            for change in changes:
+                f.write(json.dumps(change, separators=(',', ':')) + '\n')
+
+    def change(self, watch, event, key=None, device=None, **detail):
+        """Build one change record"""
+        return dict({
+            'time': datetime.now().isoformat(),
+            'watch': watch,
+            'event': event,
+            'key': key,
+            'device': device,
+            'host-name': self.inventory.get(device)
+        }, **detail)
+
+    def refresh_inventory(self):
+        """Re-read the inventory; returns the changes when it differs from the one in memory"""
+        records = self.client.get_json(INVENTORY_PATH, timeout=self.timeout).get('data', [])
+        identity = sorted(json.dumps([record.get(field) for field in INVENTORY_FIELDS]) for record in records)
+        fingerprint = hashlib.sha256('\n'.join(identity).encode()).hexdigest()
+        self.inventory_stale = False
+        if fingerprint == self.inventory_fingerprint:
+            return []
+
+        inventory = {record.get('system-ip'): record.get('host-name') for record in records if record.get('system-ip')}
+        changes = []
+        if self.inventory_fingerprint is not None:
+            added = sorted(set(inventory) - set(self.inventory))
+            removed = sorted(set(self.inventory) - set(inventory))
+            changes.append(self.change('inventory', 'inventory_changed', devices=len(inventory),
+                                       added=added, removed=removed))
+        with self._lock:
+            self.inventory = inventory
+            self.inventory_fingerprint = fingerprint
+        write_json(os.path.join(self.output_dir, INVENTORY_FILE), records)
+        return changes
+
+    def diff(self, name, records):
+        """Compare a fresh poll with the stored state and return the changes"""
+        spec = self.watches[name]
+        previous = self.states.get(name)
+        current = {}
+        changes = []
+        for record in records:
+            key = '|'.join(str(record.get(field, '')) for field in spec['key'])
+            device = record.get('vdevice-name') or record.get('system-ip') or record.get('deviceId')
+            if device and device not in self.inventory:
+                self.inventory_stale = True
+            state = [record.get(field) for field in spec['state']]
+            counters = [record.get(field) for field in spec['counters']]
+            current[key] = [device, state, counters]
+            if previous is None:
+                continue
+
+            if key not in previous:
+                changes.append(self.change(name, f"{spec['label']}_new", key, device,
+                                           state=dict(zip(spec['state'], state))))
+                continue
+            _, old_state, old_counters = previous[key]
+            if state != old_state:
+                changes.append(self.change(name, f"{spec['label']}_{change_kind(old_state, state)}", key, device,
+                                           before=dict(zip(spec['state'], old_state)),
+                                           after=dict(zip(spec['state'], state))))
+            # A counter that moved between polls means a flap or reboot the state fields did not catch
+            for field, old, new in zip(spec['counters'], old_counters, counters):
+                try:
+                    increased = int(new) > int(old)
+                except (TypeError, ValueError):
+                    continue
+                if increased:
+                    changes.append(self.change(name, f"{spec['label']}_{spec['counters'][field]}", key, device,
+                                               counter=field, before=old, after=new))
+
+        if previous is not None:
+            for key in previous.keys() - current.keys():
+                changes.append(self.change(name, f"{spec['label']}_lost", key, previous[key][0],
+                                           before=dict(zip(spec['state'], previous[key][1]))))
+        with self._lock:
+            self.states[name] = current
+        return changes, previous is None
+
+    def poll(self, name):
+        """Poll one watch; returns (changes, state_updated)"""
+        self.stats[name]['polls'] += 1
+        try:
+            if name == 'inventory':
+                changes = self.refresh_inventory()
+                updated = bool(changes)
+            else:
+                records = self.client.get_json(self.watches[name]['path'], timeout=self.timeout).get('data', [])
+                changes, baseline = self.diff(name, records)
+                updated = bool(changes) or baseline
+        except (VManageError, RequestException, ValueError) as e:
+            self.stats[name]['errors'] += 1
+            # Report a failing endpoint once, not on every poll
+            if name in self.failing:
+                return [], False
+            self.failing.add(name)
+            return [self.change(name, 'poll_failed', error=str(e))], False
+
+        if name in self.failing:
+            self.failing.discard(name)
+            changes.insert(0, self.change(name, 'poll_recovered'))
+        self.stats[name]['changes'] += len(changes)
+        return changes, updated
+
+    def summary(self):
+        """Return counters for the summary file"""
+        return {
+            'timestamp': datetime.now().isoformat(),
+            'uptime_seconds': round(time.monotonic() - self.started, 3),
+            'devices': len(self.inventory),
+            'intervals': dict({'inventory': self.inventory_interval},
+                              **{name: spec['interval'] for name, spec in self.watches.items()}),
+            'watches': self.stats,
+            'failing': sorted(self.failing),
+            'rate_limiter': self.client.limiter.stats() if self.client.limiter else None
+        }
+
+    def run(self, stop, once=False, on_change=None):
+        """Poll every watch on its own interval until stop is set (or once each)"""
+        names = ['inventory'] + list(self.watches)
+        intervals = dict({'inventory': self.inventory_interval},
+                         **{name: spec['interval'] for name, spec in self.watches.items()})
+        # The inventory goes first so change records carry host names
+        due = {name: 0.0 if name == 'inventory' else float('inf') for name in names}
+        polled = set()
+        inventory_polled = 0.0
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            running = {}
+            while not stop.is_set():
+                now = time.monotonic()
+                if self.inventory_stale:
+                    due['inventory'] = min(due['inventory'], inventory_polled + INVENTORY_MIN_INTERVAL)
+                for name in names:
+                    if due[name] <= now and name not in running.values():
+                        if once and name in polled:
+                            continue
+                        running[executor.submit(self.poll, name)] = name
+                        due[name] = now + intervals[name]
+                        if name == 'inventory':
+                            inventory_polled = now
+
+                if not running:
+                    if once:
+                        break
+                    stop.wait(max(min(due.values()) - time.monotonic(), 0.05))
+                    continue
+
+                done, _ = wait(running, timeout=max(min(due.values()) - time.monotonic(), 0.05),
+                               return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    polled.add(name)
+                    changes, updated = future.result()
+                    if name == 'inventory' and float('inf') in due.values():
+                        # First inventory read done; start the state watches
+                        due.update({watch: time.monotonic() for watch in self.watches})
+                    self.emit(changes)
+                    if changes or updated:
+                        self.save_state()
+                    if on_change:
+                        for change in changes:
+                            on_change(change)
+
+            if running:
+                wait(running)
+
+        summary = self.summary()
+        write_json(os.path.join(self.output_dir, SUMMARY_FILE), summary)
+        return summary
+
+def running_pid(pid_file):
+    """Return the pid recorded in pid_file if that process is still alive"""
+    try:
+        with open(pid_file, 'r') as f:
+            pid = int(f.read().strip())
+        os.kill(pid, 0)
+        return pid
+    except (OSError, ValueError):
+        return None
+
+def daemonize(log_file):
+    """Detach from the terminal, sending output to log_file"""
+    if os.fork() > 0:
+        os._exit(0)
+    os.setsid()
+    if os.fork() > 0:
+        os._exit(0)
+    sys.stdout.flush()
+    sys.stderr.flush()
+    with open(os.devnull, 'r') as devnull:
+        os.dup2(devnull.fileno(), sys.stdin.fileno())
+    with open(log_file, 'a') as log:
+        os.dup2(log.fileno(), sys.stdout.fileno())
+        os.dup2(log.fileno(), sys.stderr.fileno())
+
+def print_change(change):
+    """Print one state change"""
+    event = change['event']
+    if event.endswith(('_down', '_lost', '_flap', '_reboot', '_crash')) or event == 'poll_failed':
+        color = Colors.RED
+    elif event.endswith(('_up', '_new')) or event == 'poll_recovered':
+        color = Colors.GREEN
+    else:
+        color = Colors.YELLOW
+    who = change.get('host-name') or change.get('device') or ''
+    detail = change.get('after') or change.get('error') or ''
+    print(f"{change['time']} {color}{event}{Colors.END} {who} {change.get('key') or ''} {detail}".rstrip(), flush=True)
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='SD-WAN Resident Device Monitor')
+    parser.add_argument('--output-dir', '-o', default=os.path.join('generated', 'monitoring'),
+                       help='Directory for state changes and state (default: generated/monitoring)')
+    parser.add_argument('--watch', action='append', choices=sorted(WATCHES),
+                       help='Endpoint to watch (repeatable, default: all)')
+    parser.add_argument('--interval', action='append', metavar='NAME=SECONDS',
+                       help='Override a poll interval, e.g. bfd_sessions=5 or inventory=600 (repeatable)')
+    parser.add_argument('--workers', '-w', type=int, default=4,
+                       help='Polls run at once (default: 4)')
+    parser.add_argument('--timeout', '-t', type=int, default=30,
+                       help='Per-request timeout in seconds (default: 30)')
+    parser.add_argument('--once', action='store_true',
+                       help='Poll every endpoint once, report changes since the last run and exit')
+    parser.add_argument('--duration', type=float,
+                       help='Stop after this many seconds')
+    parser.add_argument('--pid-file',
+                       help='Exit quietly if the monitor recorded here is already running')
+    parser.add_argument('--detach', action='store_true',
+                       help='Run in the background, logging to monitor.log in the output directory')
+
+    try:
+        args = parser.parse_args()
+        intervals = parse_intervals(args.interval)
+        os.makedirs(args.output_dir, exist_ok=True)
+
+        if args.pid_file:
+            pid = running_pid(args.pid_file)
+            if pid:
+                print(f"{Colors.CYAN}Monitor already running (pid {pid}){Colors.END}")
+                sys.exit(0)
+        if args.detach:
+            daemonize(os.path.join(args.output_dir, 'monitor.log'))
+        if args.pid_file:
+            with open(args.pid_file, 'w') as f:
+                f.write(f"{os.getpid()}\n")
+
+        stop = threading.Event()
+        signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+        signal.signal(signal.SIGINT, lambda signum, frame: stop.set())
+        if args.duration:
+            timer = threading.Timer(args.duration, stop.set)
+            timer.daemon = True
+            timer.start()
+
+        try:
+            # The monitor needs fresh data, so the inventory response cache is not used
+            with VManageClient.from_env(timeout=args.timeout, pool_size=args.workers, cache=None) as client:
+                monitor = DeviceMonitor(client, args.output_dir, watches=args.watch, intervals=intervals,
+                                        workers=args.workers, timeout=args.timeout)
+                print(f"{Colors.BLUE}Monitoring {', '.join(monitor.watches)} on {client.host}{Colors.END}", flush=True)
+                summary = monitor.run(stop, once=args.once, on_change=print_change)
+        finally:
+            stop.set()
+            if args.pid_file and running_pid(args.pid_file) == os.getpid():
+                os.remove(args.pid_file)
+
+        changes = sum(stats['changes'] for stats in summary['watches'].values())
+        color = Colors.GREEN if not summary['failing'] else Colors.YELLOW
+        print(f"\n{color}{summary['devices']} devices, {changes} state changes in "
+              f"{summary['uptime_seconds']:.0f}s{Colors.END}")
+        sys.exit(0 if not summary['failing'] else 1)
+
+    except KeyboardInterrupt:
+        print(f"\n{Colors.YELLOW}Monitoring interrupted by user{Colors.END}")
+        sys.exit(1)
+    except ValueError as e:
+        print(f"{Colors.RED}Error: {str(e)}{Colors.END}", file=sys.stderr)
+        sys.exit(1)
+    except VManageError as e:
+        print(f"\n{Colors.RED}vManage error: {str(e)}{Colors.END}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
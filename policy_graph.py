@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+"""
+SD-WAN Policy Graph Resolver
+============================
+
+Builds the dependency graph of policies, policy definitions and policy
+lists for use cases 21-25 from a handful of bulk requests instead of one
+request per policy. It:
+- Fetches all policy lists, every definition type and the vSmart and
+  vEdge policies concurrently, one request each
+- Indexes every object by ID
+- Resolves policy -> definition -> list references in memory, from the
+  IDs inside each object and from the references vManage reports
+- Saves the graph, so questions such as "what uses this prefix list"
+  are answered from disk without API calls
+
+Definition bodies (sequences) are not part of the bulk definition lists;
+the references vManage reports cover those edges, and --details fetches
+the bodies of definitions that lack them.
+
+Author: SD-WAN Automation Team
+Version: 1.0
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from collections import deque
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from vmanage_client import VManageClient, VManageError
+from tracing import TRACE_FILE_NAME, configure, get_tracer
+
+class Colors:
+    """Color codes for terminal output"""
+    GREEN = '\033[92m'
+    RED = '\033[91m'
+    YELLOW = '\033[93m'
+    BLUE = '\033[94m'
+    CYAN = '\033[96m'
+    WHITE = '\033[97m'
+    BOLD = '\033[1m'
+    END = '\033[0m'
+
+POLICY_API = '/dataservice/template/policy'
+DEFINITION_TYPES = ('data', 'control', 'approute', 'qosmap', 'acl', 'aclv6', 'vpnmembershipgroup',
+                    'hubandspoke', 'mesh', 'vedgeroute', 'rewriterule')
+POLICY_KINDS = ('vsmart', 'vedge')
+
+# Bulk sources: name -> (path, object kind, ID field)
+SOURCES = {'lists': (f"{POLICY_API}/list", 'list', 'listId')}
+SOURCES.update({f"definition_{t}": (f"{POLICY_API}/definition/{t}", 'definition', 'definitionId')
+                for t in DEFINITION_TYPES})
+SOURCES.update({f"policy_{k}": (f"{POLICY_API}/{k}", 'policy', 'policyId') for k in POLICY_KINDS})
+
+# Fields whose values are always IDs of other policy objects
+REFERENCE_FIELDS = ('ref', 'definitionId', 'siteList', 'siteLists', 'vpnList', 'vpnLists', 'listId')
+GRAPH_FILE = 'policy_graph.json'
+KIND_ORDER = {'list': 0, 'definition': 1, 'policy': 2}
+
+def write_json(path, data):
+    """Write JSON atomically"""
+    tmp_path = f"{path}.tmp"
+    with get_tracer().span('write', os.path.basename(os.path.dirname(path)) or '.') as span:
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, indent=2)
+        span['bytes'] = os.path.getsize(tmp_path)
+        os.replace(tmp_path, path)
+
+def body_of(item):
+    """Return an object with a JSON-encoded policyDefinition decoded"""
+    definition = item.get('policyDefinition')
+    if isinstance(definition, str) and definition.lstrip().startswith('{'):
+        try:
+            return dict(item, policyDefinition=json.loads(definition))
+        except ValueError:
+            pass
+    return item
+
+def iter_strings(value, key=None):
+    """Yield (field, string) for every string inside a JSON value"""
+    if isinstance(value, dict):
+        for k, v in value.items():
+            if k != 'references':
+                yield from iter_strings(v, k)
+    elif isinstance(value, list):
+        for v in value:
+            yield from iter_strings(v, key)
+    elif isinstance(value, str):
+        yield key, value
+
+class PolicyGraph:
+    """Policy objects indexed by ID, with uses / used-by adjacency"""
+
+    def __init__(self):
+        self.nodes = {}
+        self.uses = {}
+        self.used_by = {}
+        self.dangling = []
+
+    def add(self, kind, object_id, item):
+        """Index one object"""
+        node = {
+            'kind': kind,
+            'type': item.get('type') or item.get('policyType'),
+            'name': item.get('name') or item.get('policyName') or object_id
+        }
+        if kind == 'list':
+            node['entries'] = item.get('entries', [])
+        if kind == 'policy':
+            node['activated'] = item.get('isPolicyActivated', False)
+        self.nodes[object_id] = node
+
+    def link(self, source, target):
+        """Record that source uses target"""
+        if source != target:
+            self.uses.setdefault(source, set()).add(target)
+            self.used_by.setdefault(target, set()).add(source)
+
+    def resolve(self, objects):
+        """Derive edges from IDs inside each object and from the references vManage reports"""
+        dangling = set()
+        for object_id, item in objects.items():
+            for field, value in iter_strings(body_of(item)):
+                if value in self.nodes:
+                    self.link(object_id, value)
+                elif field in REFERENCE_FIELDS and value != object_id:
+                    dangling.add((object_id, value))
+            for reference in item.get('references') or []:
+                source = reference.get('id') if isinstance(reference, dict) else None
+                if source in self.nodes:
+                    self.link(source, object_id)
+                elif source:
+                    dangling.add((source, object_id))
+        self.dangling = sorted(dangling)
+
+    def walk(self, start, adjacency):
+        """Breadth-first closure from start; returns {id: (depth, via)}"""
+        seen = {start: (0, None)}
+        queue = deque([start])
+        while queue:
+            current = queue.popleft()
+            for neighbour in sorted(adjacency.get(current, ())):
+                if neighbour not in seen:
+                    seen[neighbour] = (seen[current][0] + 1, current)
+                    queue.append(neighbour)
+        del seen[start]
+        return seen
+
+    def users_of(self, object_id):
+        """Everything that uses an object, directly or through other objects"""
+        return self.walk(object_id, self.used_by)
+
+    def dependencies_of(self, object_id):
+        """Everything an object uses, directly or through other objects"""
+        return self.walk(object_id, self.uses)
+
+    def find(self, target, value=False):
+        """Return IDs matching an ID or name, or lists holding an entry value when value is set"""
+        if value:
+            return sorted(object_id for object_id, node in self.nodes.items()
+                          if node['kind'] == 'list' and any(target in [str(v) for v in entry.values()]
+                                                            for entry in node.get('entries', [])
+                                                            if isinstance(entry, dict)))
+        if target in self.nodes:
+            return [target]
+        lowered = target.lower()
+        return sorted(object_id for object_id, node in self.nodes.items() if str(node['name']).lower() == lowered)
+
+    def unused(self):
+        """Lists and definitions nothing refers to"""
+        return sorted((object_id for object_id, node in self.nodes.items()
+                       if node['kind'] != 'policy' and not self.used_by.get(object_id)),
+                      key=lambda i: (KIND_ORDER[self.nodes[i]['kind']], self.nodes[i]['type'] or '', self.nodes[i]['name']))
+
+    def summary(self):
+        """Object and edge counts"""
+        counts = {}
+        for node in self.nodes.values():
+            counts.setdefault(node['kind'], {}).setdefault(node['type'] or 'unknown', 0)
+            counts[node['kind']][node['type'] or 'unknown'] += 1
+        return {
+            'objects': counts,
+            'edges': sum(len(targets) for targets in self.uses.values()),
+            'unused': len(self.unused()),
+            'dangling': len(self.dangling)
+        }
+
+    def to_dict(self):
+        return {
+            'nodes': self.nodes,
+            'uses': {source: sorted(targets) for source, targets in sorted(self.uses.items())},
+            'dangling': [list(pair) for pair in self.dangling]
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        graph = cls()
+        graph.nodes = data.get('nodes', {})
+        for source, targets in data.get('uses', {}).items():
+            for target in targets:
+                graph.link(source, target)
+        graph.dangling = [tuple(pair) for pair in data.get('dangling', [])]
+        return graph
+
+class PolicyGraphBuilder:
+    def __init__(self, client, output_dir, workers=8, details=False):
+        self.client = client
+        self.output_dir = output_dir
+        self.workers = workers
+        self.details = details
+
+    def fetch_source(self, name):
+        """Fetch one bulk source and save the raw response"""
+        path = SOURCES[name][0]
+        result = self.client.fetch(path)
+        status = {'path': path, 'status': result['status'], 'count': 0, 'seconds': result.get('elapsed')}
+        if result['status'] != 200 or 'json' not in result:
+            status['error'] = result.get('msg') or f"HTTP {result['status']}"
+            return name, [], status
+        items = result['json'].get('data', [])
+        status['count'] = len(items)
+        write_json(os.path.join(self.output_dir, f"{name}.json"), result['json'])
+        return name, items, status
+
+    def fetch_detail(self, kind, item):
+        """Fetch the full body of a definition or policy the bulk list left out; returns (status, body)"""
+        # _kind is the source's path segment; a definition's own type is camelCase (appRoute, qosMap)
+        if kind == 'definition':
+            path = f"{POLICY_API}/definition/{item['_kind']}/{item['definitionId']}"
+        else:
+            path = f"{POLICY_API}/{item['_kind']}/definition/{item['policyId']}"
+        result = self.client.fetch(path)
+        return result['status'], result.get('json') if result['status'] == 200 else None
+
+    def build(self):
+        """Fetch every source concurrently and return (graph, source statuses)"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        graph = PolicyGraph()
+        objects = {}
+        sources = {}
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for name, items, status in executor.map(self.fetch_source, SOURCES):
+                sources[name] = status
+                _, kind, id_field = SOURCES[name]
+                for item in items:
+                    object_id = item.get(id_field)
+                    if not object_id:
+                        continue
+                    if kind == 'policy':
+                        item = dict(item, _kind=name.split('_', 1)[1], type=name.split('_', 1)[1])
+                    elif kind == 'definition':
+                        item = dict(item, _kind=name.split('_', 1)[1])
+                    graph.add(kind, object_id, item)
+                    objects[object_id] = item
+
+            if self.details:
+                missing = [(object_id, item) for object_id, item in objects.items()
+                           if (graph.nodes[object_id]['kind'] == 'definition'
+                               and 'sequences' not in item and 'definition' not in item)
+                           or (graph.nodes[object_id]['kind'] == 'policy' and not item.get('policyDefinition'))]
+                details = executor.map(lambda pair: self.fetch_detail(graph.nodes[pair[0]]['kind'], pair[1]), missing)
+                failed = []
+                for (object_id, item), (status, detail) in zip(missing, details):
+                    if isinstance(detail, dict):
+                        objects[object_id] = dict(item, **detail)
+                    else:
+                        failed.append(status)
+                sources['details'] = {'path': f"{POLICY_API}/.../definition/{{id}}",
+                                      'status': failed[-1] if failed else 200,
+                                      'count': len(missing), 'failed': len(failed), 'seconds': None}
+                if failed:
+                    sources['details']['error'] = f"{len(failed)} of {len(missing)} detail requests failed"
+
+        graph.resolve(objects)
+        return graph, sources
+
+    def save(self, graph, sources):
+        """Write the graph with its source statuses and return the summary"""
+        summary = graph.summary()
+        write_json(os.path.join(self.output_dir, GRAPH_FILE), dict(graph.to_dict(), **{
+            'timestamp': datetime.now().isoformat(),
+            'sources': sources,
+            'summary': summary
+        }))
+        return summary
+
+def load_graph(output_dir):
+    """Load a saved graph"""
+    path = os.path.join(output_dir, GRAPH_FILE)
+    if not os.path.exists(path):
+        raise ValueError(f"No policy graph at {path}; run 'policy_graph.py build' first")
+    with open(path, 'r') as f:
+        return PolicyGraph.from_dict(json.load(f))
+
+def describe(graph, object_id):
+    """One-line description of a node"""
+    node = graph.nodes.get(object_id, {'kind': '?', 'type': None, 'name': object_id})
+    return f"{node['kind']:<10} {node['type'] or '-':<18} {node['name']} ({object_id})"
+
+def print_closure(graph, start, closure, verb):
+    """Print a closure grouped by kind, with the object each one was reached through"""
+    if not closure:
+        print(f"{Colors.YELLOW}Nothing {verb} {graph.nodes[start]['name']}{Colors.END}")
+        return
+    print(f"{Colors.CYAN}{len(closure)} objects {verb} {describe(graph, start)}:{Colors.END}")
+    for object_id, (depth, via) in sorted(closure.items(), key=lambda item: (
+            KIND_ORDER.get(graph.nodes.get(item[0], {}).get('kind'), 3), item[1][0], graph.nodes.get(item[0], {}).get('name', ''))):
+        through = '' if via == start else f"  via {graph.nodes.get(via, {}).get('name', via)}"
+        print(f"  {'  ' * (depth - 1)}{describe(graph, object_id)}{through}")
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='SD-WAN Policy Graph Resolver')
+    parser.add_argument('--output-dir', '-d', default=os.path.join('generated', 'policy_graph'),
+                       help='Directory for the raw responses and the graph (default: generated/policy_graph)')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build', help='Fetch every policy object and build the graph')
+    build_parser.add_argument('--workers', '-w', type=int, default=8,
+                              help='Concurrent requests (default: 8)')
+    build_parser.add_argument('--details', action='store_true',
+                              help='Also fetch bodies the bulk lists leave out (one request per object)')
+    build_parser.add_argument('--timeout', '-t', type=int, default=60,
+                              help='Per-request timeout in seconds (default: 60)')
+
+    users_parser = subparsers.add_parser('who-uses', help='Definitions and policies that use an object')
+    users_parser.add_argument('target', help='Object ID or name, or an entry value with --value')
+    users_parser.add_argument('--value', action='store_true',
+                              help='Match lists containing this entry value, e.g. a prefix')
+
+    deps_parser = subparsers.add_parser('deps', help='Definitions and lists an object uses')
+    deps_parser.add_argument('target', help='Object ID or name')
+
+    subparsers.add_parser('unused', help='Lists and definitions nothing refers to')
+
+    try:
+        args = parser.parse_args()
+        if args.command == 'build':
+            configure(os.path.join(args.output_dir, TRACE_FILE_NAME))
+            start = time.monotonic()
+            with VManageClient.from_env(timeout=args.timeout, pool_size=args.workers) as client:
+                builder = PolicyGraphBuilder(client, args.output_dir, workers=args.workers, details=args.details)
+                graph, sources = builder.build()
+            summary = builder.save(graph, sources)
+
+            failed = {name: s for name, s in sources.items() if s.get('error')}
+            requests_made = sum(1 for name in sources if name != 'details') + (sources.get('details') or {}).get('count', 0)
+            for kind, label in (('policy', 'policies'), ('definition', 'definitions'), ('list', 'lists')):
+                types = summary['objects'].get(kind, {})
+                print(f"  {label:<12} {sum(types.values()):>6}  "
+                      f"({', '.join(f'{t} {n}' for t, n in sorted(types.items()))})")
+            print(f"  {'edges':<12} {summary['edges']:>6}")
+            if summary['unused']:
+                print(f"{Colors.YELLOW}  {summary['unused']} lists/definitions are not used by anything{Colors.END}")
+            if summary['dangling']:
+                print(f"{Colors.YELLOW}  {summary['dangling']} references point at objects that were not fetched{Colors.END}")
+            for name, status in failed.items():
+                print(f"{Colors.RED}  ✗ {status['path']}: {status['error']}{Colors.END}")
+            color = Colors.GREEN if not failed else Colors.YELLOW
+            print(f"{color}Policy graph built from {requests_made} requests in "
+                  f"{time.monotonic() - start:.2f}s: {os.path.join(args.output_dir, GRAPH_FILE)}{Colors.END}")
+            sys.exit(0 if len(failed) < len(SOURCES) else 1)
+
+        graph = load_graph(args.output_dir)
+        if args.command == 'unused':
+            unused = graph.unused()
+            for object_id in unused:
+                print(f"  {describe(graph, object_id)}")
+            print(f"{Colors.CYAN}{len(unused)} unused lists/definitions{Colors.END}")
+            sys.exit(0)
+
+        matches = graph.find(args.target, value=getattr(args, 'value', False))
+        if not matches:
+            print(f"{Colors.RED}No policy object matches '{args.target}'{Colors.END}")
+            sys.exit(1)
+        for object_id in matches:
+            if args.command == 'who-uses':
+                print_closure(graph, object_id, graph.users_of(object_id), 'use')
+            else:
+                print_closure(graph, object_id, graph.dependencies_of(object_id), 'are used by')
+        sys.exit(0)
+
+    except KeyboardInterrupt:
+        print(f"\n{Colors.YELLOW}Interrupted by user{Colors.END}")
+        sys.exit(1)
+    except VManageError as e:
+        print(f"\n{Colors.RED}vManage error: {str(e)}{Colors.END}")
+        sys.exit(1)
+    except ValueError as e:
+        print(f"{Colors.RED}Error: {str(e)}{Colors.END}", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,7 @@ It checks:
 - Configuration item statistics
 - Error detection and reporting
 - Success metrics and recommendations
+- Streaming validation of JSON/NDJSON collector output (--operation generated)
 
 Author: SD-WAN Automation Team
 Version: 1.0
@@ -18,14 +19,21 @@ Version: 1.0
 import os
 import sys
 import json
-import tarfile
 import glob
 from datetime import datetime, timedelta
 import platform
 import re
-import hashlib
 from pathlib import Path
 import argparse
+from stream_writer import validate_json_file
+from file_manifest import hash_file, load_manifest, save_manifest, build_manifest, scan_tree, verify_archives
+from backup_store import BackupStore, store_for
+from tracing import TRACE_FILE_NAME, latest_run, load_spans, summarize
+from compressed_io import plain_name, codec_of, read_footer
+from catalog import open_catalog
+
+# Schema tag of the machine-readable reports/<operation>_summary_<timestamp>.json
+SUMMARY_SCHEMA = 'sdwan-operation-summary/1'
 
 class Colors:
     """Color codes for terminal output"""
@@ -39,8 +47,12 @@ class Colors:
     END = '\033[0m'
 
 class SDWANPostCheck:
-    def __init__(self, operation_type="backup"):
+    def __init__(self, operation_type="backup", rehash=False, workers=None):
         self.operation_type = operation_type.lower()
+        self.rehash = rehash
+        self.workers = workers or os.cpu_count() or 1
+        self.tree_scan = {}
+        self.manifest_cache = {}
         self.results = {
             'passed': 0,
             'failed': 0,
@@ -52,7 +64,8 @@ class SDWANPostCheck:
         self.base_dirs = {
             'backup': ['backups'],
             'list': ['lists'],
-            'both': ['backups', 'lists']
+            'both': ['backups', 'lists'],
+            'generated': ['generated']
         }
         
     def print_header(self):
@@ -96,19 +109,25 @@ class SDWANPostCheck:
         return f"{s} {size_names[i]}"
 
     def calculate_file_hash(self, filepath):
-        """Calculate MD5 hash of a file"""
+        """Calculate BLAKE2b hash of a file using large read buffers"""
         try:
-            hash_md5 = hashlib.md5()
-            with open(filepath, "rb") as f:
-                for chunk in iter(lambda: f.read(4096), b""):
-                    hash_md5.update(chunk)
-            return hash_md5.hexdigest()
+            return hash_file(filepath)
         except Exception:
             return None
 
     def find_latest_operation_dir(self):
         """Find the most recent operation directory"""
+        # Collector output is not dated; the generated tree is the operation directory
+        if self.operation_type == 'generated':
+            return 'generated' if os.path.isdir('generated') else None
+
         search_dirs = self.base_dirs.get(self.operation_type, self.base_dirs['both'])
+
+        # The catalog relists a base directory only when its modification time changed
+        catalog = open_catalog()
+        if catalog:
+            with catalog:
+                return catalog.latest_dated_dir([d for d in search_dirs if os.path.isdir(d)])
         
         latest_dir = None
         latest_time = None
@@ -245,13 +264,29 @@ class SDWANPostCheck:
         present_lists = []
         missing_lists = []
         
-        for config_type in config_types:
-            list_files = glob.glob(os.path.join(data_dir, f"{config_type}_list_*.txt"))
-            if list_files:
-                file_size = os.path.getsize(list_files[0])
-                present_lists.append(f"{config_type} ({self.format_file_size(file_size)})")
-            else:
-                missing_lists.append(config_type)
+        summary = self.load_operation_summary(list_dir, 'list')
+        if summary is not None:
+            # One directory listing plus the summary, however many types were listed
+            data_files = set(os.listdir(data_dir))
+            for config_type in config_types:
+                if config_type not in summary['config_types']:
+                    missing_lists.append(config_type)
+            for config_type, entry in summary['config_types'].items():
+                list_file = os.path.basename(entry.get('file') or '')
+                if entry.get('rc') == 0 and list_file in data_files:
+                    present_lists.append(f"{config_type} ({entry.get('count', 0)} items)")
+                else:
+                    missing_lists.append(config_type)
+            self.results['metrics']['total_items'] = summary.get('totals', {}).get(
+                'items', sum(int(e.get('count') or 0) for e in summary['config_types'].values()))
+        else:
+            for config_type in config_types:
+                list_files = glob.glob(os.path.join(data_dir, f"{config_type}_list_*.txt"))
+                if list_files:
+                    file_size = os.path.getsize(list_files[0])
+                    present_lists.append(f"{config_type} ({self.format_file_size(file_size)})")
+                else:
+                    missing_lists.append(config_type)
         
         if missing_lists:
             self.check_status(
@@ -267,6 +302,17 @@ class SDWANPostCheck:
                 f"All configuration types listed ({len(present_lists)} types)"
             )
         
+        # Parallel runs record wall time next to the per-type (serial) durations
+        totals = summary.get('totals', {}) if summary is not None else {}
+        if totals.get('wall_seconds') is not None:
+            self.results['metrics']['list_wall_seconds'] = totals['wall_seconds']
+            self.check_status(
+                "List Timing",
+                True,
+                f"{totals['wall_seconds']}s wall for {totals.get('duration_seconds', 0)}s of sastre time "
+                f"({totals.get('workers', 1)} workers)"
+            )
+        
         # Check for consolidated inventory
         consolidated_files = glob.glob(os.path.join(data_dir, "consolidated_inventory_*.txt"))
         if consolidated_files:
@@ -285,6 +331,52 @@ class SDWANPostCheck:
         
         return len(present_lists) > 0
 
+    def load_operation_summary(self, operation_dir, operation):
+        """Load the newest machine-readable {operation}_summary_*.json, or None"""
+        reports_dir = os.path.join(operation_dir, "reports")
+        try:
+            names = sorted(
+                name for name in os.listdir(reports_dir)
+                if name.startswith(f"{operation}_summary_") and name.endswith('.json')
+            )
+        except OSError:
+            return None
+        if not names:
+            return None
+        
+        try:
+            with open(os.path.join(reports_dir, names[-1]), 'r') as f:
+                summary = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not str(summary.get('schema', '')).startswith(SUMMARY_SCHEMA) or \
+                not isinstance(summary.get('config_types'), dict):
+            return None
+        return summary
+
+    def parse_backup_summary_text(self, summary_file):
+        """Extract item counts from the legacy text summary report"""
+        with open(summary_file, 'r') as f:
+            content = f.read()
+        
+        # Extract statistics using regex
+        stats = {}
+        patterns = {
+            'device_templates': r'Device Templates:\s*(\d+)',
+            'feature_templates': r'Feature Templates:\s*(\d+)',
+            'policy_definitions': r'Policy Definitions:\s*(\d+)',
+            'policy_lists': r'Policy Lists:\s*(\d+)',
+            'config_groups': r'Configuration Groups:\s*(\d+)'
+        }
+        
+        for key, pattern in patterns.items():
+            match = re.search(pattern, content)
+            if match:
+                stats[key] = int(match.group(1))
+            else:
+                stats[key] = 0
+        return stats
+
     def analyze_backup_statistics(self, backup_dir):
         """Analyze backup statistics from reports"""
         print(f"\n{Colors.BLUE}Analyzing Backup Statistics...{Colors.END}")
@@ -298,101 +390,104 @@ class SDWANPostCheck:
             )
             return
         
-        # Find summary report
-        summary_files = glob.glob(os.path.join(reports_dir, "backup_summary_*.txt"))
-        if not summary_files:
-            self.check_status(
-                "Backup Statistics", 
-                False, 
-                "Summary report not found"
-            )
-            return
-        
-        summary_file = summary_files[0]
-        
-        try:
-            with open(summary_file, 'r') as f:
-                content = f.read()
-            
-            # Extract statistics using regex
-            stats = {}
-            patterns = {
-                'device_templates': r'Device Templates:\s*(\d+)',
-                'feature_templates': r'Feature Templates:\s*(\d+)',
-                'policy_definitions': r'Policy Definitions:\s*(\d+)',
-                'policy_lists': r'Policy Lists:\s*(\d+)',
-                'config_groups': r'Configuration Groups:\s*(\d+)'
+        # Prefer the JSON summary: exact per-type counts, timings and error totals
+        errors = None
+        summary = self.load_operation_summary(backup_dir, 'backup')
+        if summary is not None:
+            stats = {
+                config_type: int(entry.get('count') or 0)
+                for config_type, entry in summary['config_types'].items()
             }
-            
-            for key, pattern in patterns.items():
-                match = re.search(pattern, content)
-                if match:
-                    stats[key] = int(match.group(1))
-                else:
-                    stats[key] = 0
-            
-            # Calculate totals
-            total_items = sum(stats.values())
-            self.results['metrics']['backup_stats'] = stats
-            self.results['metrics']['total_items'] = total_items
-            
-            if total_items > 0:
+            totals = summary.get('totals', {})
+            errors = totals.get('errors', sum(int(e.get('errors') or 0) for e in summary['config_types'].values()))
+            if totals.get('duration_seconds') is not None:
+                self.results['metrics']['backup_duration'] = round(totals['duration_seconds'], 1)
+        else:
+            # Fall back to the text report written by older playbooks
+            summary_files = glob.glob(os.path.join(reports_dir, "backup_summary_*.txt"))
+            if not summary_files:
                 self.check_status(
                     "Backup Statistics", 
-                    True, 
-                    f"Total items backed up: {total_items}"
+                    False, 
+                    "Summary report not found"
                 )
-                
-                # Detailed breakdown
-                print(f"  {Colors.CYAN}Breakdown:{Colors.END}")
-                for item_type, count in stats.items():
-                    if count > 0:
-                        print(f"    - {item_type.replace('_', '').title()}: {count}")
-            else:
+                return
+            
+            try:
+                stats = self.parse_backup_summary_text(summary_files[0])
+            except Exception as e:
                 self.check_status(
                     "Backup Statistics", 
                     False, 
-                    "No configuration items found in backup"
+                    f"Error reading summary report: {str(e)}"
                 )
-                
-        except Exception as e:
+                return
+        
+        # Calculate totals
+        total_items = sum(stats.values())
+        self.results['metrics']['backup_stats'] = stats
+        self.results['metrics']['total_items'] = total_items
+        
+        if total_items > 0:
+            self.check_status(
+                "Backup Statistics", 
+                True, 
+                f"Total items backed up: {total_items}"
+            )
+            
+            # Detailed breakdown
+            print(f"  {Colors.CYAN}Breakdown:{Colors.END}")
+            for item_type, count in stats.items():
+                if count > 0:
+                    print(f"    - {item_type.replace('_', ' ').title()}: {count}")
+        else:
             self.check_status(
                 "Backup Statistics", 
                 False, 
-                f"Error reading summary report: {str(e)}"
+                "No configuration items found in backup"
+            )
+        
+        if errors:
+            failed = [t for t, e in summary['config_types'].items() if e.get('errors') or e.get('rc')]
+            self.check_status(
+                "Backup Errors",
+                total_items > 0,
+                f"{errors} error(s) reported for: {', '.join(failed[:3])}{'...' if len(failed) > 3 else ''}",
+                warning=True
             )
 
+    def get_manifest(self, operation_dir):
+        """Build the operation manifest once per run; returns (manifest, changes, previous)"""
+        if self.manifest_cache.get('operation_dir') != operation_dir:
+            previous = load_manifest(operation_dir)
+            manifest, changes = build_manifest(operation_dir, previous, force=self.rehash, workers=self.workers)
+            self.manifest_cache = {
+                'operation_dir': operation_dir,
+                'result': (manifest, changes, previous)
+            }
+        return self.manifest_cache['result']
+
     def check_file_integrity(self, operation_dir):
-        """Check file integrity and detect corruption"""
+        """Check file integrity against the stored manifest and detect corruption"""
         print(f"\n{Colors.BLUE}Checking File Integrity...{Colors.END}")
-        
-        corrupted_files = []
-        checked_files = 0
-        total_size = 0
-        
-        # Check all files in the operation directory
-        for root, dirs, files in os.walk(operation_dir):
-            for file in files:
-                filepath = os.path.join(root, file)
-                try:
-                    file_size = os.path.getsize(filepath)
-                    total_size += file_size
-                    checked_files += 1
-                    
-                    # Check if file can be opened and read
-                    with open(filepath, 'rb') as f:
-                        # Try to read first and last 1KB to detect truncation
-                        f.read(1024)
-                        if file_size > 2048:
-                            f.seek(-1024, 2)
-                            f.read(1024)
-                            
-                except Exception as e:
-                    corrupted_files.append(f"{os.path.basename(filepath)}: {str(e)}")
-        
+
+        # Only files whose size or mtime changed since the last post-check are re-read
+        manifest, changes, previous = self.get_manifest(operation_dir)
+
+        # Keep the single-pass scan results for the timing analysis
+        self.tree_scan = {
+            'operation_dir': operation_dir,
+            'newest_mtime_ns': changes['newest_mtime_ns']
+        }
+
+        corrupted_files = changes['errors']
+        checked_files = len(manifest['files'])
+        total_size = sum(entry[0] for entry in manifest['files'].values())
+
         self.results['metrics']['total_files'] = checked_files
         self.results['metrics']['total_size'] = total_size
-        
+        self.results['metrics']['rehashed_files'] = changes['rehashed']
+
         if corrupted_files:
             self.check_status(
                 "File Integrity", 
@@ -405,7 +500,153 @@ class SDWANPostCheck:
             self.check_status(
                 "File Integrity", 
                 True, 
-                f"All {checked_files} files passed integrity check ({self.format_file_size(total_size)})"
+                f"All {checked_files} files passed integrity check ({self.format_file_size(total_size)}, "
+                f"{changes['rehashed']} hashed, {changes['reused']} unchanged)"
+            )
+
+        if previous:
+            self.results['metrics']['manifest_changes'] = {
+                'added': len(changes['added']),
+                'removed': len(changes['removed']),
+                'changed': len(changes['changed'])
+            }
+            if changes['added'] or changes['removed'] or changes['changed']:
+                self.check_status(
+                    "Manifest Changes",
+                    True,
+                    f"{len(changes['added'])} added, {len(changes['removed'])} removed, "
+                    f"{len(changes['changed'])} changed since last post-check",
+                    warning=True
+                )
+                for label, paths in (('+', changes['added']), ('-', changes['removed']), ('~', changes['changed'])):
+                    for path in paths[:3]:  # Show first 3 of each
+                        print(f"    {Colors.YELLOW}{label} {path}{Colors.END}")
+            else:
+                self.check_status(
+                    "Manifest Changes",
+                    True,
+                    "No files added, removed or changed since last post-check"
+                )
+
+        try:
+            manifest_file = save_manifest(operation_dir, manifest)
+            self.results['metrics']['manifest_path'] = manifest_file
+        except OSError as e:
+            print(f"    {Colors.YELLOW}• Could not save manifest: {str(e)}{Colors.END}")
+
+    def check_backup_store(self, operation_dir):
+        """Verify the run manifest of a deduplicated backup against the object store"""
+        store = BackupStore(store_for(operation_dir))
+        name = os.path.basename(os.path.normpath(operation_dir))
+        run = store.load_run(name)
+        if run is None:
+            # Run was not snapshotted into a store; nothing to verify
+            return
+
+        print(f"\n{Colors.BLUE}Checking Backup Object Store...{Colors.END}")
+        # Sizes are checked with one stat per object; hashes come from the manifest built above
+        result = store.verify(name)
+        manifest, _, _ = self.get_manifest(operation_dir)
+        drifted = [
+            path for path, (size, digest) in run['files'].items()
+            if path in manifest['files'] and manifest['files'][path][2] != digest
+        ]
+        stats = run.get('stats', {})
+        self.results['metrics']['store_objects'] = result['files']
+        self.results['metrics']['store_new_bytes'] = stats.get('new_bytes', 0)
+
+        broken = result['missing'] + result['corrupt']
+        if broken:
+            self.check_status(
+                "Backup Object Store",
+                False,
+                f"{len(result['missing'])} objects missing, {len(result['corrupt'])} corrupt in {store.root}"
+            )
+            for path in broken[:3]:  # Show first 3
+                print(f"    {Colors.RED}• {path}{Colors.END}")
+        else:
+            self.check_status(
+                "Backup Object Store",
+                True,
+                f"All {result['files']} objects present ({stats.get('new_objects', 0)} new, "
+                f"{self.format_file_size(stats.get('bytes', 0) - stats.get('new_bytes', 0))} shared with earlier runs)"
+            )
+
+        if drifted:
+            self.check_status(
+                "Backup Store Drift",
+                True,
+                f"{len(drifted)} files changed since run '{name}' was stored",
+                warning=True
+            )
+
+    def check_json_outputs(self, operation_dir):
+        """Validate JSON and NDJSON collector outputs in a streaming pass"""
+        print(f"\n{Colors.BLUE}Validating JSON Outputs...{Colors.END}")
+
+        invalid_files = []
+        checked_files = 0
+        total_records = 0
+        compressed = {'files': 0, 'bytes': 0, 'raw_bytes': 0}
+
+        for root, dirs, files in os.walk(operation_dir):
+            for file in files:
+                name = plain_name(file)
+                if name.endswith('.meta.json') or not name.endswith(('.json', '.ndjson')):
+                    continue
+                filepath = os.path.join(root, file)
+                checked_files += 1
+                if codec_of(file):
+                    # The footer gives sizes and catches truncation without decompressing
+                    footer = read_footer(filepath)
+                    if footer is None or not footer['complete']:
+                        invalid_files.append(f"{os.path.relpath(filepath, operation_dir)}: "
+                                             f"missing or damaged frame footer (truncated?)")
+                        continue
+                    compressed['files'] += 1
+                    compressed['bytes'] += footer['file_bytes']
+                    compressed['raw_bytes'] += footer['raw_bytes']
+                valid, records, error = validate_json_file(filepath)
+                total_records += records
+                if not valid:
+                    invalid_files.append(f"{os.path.relpath(filepath, operation_dir)}: {error}")
+
+        self.results['metrics']['json_files'] = checked_files
+        self.results['metrics']['json_records'] = total_records
+        if compressed['files']:
+            self.results['metrics']['compressed_files'] = compressed['files']
+            self.results['metrics']['compressed_bytes'] = compressed['bytes']
+            self.results['metrics']['uncompressed_bytes'] = compressed['raw_bytes']
+
+        if not checked_files:
+            self.check_status(
+                "JSON Outputs",
+                True,
+                "No JSON or NDJSON files found",
+                warning=True
+            )
+        elif invalid_files:
+            self.check_status(
+                "JSON Outputs",
+                False,
+                f"{len(invalid_files)} of {checked_files} files are malformed or truncated"
+            )
+            for invalid in invalid_files[:3]:  # Show first 3
+                print(f"    {Colors.RED}• {invalid}{Colors.END}")
+        else:
+            self.check_status(
+                "JSON Outputs",
+                True,
+                f"All {checked_files} files parsed ({total_records} data records)"
+            )
+
+        if compressed['files']:
+            ratio = compressed['raw_bytes'] / compressed['bytes'] if compressed['bytes'] else 0
+            self.check_status(
+                "Compressed Outputs",
+                True,
+                f"{compressed['files']} files hold {self.format_file_size(compressed['raw_bytes'])} "
+                f"in {self.format_file_size(compressed['bytes'])} ({ratio:.1f}x)"
             )
 
     def check_archive_integrity(self, backup_dir):
@@ -430,33 +671,47 @@ class SDWANPostCheck:
             )
             return
         
-        archive_file = archives[0]
-        
-        try:
-            # Test archive integrity
-            with tarfile.open(archive_file, 'r:gz') as tar:
-                members = tar.getmembers()
-                file_count = len([m for m in members if m.isfile()])
-                
-                # Try to extract a few files to test
-                test_members = members[:min(5, len(members))]
-                for member in test_members:
-                    if member.isfile():
-                        tar.extractfile(member).read(1024)  # Read first 1KB
-                
-            self.check_status(
-                "Archive Integrity", 
-                True, 
-                f"Archive is valid ({file_count} files, {self.format_file_size(os.path.getsize(archive_file))})"
-            )
-            self.results['metrics']['archive_files'] = file_count
-            
-        except Exception as e:
-            self.check_status(
-                "Archive Integrity", 
-                False, 
-                f"Archive corruption detected: {str(e)}"
-            )
+        # Expected sizes and hashes of the on-disk tree (excluding the archives themselves)
+        manifest, _, _ = self.get_manifest(backup_dir)
+        expected = {
+            path: (entry[0], entry[2])
+            for path, entry in manifest['files'].items()
+            if not path.startswith('archives' + os.sep)
+        }
+
+        results = verify_archives(sorted(archives), expected, workers=self.workers)
+
+        total_files = 0
+        for result in results:
+            archive_name = os.path.basename(result['archive'])
+            total_files += result['files']
+            archive_size = self.format_file_size(os.path.getsize(result['archive']))
+
+            if result['error']:
+                self.check_status(
+                    f"Archive Integrity: {archive_name}",
+                    False,
+                    f"Archive corruption detected after {result['files']} files: {result['error']}"
+                )
+            elif result['mismatched']:
+                self.check_status(
+                    f"Archive Integrity: {archive_name}",
+                    False,
+                    f"{len(result['mismatched'])} of {result['files']} files differ from the data tree"
+                )
+                for mismatch in result['mismatched'][:3]:  # Show first 3
+                    print(f"    {Colors.RED}• {mismatch}{Colors.END}")
+            else:
+                self.check_status(
+                    f"Archive Integrity: {archive_name}",
+                    True,
+                    f"Archive is valid ({result['files']} files, {archive_size}, "
+                    f"{result['verified']} verified against data tree"
+                    f"{', ' + str(result['unmatched']) + ' not on disk' if result['unmatched'] else ''})"
+                )
+
+        self.results['metrics']['archive_files'] = total_files
+        self.results['metrics']['archives_verified'] = len(results)
 
     def check_operation_timing(self, operation_dir):
         """Analyze operation timing and performance"""
@@ -467,14 +722,15 @@ class SDWANPostCheck:
             dir_stat = os.stat(operation_dir)
             start_time = datetime.fromtimestamp(dir_stat.st_ctime)
             
-            # Find the newest file as end time approximation
+            # Find the newest file as end time approximation, reusing the integrity scan
+            if self.tree_scan.get('operation_dir') == operation_dir:
+                newest_mtime_ns = self.tree_scan['newest_mtime_ns']
+            else:
+                newest_mtime_ns = max((mtime for _, size, mtime in scan_tree(operation_dir) if mtime), default=None)
+
             newest_time = start_time
-            for root, dirs, files in os.walk(operation_dir):
-                for file in files:
-                    filepath = os.path.join(root, file)
-                    file_time = datetime.fromtimestamp(os.path.getmtime(filepath))
-                    if file_time > newest_time:
-                        newest_time = file_time
+            if newest_mtime_ns is not None:
+                newest_time = max(newest_time, datetime.fromtimestamp(newest_mtime_ns / 1e9))
             
             duration = newest_time - start_time
             duration_minutes = duration.total_seconds() / 60
@@ -516,6 +772,55 @@ class SDWANPostCheck:
                 f"Could not analyze timing: {str(e)}"
             )
 
+    def check_trace(self, operation_dir):
+        """Report latency percentiles, slowest devices and the critical path from trace spans"""
+        manifest, _, _ = self.get_manifest(operation_dir)
+        trace_files = [
+            os.path.join(operation_dir, path) for path in sorted(manifest['files'])
+            if os.path.basename(path) == TRACE_FILE_NAME
+        ]
+        # Trace files are appended to by every run; only the latest run of each file is reported
+        summary = summarize([span for path in trace_files for span in latest_run(load_spans([path]))])
+        if summary is None:
+            # Operation ran without tracing; the timing estimate above stands
+            return
+
+        print(f"\n{Colors.BLUE}Analyzing Operation Trace...{Colors.END}")
+        self.results['metrics']['trace'] = summary
+        self.check_status(
+            "Operation Trace",
+            True,
+            f"{summary['spans']} spans over {summary['wall_seconds']:.1f}s wall time "
+            f"from {len(trace_files)} trace file(s)"
+        )
+
+        # Endpoints where the operation spent the most time
+        busiest = sorted(summary['endpoints'].items(), key=lambda item: item[1]['total'], reverse=True)
+        for endpoint, stats in busiest[:5]:
+            print(f"    {Colors.CYAN}• {endpoint}{Colors.END}: {stats['count']} calls, "
+                  f"p50 {stats['p50']:.3f}s, p95 {stats['p95']:.3f}s, p99 {stats['p99']:.3f}s")
+
+        if summary['slowest_devices']:
+            print(f"  {Colors.WHITE}Slowest devices:{Colors.END}")
+            for device in summary['slowest_devices']:
+                print(f"    • {device['device']}: {device['total']:.2f}s over {device['requests']} requests "
+                      f"(max {device['max']:.2f}s)")
+
+        path = summary['critical_path']
+        print(f"  {Colors.WHITE}Critical path ({path['seconds']:.1f}s, {len(path['spans'])} spans):{Colors.END}")
+        for span in sorted(path['spans'], key=lambda s: s['duration'], reverse=True)[:5]:
+            where = f" [{span['device']}]" if span.get('device') else ''
+            print(f"    • {span['kind']} {span['endpoint']}{where}: {span['duration']:.2f}s")
+
+        errors = sum(stats['errors'] for stats in summary['endpoints'].values())
+        if errors:
+            self.check_status(
+                "Traced Request Errors",
+                True,
+                f"{errors} of {summary['spans']} spans failed",
+                warning=True
+            )
+
     def generate_recommendations(self):
         """Generate recommendations based on results"""
         print(f"\n{Colors.BLUE}Generating Recommendations...{Colors.END}")
@@ -687,6 +992,18 @@ class SDWANPostCheck:
             for i, recommendation in enumerate(self.results['recommendations'], 1):
                 print(f"  {i}. {recommendation}")
 
+    def register_in_catalog(self, operation_dir):
+        """Add a backup or list run made outside the runner scripts to the catalog"""
+        if self.operation_type == 'generated':
+            return
+        catalog = open_catalog()
+        if not catalog:
+            return
+        with catalog:
+            if not catalog.has_run(operation_dir):
+                run = catalog.index_directory(operation_dir, self.operation_type, parse=False)
+                print(f"{Colors.CYAN}Catalogued {len(run.artifacts)} files from {operation_dir}{Colors.END}")
+
     def run_all_checks(self, operation_dir=None):
         """Run all post-checks"""
         self.print_header()
@@ -711,10 +1028,16 @@ class SDWANPostCheck:
         
         if self.operation_type in ['list', 'both']:
             self.check_list_completion(operation_dir)
+
+        if self.operation_type == 'generated':
+            self.check_json_outputs(operation_dir)
         
         # Common checks for all operations
         self.check_file_integrity(operation_dir)
+        self.check_backup_store(operation_dir)
         self.check_operation_timing(operation_dir)
+        self.check_trace(operation_dir)
+        self.register_in_catalog(operation_dir)
         self.generate_recommendations()
         
         # Generate reports
@@ -730,16 +1053,23 @@ def main():
     """Main function"""
     parser = argparse.ArgumentParser(description='SD-WAN Automation Post-Check Script')
     parser.add_argument('--operation', '-o', 
-                       choices=['backup', 'list', 'both'], 
+                       choices=['backup', 'list', 'both', 'generated'],
                        default='backup',
                        help='Type of operation to validate (default: backup)')
     parser.add_argument('--directory', '-d', 
                        help='Specific operation directory to check')
+    parser.add_argument('--workers', '-w',
+                       type=int,
+                       default=None,
+                       help='Threads used for hashing files (default: number of CPUs)')
+    parser.add_argument('--rehash',
+                       action='store_true',
+                       help='Ignore the stored manifest and re-hash every file')
     
     try:
         args = parser.parse_args()
         
-        checker = SDWANPostCheck(args.operation)
+        checker = SDWANPostCheck(args.operation, rehash=args.rehash, workers=args.workers)
         exit_code = checker.run_all_checks(args.directory)
         sys.exit(exit_code)
         
@@ -11,6 +11,9 @@ SD-WAN automation playbooks. It checks:
 - Directory structure
 - Permissions
 
+Independent checks run concurrently; network checks keep their
+DNS -> port -> API ordering. Use --serial for the old behaviour.
+
 Author: SD-WAN Automation Team
 Version: 1.0
 """
@@ -20,10 +23,17 @@ import sys
 import subprocess
 import socket
 import requests
-from urllib3.packages.urllib3.exceptions import InsecureRequestWarning
-import json
+from urllib3.exceptions import InsecureRequestWarning
 from datetime import datetime
 import platform
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from vmanage_client import VManageClient, VManageAuthError
+from response_cache import ResponseCache
+from catalog import open_catalog
+from dag_runner import run_dag
 
 # Suppress SSL warnings for internal certificates
 requests.packages.urllib3.disable_warnings(InsecureRequestWarning)
@@ -39,14 +49,48 @@ class Colors:
     BOLD = '\033[1m'
     END = '\033[0m'
 
+class CheckOutput:
+    """Thread-aware stdout that buffers output of checks running in workers"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+
+    def start_capture(self):
+        """Start buffering output of the current thread"""
+        self.local.buffer = []
+
+    def stop_capture(self):
+        """Stop buffering and return the captured output of the current thread"""
+        captured = ''.join(getattr(self.local, 'buffer', None) or [])
+        self.local.buffer = None
+        return captured
+
+    def write(self, text):
+        buffer = getattr(self.local, 'buffer', None)
+        if buffer is not None:
+            buffer.append(text)
+        else:
+            self.stream.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
 class SDWANPreCheck:
-    def __init__(self):
+    def __init__(self, parallel=True, max_workers=8):
         self.results = {
             'passed': 0,
             'failed': 0,
             'warnings': 0,
+            'skipped': 0,
             'details': []
         }
+        self.parallel = parallel
+        self.max_workers = max_workers
+        self.check_timings = {}
+        self.timing_summary = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
         self.required_env_vars = [
             'VMANAGE_HOST',
             'VMANAGE_USERNAME', 
@@ -75,19 +119,39 @@ class SDWANPreCheck:
 
     def check_status(self, test_name, status, message="", warning=False):
         """Print check status and update results"""
+        # Checks running in the scheduler keep their details locally so
+        # they can be merged back in plan order
+        details = getattr(self._local, 'details', None)
+        if details is None:
+            details = self.results['details']
+
         if status:
             if warning:
                 print(f"{Colors.YELLOW}⚠  WARNING{Colors.END} - {test_name}: {message}")
-                self.results['warnings'] += 1
-                self.results['details'].append(f"WARNING: {test_name} - {message}")
+                with self._lock:
+                    self.results['warnings'] += 1
+                details.append(f"WARNING: {test_name} - {message}")
             else:
                 print(f"{Colors.GREEN}✓  PASS{Colors.END} - {test_name}: {message}")
-                self.results['passed'] += 1
-                self.results['details'].append(f"PASS: {test_name} - {message}")
+                with self._lock:
+                    self.results['passed'] += 1
+                details.append(f"PASS: {test_name} - {message}")
         else:
             print(f"{Colors.RED}✗  FAIL{Colors.END} - {test_name}: {message}")
-            self.results['failed'] += 1
-            self.results['details'].append(f"FAIL: {test_name} - {message}")
+            with self._lock:
+                self.results['failed'] += 1
+            details.append(f"FAIL: {test_name} - {message}")
+
+    def skip_status(self, test_name, failed_dependency):
+        """Print and record a check not run because a dependency failed; not a failure of its own"""
+        details = getattr(self._local, 'details', None)
+        if details is None:
+            details = self.results['details']
+        message = f"Skipped - depends on failed '{failed_dependency}' check"
+        print(f"{Colors.WHITE}-  SKIP{Colors.END} - {test_name}: {message}")
+        with self._lock:
+            self.results['skipped'] += 1
+        details.append(f"SKIP: {test_name} - {message}")
 
     def check_python_version(self):
         """Check Python version compatibility"""
@@ -150,100 +214,97 @@ class SDWANPreCheck:
     def check_required_tools(self):
         """Check if required command-line tools are available"""
         print(f"\n{Colors.BLUE}Checking Required Tools...{Colors.END}")
-        
-        for tool in self.required_tools:
-            try:
-                # Try to run the tool with --version or --help
-                if tool == 'sastre':
-                    result = subprocess.run([tool, '--version'], 
-                                          capture_output=True, text=True, timeout=10)
-                elif tool == 'ansible-playbook':
-                    result = subprocess.run([tool, '--version'], 
-                                          capture_output=True, text=True, timeout=10)
-                else:
-                    result = subprocess.run([tool, '--version'], 
-                                          capture_output=True, text=True, timeout=10)
-                
-                if result.returncode == 0:
-                    # Extract version info from output
-                    version_line = result.stdout.split('\n')[0] if result.stdout else "Version info not available"
-                    self.check_status(
-                        f"Tool: {tool}", 
-                        True, 
-                        version_line[:50] + "..." if len(version_line) > 50 else version_line
-                    )
-                else:
-                    self.check_status(
-                        f"Tool: {tool}", 
-                        False, 
-                        f"Tool found but returned error code {result.returncode}"
-                    )
-            except subprocess.TimeoutExpired:
-                self.check_status(
-                    f"Tool: {tool}", 
-                    False, 
-                    "Tool timed out (may be installed but not responding)"
-                )
-            except FileNotFoundError:
-                self.check_status(
-                    f"Tool: {tool}", 
-                    False, 
-                    "Tool not found - Please install"
-                )
-            except Exception as e:
-                self.check_status(
-                    f"Tool: {tool}", 
-                    False, 
-                    f"Error checking tool: {str(e)}"
-                )
 
-    def check_network_connectivity(self):
-        """Check network connectivity to vManage"""
+        # Tool probes are independent subprocesses, so launch them together
+        # and report in the configured order
+        if self.parallel:
+            with ThreadPoolExecutor(max_workers=len(self.required_tools)) as executor:
+                probes = list(executor.map(self.probe_tool, self.required_tools))
+        else:
+            probes = [self.probe_tool(tool) for tool in self.required_tools]
+
+        for tool, (status, message, elapsed) in zip(self.required_tools, probes):
+            self.check_status(f"Tool: {tool}", status, message)
+
+        # Serial-equivalent cost of this check is the sum of every probe
+        with self._lock:
+            self.check_timings['tools'] = sum(probe[2] for probe in probes)
+
+    def probe_tool(self, tool):
+        """Run a tool with --version and return (status, message, elapsed)"""
+        start = time.monotonic()
+        try:
+            result = subprocess.run([tool, '--version'],
+                                  capture_output=True, text=True, timeout=10)
+
+            if result.returncode == 0:
+                # Extract version info from output
+                version_line = result.stdout.split('\n')[0] if result.stdout else "Version info not available"
+                outcome = (True, version_line[:50] + "..." if len(version_line) > 50 else version_line)
+            else:
+                outcome = (False, f"Tool found but returned error code {result.returncode}")
+        except subprocess.TimeoutExpired:
+            outcome = (False, "Tool timed out (may be installed but not responding)")
+        except FileNotFoundError:
+            outcome = (False, "Tool not found - Please install")
+        except Exception as e:
+            outcome = (False, f"Error checking tool: {str(e)}")
+
+        return outcome + (time.monotonic() - start,)
+
+    def check_dns_resolution(self):
+        """Check that the vManage hostname resolves"""
         print(f"\n{Colors.BLUE}Checking Network Connectivity...{Colors.END}")
-        
+
         vmanage_host = os.environ.get('VMANAGE_HOST')
-        vmanage_port = os.environ.get('VMANAGE_PORT', '443')
-        
+
         if not vmanage_host:
             self.check_status(
-                "Network Connectivity", 
-                False, 
+                "Network Connectivity",
+                False,
                 "Cannot test - VMANAGE_HOST not set"
             )
-            return
-        
+            return False
+
         # Basic hostname resolution
         try:
             socket.gethostbyname(vmanage_host)
             self.check_status(
-                "DNS Resolution", 
-                True, 
+                "DNS Resolution",
+                True,
                 f"Successfully resolved {vmanage_host}"
             )
+            return True
         except socket.gaierror as e:
             self.check_status(
-                "DNS Resolution", 
-                False, 
+                "DNS Resolution",
+                False,
                 f"Cannot resolve {vmanage_host}: {str(e)}"
             )
-            return
-        
+            return False
+
+    def check_port_connectivity(self):
+        """Check that the vManage HTTPS port accepts connections"""
+        vmanage_host = os.environ.get('VMANAGE_HOST')
+        vmanage_port = os.environ.get('VMANAGE_PORT', '443')
+
         # Port connectivity
         try:
             sock = socket.create_connection((vmanage_host, int(vmanage_port)), timeout=10)
             sock.close()
             self.check_status(
-                "Port Connectivity", 
-                True, 
+                "Port Connectivity",
+                True,
                 f"Can connect to {vmanage_host}:{vmanage_port}"
             )
+            return True
         except Exception as e:
             self.check_status(
-                "Port Connectivity", 
-                False, 
+                "Port Connectivity",
+                False,
                 f"Cannot connect to {vmanage_host}:{vmanage_port} - {str(e)}"
             )
-            return
+            return False
 
     def check_vmanage_api(self):
         """Check vManage API accessibility"""
@@ -263,52 +324,61 @@ class SDWANPreCheck:
             return
         
         try:
-            # Test API endpoint
-            url = f"https://{vmanage_host}:{vmanage_port}/dataservice/system/device/controllers"
-            
-            response = requests.get(
-                url,
-                auth=(vmanage_username, vmanage_password),
-                verify=False,
-                timeout=30,
-                headers={'Content-Type': 'application/json'}
-            )
-            
-            if response.status_code == 200:
-                try:
-                    data = response.json()
-                    device_count = len(data.get('data', []))
+            # Test API endpoint over a session login, the same way the collectors authenticate;
+            # cached answers are never read, as they would pass without checking the credentials
+            cache = ResponseCache.from_env(bypass=True)
+            with VManageClient(vmanage_host, vmanage_username, vmanage_password,
+                               port=vmanage_port, timeout=30, cache=cache) as client:
+                result = client.fetch('/dataservice/system/device/controllers', raise_errors=True)
+            status_code = result['status']
+
+            if status_code == 200:
+                if 'json' in result:
+                    device_count = len(result['json'].get('data', []))
                     self.check_status(
                         "vManage API Access", 
                         True, 
                         f"Successfully authenticated - Found {device_count} controllers"
                     )
-                except json.JSONDecodeError:
+                else:
                     self.check_status(
                         "vManage API Access", 
                         True, 
                         "Authentication successful but response not JSON",
                         warning=True
                     )
-            elif response.status_code == 401:
+            elif status_code == 401:
                 self.check_status(
                     "vManage API Access", 
                     False, 
                     "Authentication failed - Check username/password"
                 )
-            elif response.status_code == 403:
+            elif status_code == 403:
                 self.check_status(
                     "vManage API Access", 
                     False, 
                     "Access forbidden - Check user permissions"
                 )
+            elif status_code in (429, 503):
+                self.check_status(
+                    "vManage API Access",
+                    True,
+                    f"vManage is throttling API requests (HTTP {status_code}) - collectors will back off",
+                    warning=True
+                )
             else:
                 self.check_status(
                     "vManage API Access", 
                     False, 
-                    f"API returned status code {response.status_code}"
+                    f"API returned status code {status_code}"
                 )
                 
+        except VManageAuthError:
+            self.check_status(
+                "vManage API Access",
+                False,
+                "Authentication failed - Check username/password"
+            )
         except requests.exceptions.SSLError:
             self.check_status(
                 "vManage API Access", 
@@ -386,36 +456,56 @@ class SDWANPreCheck:
         ]
         
         current_dir = os.getcwd()
-        
-        for playbook in playbook_files:
-            # Check in current directory first
-            if os.path.exists(playbook):
-                self.check_status(
-                    f"Playbook: {playbook}", 
-                    True, 
-                    f"Found in {current_dir}"
-                )
-            else:
-                # Check in subdirectories
-                found = False
-                for root, dirs, files in os.walk(current_dir):
-                    if playbook in files:
-                        rel_path = os.path.relpath(root, current_dir)
+        catalog = open_catalog()
+        try:
+            for playbook in playbook_files:
+                # Check in current directory first
+                if os.path.exists(playbook):
+                    self.check_status(
+                        f"Playbook: {playbook}", 
+                        True, 
+                        f"Found in {current_dir}"
+                    )
+                elif catalog:
+                    # Indexed lookup; the catalog walks the project only when the playbook moved or is new
+                    path = catalog.find_playbook(playbook, current_dir)
+                    if path:
                         self.check_status(
                             f"Playbook: {playbook}", 
                             True, 
-                            f"Found in {rel_path}/",
+                            f"Found in {os.path.relpath(os.path.dirname(path), current_dir)}/",
                             warning=True
                         )
-                        found = True
-                        break
+                    else:
+                        self.check_status(
+                            f"Playbook: {playbook}", 
+                            False, 
+                            "Not found in project directory"
+                        )
+                else:
+                    # Check in subdirectories
+                    found = False
+                    for root, dirs, files in os.walk(current_dir):
+                        if playbook in files:
+                            rel_path = os.path.relpath(root, current_dir)
+                            self.check_status(
+                                f"Playbook: {playbook}", 
+                                True, 
+                                f"Found in {rel_path}/",
+                                warning=True
+                            )
+                            found = True
+                            break
                 
-                if not found:
-                    self.check_status(
-                        f"Playbook: {playbook}", 
-                        False, 
-                        "Not found in project directory"
-                    )
+                    if not found:
+                        self.check_status(
+                            f"Playbook: {playbook}", 
+                            False, 
+                            "Not found in project directory"
+                        )
+        finally:
+            if catalog:
+                catalog.close()
 
     def print_summary(self):
         """Print final summary"""
@@ -430,6 +520,8 @@ class SDWANPreCheck:
         print(f"{Colors.GREEN}✓  Passed: {self.results['passed']}{Colors.END}")
         print(f"{Colors.RED}✗  Failed: {self.results['failed']}{Colors.END}")
         print(f"{Colors.YELLOW}⚠  Warnings: {self.results['warnings']}{Colors.END}")
+        if self.results['skipped']:
+            print(f"{Colors.WHITE}-  Skipped: {self.results['skipped']} (dependency failed){Colors.END}")
         print(f"{Colors.WHITE}📊 Total Checks: {total_checks}{Colors.END}")
         
         if self.results['failed'] == 0:
@@ -460,7 +552,14 @@ class SDWANPreCheck:
                 f.write("Summary:\n")
                 f.write(f"- Passed: {self.results['passed']}\n")
                 f.write(f"- Failed: {self.results['failed']}\n")
-                f.write(f"- Warnings: {self.results['warnings']}\n\n")
+                f.write(f"- Warnings: {self.results['warnings']}\n")
+                f.write(f"- Skipped: {self.results['skipped']}\n\n")
+
+                if self.timing_summary:
+                    f.write("Timing:\n")
+                    f.write(f"- Mode: {self.timing_summary['mode']}\n")
+                    f.write(f"- Wall-clock: {self.timing_summary['wall_seconds']:.2f}s\n")
+                    f.write(f"- Serial: {self.timing_summary['serial_seconds']:.2f}s\n\n")
                 
                 f.write("Detailed Results:\n")
                 for detail in self.results['details']:
@@ -471,19 +570,111 @@ class SDWANPreCheck:
         except Exception as e:
             print(f"{Colors.RED}⚠  Could not save results: {str(e)}{Colors.END}")
 
+    def get_check_plan(self):
+        """Return the ordered check plan as (name, check, dependencies) tuples"""
+        return [
+            ('python_version', self.check_python_version, []),
+            ('environment', self.check_environment_variables, []),
+            ('tools', self.check_required_tools, []),
+            ('directories', self.check_directory_structure, []),
+            ('playbooks', self.check_playbook_files, []),
+            ('dns', self.check_dns_resolution, []),
+            ('port', self.check_port_connectivity, ['dns']),
+            ('api', self.check_vmanage_api, ['port']),
+        ]
+
+    def run_check(self, name, check):
+        """Run a single check with buffered output and return its outcome"""
+        self._local.details = []
+        sys.stdout.start_capture()
+        start = time.monotonic()
+        try:
+            outcome = check()
+        except Exception as e:
+            self.check_status(name, False, f"Unexpected error: {str(e)}")
+            outcome = False
+        elapsed = time.monotonic() - start
+        output = sys.stdout.stop_capture()
+        details = self._local.details
+        self._local.details = None
+
+        with self._lock:
+            self.check_timings.setdefault(name, elapsed)
+        return outcome, output, details
+
+    def skip_check(self, name, failed_dependency):
+        """Record a check that was not run because a dependency failed"""
+        self._local.details = []
+        sys.stdout.start_capture()
+        self.skip_status(f"Check: {name}", failed_dependency)
+        output = sys.stdout.stop_capture()
+        details = self._local.details
+        self._local.details = None
+        return False, output, details
+
+    def run_scheduled_checks(self):
+        """Run the check plan concurrently while honouring dependencies"""
+        plan = self.get_check_plan()
+        order = [name for name, _, _ in plan]
+        completed = {}
+        printed = [0]
+        original_stdout = sys.stdout
+
+        def flush(name, result):
+            # Flush finished checks in plan order for a stable report
+            completed[name] = result
+            while printed[0] < len(order) and order[printed[0]] in completed:
+                _, output, details = completed[order[printed[0]]]
+                original_stdout.write(output)
+                original_stdout.flush()
+                self.results['details'].extend(details)
+                printed[0] += 1
+
+        sys.stdout = CheckOutput(original_stdout)
+        try:
+            # A check fails its dependants only by returning False; None counts as passed
+            run_dag(plan, self.run_check, self.skip_check, lambda result: result[0] is not False,
+                    workers=self.max_workers, on_done=flush)
+        finally:
+            sys.stdout = original_stdout
+
+    def run_serial_checks(self):
+        """Run the check plan one check at a time"""
+        outcomes = {}
+        for name, check, deps in self.get_check_plan():
+            failed = [dep for dep in deps if outcomes.get(dep) is False]
+            if failed:
+                self.skip_status(f"Check: {name}", failed[0])
+                outcomes[name] = False
+                continue
+            start = time.monotonic()
+            outcomes[name] = check()
+            self.check_timings.setdefault(name, time.monotonic() - start)
+
+    def print_timing(self):
+        """Print wall-clock time next to the serial-equivalent time"""
+        wall_time = self.timing_summary['wall_seconds']
+        serial_time = self.timing_summary['serial_seconds']
+        print(f"\n{Colors.CYAN}⏱  Check time: {wall_time:.2f}s wall-clock "
+              f"(serial: {serial_time:.2f}s, mode: {self.timing_summary['mode']}){Colors.END}")
+
     def run_all_checks(self):
         """Run all pre-checks"""
         self.print_header()
-        
+
         # Run all checks
-        self.check_python_version()
-        self.check_environment_variables()
-        self.check_required_tools()
-        self.check_directory_structure()
-        self.check_playbook_files()
-        self.check_network_connectivity()
-        self.check_vmanage_api()
-        
+        start = time.monotonic()
+        if self.parallel:
+            self.run_scheduled_checks()
+        else:
+            self.run_serial_checks()
+        self.timing_summary = {
+            'mode': 'parallel' if self.parallel else 'serial',
+            'wall_seconds': time.monotonic() - start,
+            'serial_seconds': sum(self.check_timings.values())
+        }
+        self.print_timing()
+
         # Print summary
         self.print_summary()
         
@@ -492,8 +683,19 @@ class SDWANPreCheck:
 
 def main():
     """Main function"""
+    parser = argparse.ArgumentParser(description='SD-WAN Automation Pre-Check Script')
+    parser.add_argument('--serial',
+                       action='store_true',
+                       help='Run checks one at a time instead of concurrently')
+    parser.add_argument('--workers', '-w',
+                       type=int,
+                       default=8,
+                       help='Maximum number of checks to run at once (default: 8)')
+
     try:
-        checker = SDWANPreCheck()
+        args = parser.parse_args()
+
+        checker = SDWANPreCheck(parallel=not args.serial, max_workers=args.workers)
         exit_code = checker.run_all_checks()
         sys.exit(exit_code)
     except KeyboardInterrupt:
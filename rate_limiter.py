@@ -0,0 +1,204 @@
+"""
+SD-WAN vManage Adaptive Rate Limiter
+====================================
+
+Client-side pacing shared by every VManageClient talking to the same
+vManage host in a process. Each host gets:
+- A token bucket capping the request rate (with a small burst), kept
+  below vManage's 100 requests/second so bursts are not throttled
+- An AIMD concurrency limit: halved on 429/503 or a latency spike,
+  raised by one slot per window of healthy responses
+- Latency spikes measured against each endpoint's own moving baseline,
+  so slow fabric-wide endpoints do not hold the limit down
+- A pause honouring Retry-After when vManage asks us to slow down
+
+Settings come from VMANAGE_RATE, VMANAGE_BURST, VMANAGE_CONCURRENCY,
+VMANAGE_MAX_CONCURRENCY and VMANAGE_SPIKE_FACTOR; VMANAGE_RATE_LIMIT=off
+disables the limiter.
+
+Author: SD-WAN Automation Team
+Version: 1.0
+"""
+
+import os
+import time
+import threading
+from contextlib import contextmanager
+
+# Status codes vManage uses to push back; -1 is a transport failure
+THROTTLE_STATUS = {429, 503}
+OVERLOAD_STATUS = {-1, 502, 504}
+
+# vManage allows 100 requests/second; rate plus burst stays under it in any one second
+DEFAULT_RATE = 80.0
+DEFAULT_BURST = 10
+DEFAULT_CONCURRENCY = 8
+DEFAULT_MIN_CONCURRENCY = 1
+DEFAULT_MAX_CONCURRENCY = 32
+DEFAULT_SPIKE_FACTOR = 3.0
+# Responses faster than this never count as a spike, whatever the baseline
+MIN_SPIKE_LATENCY = 0.5
+
+def parse_retry_after(value):
+    """Return the Retry-After delay in seconds, or None"""
+    try:
+        return max(float(value), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+class TokenBucket:
+    """Thread-safe token bucket"""
+
+    def __init__(self, rate, burst):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def pause(self, seconds):
+        """Hand out no tokens for the next `seconds`"""
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.tokens = 0.0
+
+    def acquire(self):
+        """Block until a token is available; returns the seconds waited"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now >= self.paused_until:
+                    self.tokens = min(self.burst, self.tokens + (now - max(self.updated, self.paused_until)) * self.rate)
+                    self.updated = now
+                    if self.tokens >= 1.0:
+                        self.tokens -= 1.0
+                        return waited
+                    delay = (1.0 - self.tokens) / self.rate
+                else:
+                    delay = self.paused_until - now
+            time.sleep(delay)
+            waited += delay
+
+class AIMDLimiter:
+    """Additive-increase / multiplicative-decrease concurrency limit"""
+
+    def __init__(self, initial=DEFAULT_CONCURRENCY, minimum=DEFAULT_MIN_CONCURRENCY,
+                 maximum=DEFAULT_MAX_CONCURRENCY, decrease=0.5, spike_factor=DEFAULT_SPIKE_FACTOR):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = float(max(minimum, min(initial, maximum)))
+        self.decrease = decrease
+        self.spike_factor = spike_factor
+        self.in_flight = 0
+        # EWMA of response latency per endpoint
+        self.baselines = {}
+        self.last_decrease = 0.0
+        self.decreases = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        """Block until a concurrency slot is free; returns the seconds waited"""
+        start = time.monotonic()
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+        return time.monotonic() - start
+
+    def is_spike(self, latency, endpoint=None):
+        """Return True when a response took far longer than usual for its endpoint"""
+        baseline = self.baselines.get(endpoint)
+        return baseline is not None and latency > MIN_SPIKE_LATENCY and latency > self.spike_factor * baseline
+
+    def release(self, status, latency, endpoint=None):
+        """Free a slot and adapt the limit to how the response looked; returns True on back-off"""
+        with self._cond:
+            self.in_flight -= 1
+            now = time.monotonic()
+            pushed_back = status in THROTTLE_STATUS or status in OVERLOAD_STATUS
+            backoff = pushed_back or self.is_spike(latency, endpoint)
+
+            if backoff:
+                # One decrease per round trip, so a burst of failures does not collapse the limit
+                if now - self.last_decrease >= max(self.baselines.get(endpoint) or 0.0, 0.1):
+                    self.limit = max(self.minimum, self.limit * self.decrease)
+                    self.last_decrease = now
+                    self.decreases += 1
+            else:
+                self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            if not pushed_back:
+                # Spikes feed the baseline too, so an endpoint that stays slower is re-learned
+                baseline = self.baselines.get(endpoint)
+                self.baselines[endpoint] = latency if baseline is None else 0.9 * baseline + 0.1 * latency
+            self._cond.notify_all()
+            return backoff
+
+class HostRateLimiter:
+    """Token bucket plus AIMD concurrency for one vManage host"""
+
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST, **aimd):
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        self.aimd = AIMDLimiter(**aimd)
+        self.requests = 0
+        self.throttled = 0
+        self.backoffs = 0
+        self.waited = 0.0
+        self._stats_lock = threading.Lock()
+
+    @contextmanager
+    def slot(self, endpoint=None):
+        """Hold one request slot; the caller fills in the yielded ticket with the outcome"""
+        waited = self.aimd.acquire()
+        if self.bucket:
+            waited += self.bucket.acquire()
+        ticket = {'status': -1, 'latency': 0.0, 'retry_after': None}
+        start = time.monotonic()
+        try:
+            yield ticket
+        finally:
+            latency = ticket['latency'] or (time.monotonic() - start)
+            backoff = self.aimd.release(ticket['status'], latency, endpoint)
+            if ticket['status'] in THROTTLE_STATUS and self.bucket:
+                self.bucket.pause(ticket['retry_after'] if ticket['retry_after'] is not None else 1.0)
+            with self._stats_lock:
+                self.requests += 1
+                self.waited += waited
+                if ticket['status'] in THROTTLE_STATUS:
+                    self.throttled += 1
+                if backoff:
+                    self.backoffs += 1
+
+    def stats(self):
+        """Return counters for reports"""
+        with self._stats_lock:
+            return {
+                'requests': self.requests,
+                'throttled': self.throttled,
+                'backoffs': self.backoffs,
+                'concurrency_limit': int(self.aimd.limit),
+                'waited_seconds': round(self.waited, 3)
+            }
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+def limiter_from_env():
+    """Build a HostRateLimiter from the VMANAGE_* rate settings, or None when disabled"""
+    if os.environ.get('VMANAGE_RATE_LIMIT', '').strip().lower() in ('0', 'off', 'false', 'no'):
+        return None
+    return HostRateLimiter(
+        rate=float(os.environ.get('VMANAGE_RATE', DEFAULT_RATE)),
+        burst=int(os.environ.get('VMANAGE_BURST', DEFAULT_BURST)),
+        initial=int(os.environ.get('VMANAGE_CONCURRENCY', DEFAULT_CONCURRENCY)),
+        maximum=int(os.environ.get('VMANAGE_MAX_CONCURRENCY', DEFAULT_MAX_CONCURRENCY)),
+        spike_factor=float(os.environ.get('VMANAGE_SPIKE_FACTOR', DEFAULT_SPIKE_FACTOR))
+    )
+
+def limiter_for(base_url):
+    """Return the limiter shared by every client of one vManage host in this process"""
+    with _limiters_lock:
+        if base_url not in _limiters:
+            _limiters[base_url] = limiter_from_env()
+        return _limiters[base_url]
@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+"""
+SD-WAN Incremental Report Renderer
+==================================
+
+Renders dataservice record lists into the playbooks' text report layout
+without building the whole report in memory. Records are parsed from the
+HTTP stream (or a saved .json/.ndjson file) one at a time and written to
+every requested format in the same pass:
+- text: the layout of the playbooks' copy/content reports
+- csv:  one row per record with the same columns
+- html: one table row per record
+
+Report bodies are spooled to a temporary file so the record total can
+still be printed above the records, as the text reports always did.
+
+Author: SD-WAN Automation Team
+Version: 1.0
+"""
+
+import io
+import os
+import sys
+import csv
+import json
+import html
+import shutil
+import argparse
+import tempfile
+from datetime import datetime, timezone
+from requests import RequestException
+from stream_writer import CHUNK_SIZE, JSONRecordStream, StreamParseError, iter_file_chunks
+from vmanage_client import VManageClient, VManageError
+from tracing import TRACE_FILE_NAME, configure, get_tracer
+from compressed_io import plain_name, open_input
+
+class Colors:
+    """Color codes for terminal output"""
+    GREEN = '\033[92m'
+    RED = '\033[91m'
+    YELLOW = '\033[93m'
+    BLUE = '\033[94m'
+    CYAN = '\033[96m'
+    WHITE = '\033[97m'
+    BOLD = '\033[1m'
+    END = '\033[0m'
+
+FORMATS = ('text', 'csv', 'html')
+MISSING = 'N/A'
+
+# Report layouts: fields are (label, record key) or (label, record key, suffix)
+REPORTS = {
+    'bfd_sessions': {
+        'path': '/dataservice/device/bfd/sessions',
+        'title': 'BFD Sessions',
+        'underline': 40,
+        'data_label': 'BFD Sessions Data',
+        'total_label': 'Total Sessions',
+        'entry_label': 'Session',
+        'empty': 'No BFD sessions data available.',
+        'fields': [
+            ('System IP', 'system-ip'), ('Hostname', 'hostname'), ('Site ID', 'site-id'),
+            ('Local Color', 'local-color'), ('Remote Color', 'remote-color'),
+            ('Source IP', 'src-ip'), ('Destination IP', 'dst-ip'),
+            ('Source Port', 'src-port'), ('Destination Port', 'dst-port'),
+            ('Protocol', 'proto'), ('Detect Multiplier', 'detect-multiplier'),
+            ('TX Interval', 'tx-interval'), ('RX Interval', 'rx-interval'),
+            ('State', 'state'), ('Transitions', 'transitions'),
+            ('TX Packets', 'tx-packets'), ('RX Packets', 'rx-packets'),
+            ('Uptime', 'uptime'), ('Downtime', 'downtime')
+        ]
+    },
+    'bfd_summary': {
+        'path': '/dataservice/device/bfd/summary',
+        'title': 'BFD Summary Statistics',
+        'underline': 47,
+        'data_label': 'BFD Summary Data',
+        'total_label': None,
+        'entry_label': None,
+        'empty': 'No BFD summary data available.',
+        'fields': [
+            ('System IP', 'system-ip'), ('Hostname', 'hostname'), ('Site ID', 'site-id'),
+            ('Total Sessions', 'sessions-total'), ('Sessions Up', 'sessions-up'),
+            ('Sessions Down', 'sessions-down'), ('Total Flaps', 'sessions-flap'),
+            ('Percentage Up', 'percentage-up', '%'), ('Last Updated', 'lastupdated'),
+            ('Entry Time', 'entry_time')
+        ]
+    },
+    'bfd_history': {
+        'path': '/dataservice/device/bfd/history',
+        'title': 'BFD History',
+        'underline': 36,
+        'data_label': 'BFD History Data',
+        'total_label': 'Total History Entries',
+        'entry_label': 'History Entry',
+        'empty': 'No BFD history data available.',
+        'fields': [
+            ('System IP', 'system-ip'), ('Hostname', 'hostname'), ('Site ID', 'site-id'),
+            ('Remote System IP', 'remote-system-ip'), ('Local Color', 'local-color'),
+            ('Remote Color', 'remote-color'), ('Source IP', 'src-ip'),
+            ('Destination IP', 'dst-ip'), ('Event', 'event'), ('Event Time', 'event-time'),
+            ('State', 'state'), ('RX Interval', 'rx-interval'), ('TX Interval', 'tx-interval'),
+            ('Detect Multiplier', 'detect-multiplier')
+        ]
+    },
+    'bfd_links': {
+        'path': '/dataservice/device/bfd/links',
+        'title': 'BFD Links Status',
+        'underline': 40,
+        'data_label': 'BFD Links Data',
+        'total_label': 'Total Links',
+        'entry_label': 'Link',
+        'empty': 'No BFD links data available.',
+        'fields': [
+            ('System IP', 'system-ip'), ('Hostname', 'hostname'), ('Site ID', 'site-id'),
+            ('Interface', 'interface'), ('Public IP', 'public-ip'), ('Public Port', 'public-port'),
+            ('Private IP', 'private-ip'), ('Private Port', 'private-port'), ('Color', 'color'),
+            ('State', 'state'), ('Admin State', 'admin-state'), ('Oper State', 'oper-state'),
+            ('Remote System IP', 'remote-system-ip'), ('Remote Public IP', 'remote-public-ip'),
+            ('Remote Public Port', 'remote-public-port'), ('Remote Color', 'remote-color'),
+            ('Protocol', 'protocol'), ('Encapsulation', 'encap'),
+            ('Loss Percentage', 'loss-percentage'), ('Latency', 'latency'), ('Jitter', 'jitter'),
+            ('TX Bandwidth', 'tx-bandwidth'), ('RX Bandwidth', 'rx-bandwidth'), ('Quality', 'quality')
+        ]
+    }
+}
+
+def field_values(spec, record):
+    """Return (label, rendered value) pairs for one record"""
+    values = []
+    for field in spec['fields']:
+        label, key = field[0], field[1]
+        suffix = field[2] if len(field) > 2 else ''
+        values.append((label, f"{record.get(key, MISSING)}{suffix}"))
+    return values
+
+def iter_ndjson(path):
+    """Yield records from an NDJSON file, compressed or not"""
+    with open_input(path, 'r') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+class ReportWriter:
+    """Write one report format; the body is spooled until the total is known"""
+    extension = None
+
+    def __init__(self, spec, path):
+        self.spec = spec
+        self.path = path
+        self.body = tempfile.TemporaryFile('w+', dir=os.path.dirname(path) or '.')
+
+    def write_record(self, index, record):
+        raise NotImplementedError
+
+    def preamble(self, header, count):
+        raise NotImplementedError
+
+    def epilogue(self, header, count):
+        return ''
+
+    def finish(self, header, count):
+        """Assemble preamble, spooled body and epilogue into the report file"""
+        tmp_path = f"{self.path}.tmp"
+        with get_tracer().span('write', os.path.basename(self.path)) as span:
+            with open(tmp_path, 'w', newline='') as f:
+                f.write(self.preamble(header, count))
+                # Records spooled before a mid-stream failure are dropped with the error report
+                if header['status'] == 200:
+                    self.body.seek(0)
+                    shutil.copyfileobj(self.body, f, CHUNK_SIZE)
+                f.write(self.epilogue(header, count))
+                span['bytes'] = f.tell()
+            self.body.close()
+            os.replace(tmp_path, self.path)
+
+class TextWriter(ReportWriter):
+    extension = 'txt'
+
+    def write_record(self, index, record):
+        lines = [f"{self.spec['entry_label']} {index}:"] if self.spec['entry_label'] else []
+        for position, (label, value) in enumerate(field_values(self.spec, record)):
+            lines.append(f"{'- ' if position == 0 else '  '}{label}: {value}")
+        self.body.write('\n'.join(lines) + '\n\n')
+
+    def preamble(self, header, count):
+        lines = [
+            f"{self.spec['title']} - {header['generated']}",
+            '=' * self.spec['underline'],
+            f"vManage Host: {header['host']}",
+            f"API Status: {header['api_status']}",
+            ''
+        ]
+        if header['status'] != 200:
+            lines += [
+                'Error Details:',
+                f"Status Code: {header['status']}",
+                f"Error Message: {header['msg']}"
+            ]
+        else:
+            lines.append(f"{self.spec['data_label']}:")
+            if not count:
+                lines.append(self.spec['empty'])
+            elif self.spec['total_label']:
+                lines += [f"{self.spec['total_label']}: {count}", '']
+        return '\n'.join(lines) + '\n'
+
+class CSVWriter(ReportWriter):
+    extension = 'csv'
+
+    def __init__(self, spec, path):
+        super().__init__(spec, path)
+        self.writer = csv.writer(self.body, lineterminator='\n')
+
+    def write_record(self, index, record):
+        self.writer.writerow([index] + [value for _, value in field_values(self.spec, record)])
+
+    def preamble(self, header, count):
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator='\n').writerow(['#'] + [field[0] for field in self.spec['fields']])
+        return buffer.getvalue()
+
+class HTMLWriter(ReportWriter):
+    extension = 'html'
+
+    def write_record(self, index, record):
+        cells = ''.join(f"<td>{html.escape(value)}</td>" for _, value in field_values(self.spec, record))
+        self.body.write(f"<tr><td>{index}</td>{cells}</tr>\n")
+
+    def preamble(self, header, count):
+        title = html.escape(f"{self.spec['title']} - {header['generated']}")
+        parts = [
+            '<!DOCTYPE html>',
+            f'<html><head><meta charset="utf-8"><title>{title}</title>',
+            '<style>body{font-family:sans-serif}table{border-collapse:collapse}'
+            'th,td{border:1px solid #ccc;padding:2px 6px;text-align:left}</style></head><body>',
+            f'<h1>{title}</h1>',
+            f"<p>vManage Host: {html.escape(str(header['host']))}<br>"
+            f"API Status: {html.escape(header['api_status'])}</p>"
+        ]
+        if header['status'] != 200:
+            parts.append(f"<h2>Error Details</h2><p>Status Code: {header['status']}<br>"
+                         f"Error Message: {html.escape(str(header['msg']))}</p>")
+        elif not count:
+            parts.append(f"<p>{html.escape(self.spec['empty'])}</p>")
+        else:
+            if self.spec['total_label']:
+                parts.append(f"<p>{html.escape(self.spec['total_label'])}: {count}</p>")
+            headings = ''.join(f"<th>{html.escape(field[0])}</th>" for field in self.spec['fields'])
+            parts.append(f"<table><thead><tr><th>#</th>{headings}</tr></thead><tbody>")
+        return '\n'.join(parts) + '\n'
+
+    def epilogue(self, header, count):
+        closing = '</tbody></table>\n' if header['status'] == 200 and count else ''
+        return f"{closing}</body></html>\n"
+
+WRITERS = {'text': TextWriter, 'csv': CSVWriter, 'html': HTMLWriter}
+
+class ReportRenderer:
+    def __init__(self, output_dir, formats=('text',), host=None):
+        unknown = set(formats) - set(FORMATS)
+        if unknown:
+            raise ValueError(f"Unknown format(s) {', '.join(sorted(unknown))} (choose from {', '.join(FORMATS)})")
+        self.output_dir = output_dir
+        self.formats = list(formats)
+        self.host = host or os.environ.get('VMANAGE_HOST')
+
+    def render(self, name, records, status=200, msg='OK'):
+        """Write every format of one report from an iterable of records"""
+        spec = REPORTS[name]
+        os.makedirs(self.output_dir, exist_ok=True)
+        writers = [WRITERS[fmt](spec, os.path.join(self.output_dir, f"{name}.{WRITERS[fmt].extension}"))
+                   for fmt in self.formats]
+
+        count = 0
+        if status == 200:
+            try:
+                for count, record in enumerate(records, 1):
+                    for writer in writers:
+                        writer.write_record(count, record)
+            except (StreamParseError, ValueError, RequestException) as e:
+                status, msg = -1, f"Invalid or truncated response after {count} records: {str(e)}"
+
+        header = {
+            'generated': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'host': self.host,
+            'status': status,
+            'msg': msg,
+            'api_status': 'Available' if status == 200 else f"Unavailable (HTTP {status})"
+        }
+        for writer in writers:
+            writer.finish(header, count if status == 200 else 0)
+        return {
+            'status': status,
+            'msg': msg,
+            'records': count if status == 200 else 0,
+            'files': [writer.path for writer in writers]
+        }
+
+    def render_file(self, name, path):
+        """Render a report from a saved .json or .ndjson response"""
+        records = iter_ndjson(path) if plain_name(path).endswith('.ndjson') else JSONRecordStream(iter_file_chunks(path))
+        return self.render(name, records)
+
+    def render_endpoint(self, client, name, timeout=None):
+        """Stream a report's endpoint and render it record by record"""
+        try:
+            response = client.get(REPORTS[name]['path'], timeout=timeout, stream=True)
+        except (VManageError, RequestException) as e:
+            return self.render(name, [], status=-1, msg=str(e))
+        try:
+            if response.status_code != 200:
+                return self.render(name, [], status=response.status_code, msg=response.reason or 'Unknown error')
+            records = JSONRecordStream(response.iter_content(chunk_size=CHUNK_SIZE))
+            return self.render(name, records, msg=response.reason or 'OK')
+        finally:
+            response.close()
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='SD-WAN Incremental Report Renderer')
+    parser.add_argument('reports', nargs='+', choices=sorted(REPORTS),
+                       help='Reports to render')
+    parser.add_argument('--output-dir', '-d', required=True,
+                       help='Directory for the rendered reports')
+    parser.add_argument('--format', '-f', action='append', choices=FORMATS, dest='formats',
+                       help='Output format, repeatable (default: text)')
+    parser.add_argument('--input', '-i', action='append', default=[], metavar='REPORT=FILE',
+                       help='Render a report from a saved .json/.ndjson file instead of the API')
+    parser.add_argument('--timeout', '-t', type=int, default=300,
+                       help='Request timeout in seconds (default: 300)')
+    parser.add_argument('--ansible-results', action='store_true',
+                       help='Print per-report status and record counts as JSON')
+
+    try:
+        args = parser.parse_args()
+        inputs = dict(item.split('=', 1) for item in args.input)
+        configure(os.path.join(args.output_dir, TRACE_FILE_NAME))
+        renderer = ReportRenderer(args.output_dir, formats=args.formats or ['text'])
+
+        results = {}
+        client = None
+        try:
+            for name in args.reports:
+                if name in inputs:
+                    results[name] = renderer.render_file(name, inputs[name])
+                else:
+                    if client is None:
+                        client = VManageClient.from_env(timeout=args.timeout)
+                    results[name] = renderer.render_endpoint(client, name)
+
+                result = results[name]
+                if not args.ansible_results:
+                    color = Colors.GREEN if result['status'] == 200 else Colors.YELLOW
+                    print(f"{color}{name}: HTTP {result['status']}, {result['records']} records -> "
+                          f"{', '.join(result['files'])}{Colors.END}")
+        finally:
+            if client is not None:
+                client.close()
+
+        if args.ansible_results:
+            print(json.dumps(results))
+        sys.exit(0)
+
+    except KeyboardInterrupt:
+        print(f"\n{Colors.YELLOW}Rendering interrupted by user{Colors.END}", file=sys.stderr)
+        sys.exit(1)
+    except (ValueError, OSError) as e:
+        print(f"{Colors.RED}Error: {str(e)}{Colors.END}", file=sys.stderr)
+        sys.exit(2)
+
+if __name__ == "__main__":
+    main()
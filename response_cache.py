@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+SD-WAN vManage Response Cache
+=============================
+
+On-disk cache of GET responses shared by every VManageClient, whether it
+runs in pre_check, a collector script or the vmanage_api lookup plugin.
+It provides:
+- Keys built from host, user, endpoint and query parameters
+- Per-endpoint TTLs; endpoints without a TTL are never cached
+- Least-recently-used eviction once the cache exceeds its size limit
+- A bypass flag that skips reads but still refreshes the cache
+
+Author: SD-WAN Automation Team
+Version: 1.0
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'generated', '.api_cache')
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# Seconds a response stays fresh; only inventory-style endpoints are cached
+DEFAULT_TTLS = {
+    '/dataservice/system/device/controllers': 300,
+    '/dataservice/system/device/vedges': 300,
+    '/dataservice/device': 300,
+    '/dataservice/template/device': 120,
+    '/dataservice/template/feature': 120
+}
+
+def env_flag(name):
+    """Return True when an environment variable is set to a truthy value"""
+    return os.environ.get(name, '').strip().lower() in ('1', 'true', 'yes', 'on')
+
+def parse_ttls(value):
+    """Parse 'path=seconds,path=seconds' TTL overrides"""
+    ttls = {}
+    for item in filter(None, (part.strip() for part in value.split(','))):
+        path, _, seconds = item.partition('=')
+        ttls[path.strip()] = int(seconds)
+    return ttls
+
+class ResponseCache:
+    """File-per-entry response cache safe to share between processes"""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES,
+                 ttls=None, bypass=False):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.bypass = bypass
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls, **kwargs):
+        """Build a cache from the VMANAGE_CACHE_* environment variables"""
+        ttls = dict(DEFAULT_TTLS)
+        ttls.update(parse_ttls(os.environ.get('VMANAGE_CACHE_TTLS', '')))
+        kwargs.setdefault('cache_dir', os.environ.get('VMANAGE_CACHE_DIR', DEFAULT_CACHE_DIR))
+        kwargs.setdefault('max_bytes', int(os.environ.get('VMANAGE_CACHE_MAX_MB', '64')) * 1024 * 1024)
+        kwargs.setdefault('ttls', ttls)
+        kwargs.setdefault('bypass', env_flag('VMANAGE_CACHE_BYPASS'))
+        return cls(**kwargs)
+
+    def ttl_for(self, path):
+        """Return the TTL for an endpoint, or 0 if it must not be cached"""
+        return self.ttls.get(path.split('?', 1)[0].rstrip('/') or '/', 0)
+
+    def key(self, base_url, username, path, params=None):
+        """Build the cache key for one request"""
+        query = sorted((str(k), str(v)) for k, v in (params or {}).items())
+        raw = json.dumps([base_url, username, path, query])
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def entry_path(self, key):
+        """Return the file holding one cache entry"""
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key, ttl):
+        """Return a fresh cached result, or None on a miss, expiry or bypass"""
+        if self.bypass:
+            return None
+        path = self.entry_path(key)
+        try:
+            with open(path, 'r') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+
+        if time.time() - entry.get('stored', 0) > ttl:
+            self.misses += 1
+            return None
+        # Touch the entry so eviction drops the least recently used ones first
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return entry['result']
+
+    def put(self, key, path, result):
+        """Store a result atomically, then evict old entries if over the size limit"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        dest = self.entry_path(key)
+        tmp_path = f"{dest}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'path': path, 'stored': time.time(), 'result': result}, f)
+        os.replace(tmp_path, dest)
+        self.evict()
+
+    def entries(self):
+        """Return (mtime, size, path) for every cache entry"""
+        found = []
+        try:
+            with os.scandir(self.cache_dir) as it:
+                for entry in it:
+                    if entry.name.endswith('.json'):
+                        try:
+                            stat = entry.stat()
+                        except OSError:
+                            continue
+                        found.append((stat.st_mtime, stat.st_size, entry.path))
+        except OSError:
+            pass
+        return found
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits max_bytes"""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+            removed += 1
+        return removed
+
+    def clear(self):
+        """Remove every cache entry"""
+        entries = self.entries()
+        for _, _, path in entries:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        return len(entries)
+
+    def stats(self):
+        """Return entry count and total size"""
+        entries = self.entries()
+        return {
+            'cache_dir': self.cache_dir,
+            'entries': len(entries),
+            'bytes': sum(size for _, size, _ in entries),
+            'max_bytes': self.max_bytes
+        }
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='SD-WAN vManage Response Cache')
+    parser.add_argument('action', choices=['stats', 'clear'],
+                       help='Show cache statistics or remove every entry')
+    parser.add_argument('--cache-dir',
+                       help='Cache directory (default: VMANAGE_CACHE_DIR or generated/.api_cache)')
+
+    args = parser.parse_args()
+    cache = ResponseCache.from_env(**({'cache_dir': args.cache_dir} if args.cache_dir else {}))
+    if args.action == 'clear':
+        print(f"Removed {cache.clear()} entries from {cache.cache_dir}")
+    else:
+        print(json.dumps(cache.stats(), indent=2))
+    sys.exit(0)
+
+if __name__ == "__main__":
+    main()
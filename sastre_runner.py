@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+SD-WAN Parallel Sastre Runner
+=============================
+
+Runs one sastre list or backup invocation per configuration type in a
+bounded pool of sastre processes, so a run takes about as long as the
+slowest type instead of the sum of all of them. For every type it records:
+- Wall time, return code and output size
+- The number of items listed
+- The output file under <output-dir>/data
+
+The per-type results are written to reports/<operation>_summary_<ts>.json,
+the summary read by post_check. Backup runs can also be snapshotted into
+the deduplicated backup store (see backup_store.py).
+
+Author: SD-WAN Automation Team
+Version: 1.0
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from backup_store import BackupStore, store_for
+from tracing import TRACE_FILE_NAME, configure, get_tracer
+from catalog import open_catalog
+
+class Colors:
+    """Color codes for terminal output"""
+    GREEN = '\033[92m'
+    RED = '\033[91m'
+    YELLOW = '\033[93m'
+    BLUE = '\033[94m'
+    CYAN = '\033[96m'
+    WHITE = '\033[97m'
+    BOLD = '\033[1m'
+    END = '\033[0m'
+
+SUMMARY_SCHEMA = 'sdwan-operation-summary/1'
+OPERATIONS = ('list', 'backup')
+
+def count_table_rows(stdout):
+    """Count item rows in a sastre table (every row-drawn line except the header)"""
+    rows = sum(1 for line in stdout.splitlines() if line[:1] in ('|', '│'))
+    return max(rows - 1, 0)
+
+def format_delta(seconds):
+    """Format seconds like the Ansible command module's delta (H:MM:SS.ffffff)"""
+    minutes, secs = divmod(seconds, 60)
+    hours, minutes = divmod(int(minutes), 60)
+    return f"{hours}:{minutes:02d}:{secs:09.6f}"
+
+class SastreRunner:
+    def __init__(self, operation, output_dir, timestamp=None, workers=4, timeout=300,
+                 host=None, port=None, username=None, sastre='sastre'):
+        if operation not in OPERATIONS:
+            raise ValueError(f"Unknown operation '{operation}' (choose from {', '.join(OPERATIONS)})")
+        self.operation = operation
+        self.output_dir = output_dir
+        self.data_dir = os.path.join(output_dir, 'data')
+        self.reports_dir = os.path.join(output_dir, 'reports')
+        self.timestamp = timestamp or str(int(time.time()))
+        self.workers = workers
+        self.timeout = timeout
+        self.host = host or os.environ.get('VMANAGE_HOST')
+        self.port = port or os.environ.get('VMANAGE_PORT', '443')
+        self.username = username or os.environ.get('VMANAGE_USERNAME')
+        self.sastre = sastre
+
+    def command(self, config_type):
+        """Build the sastre command line for one configuration type"""
+        # The password stays in VMANAGE_PASSWORD, which sastre reads itself,
+        # so it never appears in the process list
+        command = [
+            self.sastre,
+            '--address', self.host,
+            '--port', str(self.port),
+            '--user', self.username,
+            '--verbose',
+            '--timeout', str(self.timeout),
+            self.operation
+        ]
+        if self.operation == 'backup':
+            command += ['--workdir', os.path.join(self.data_dir, f"{config_type}_backup_{self.timestamp}")]
+        return command + [config_type]
+
+    def output_file(self, config_type):
+        """Return the data file path for one configuration type"""
+        return os.path.join(self.data_dir, f"{config_type}_{self.operation}_{self.timestamp}.txt")
+
+    def write_output(self, result):
+        """Write the per-type report file in the playbook's layout"""
+        status = 'SUCCESS' if result['rc'] == 0 else 'FAILED'
+        body = f"CONFIGURATION ITEMS:\n{result['stdout']}" if result['rc'] == 0 else f"ERROR OUTPUT:\n{result['stderr']}"
+        with get_tracer().span('write', 'data') as span, open(self.output_file(result['item']), 'w') as f:
+            f.write(f"Configuration Type: {result['item']}\n"
+                    f"{'=' * 50}\n"
+                    f"Command: sastre {self.operation} {result['item']}\n"
+                    f"Execution Time: {result['delta']}\n"
+                    f"Return Code: {result['rc']}\n\n"
+                    f"STATUS: {status}\n\n"
+                    f"{body}\n\n"
+                    f"{'=' * 50}\n")
+            span['bytes'] = f.tell()
+
+    def run_type(self, config_type):
+        """Run sastre for one configuration type and time it"""
+        start = time.monotonic()
+        started = time.time()
+        try:
+            completed = subprocess.run(
+                self.command(config_type), capture_output=True, text=True,
+                timeout=self.timeout + 60,
+                env=dict(os.environ, PYTHONHTTPSVERIFY='0', REQUESTS_CA_BUNDLE='')
+            )
+            rc, stdout, stderr = completed.returncode, completed.stdout, completed.stderr
+        except subprocess.TimeoutExpired:
+            rc, stdout, stderr = -1, '', f"sastre did not finish within {self.timeout + 60}s"
+        except OSError as e:
+            rc, stdout, stderr = -1, '', f"Cannot run {self.sastre}: {str(e)}"
+        elapsed = time.monotonic() - start
+        get_tracer().record('sastre', f"{self.operation} {config_type}", started, elapsed,
+                            nbytes=len(stdout.encode()), status=rc)
+
+        result = {
+            'item': config_type,
+            'rc': rc,
+            'stdout': stdout.rstrip('\n'),
+            'stderr': stderr.rstrip('\n'),
+            'delta': format_delta(elapsed),
+            'duration_seconds': round(elapsed, 3)
+        }
+        self.write_output(result)
+        return result
+
+    def summary_entry(self, result):
+        """Summarise one type's result for the JSON summary"""
+        return {
+            'rc': result['rc'],
+            'count': count_table_rows(result['stdout']) if result['rc'] == 0 else 0,
+            'duration_seconds': result['duration_seconds'],
+            'output_bytes': len(result['stdout'].encode()),
+            'errors': 0 if result['rc'] == 0 else 1,
+            'file': os.path.relpath(self.output_file(result['item']), self.output_dir)
+        }
+
+    def run(self, config_types, on_result=None):
+        """Run every configuration type with at most `workers` sastre processes at once"""
+        if not all([self.host, self.username, os.environ.get('VMANAGE_PASSWORD')]):
+            raise ValueError("VMANAGE_HOST, VMANAGE_USERNAME and VMANAGE_PASSWORD must be set")
+        os.makedirs(self.data_dir, exist_ok=True)
+        os.makedirs(self.reports_dir, exist_ok=True)
+
+        results = {}
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = [executor.submit(self.run_type, t) for t in config_types]
+            for future in as_completed(futures):
+                result = future.result()
+                results[result['item']] = result
+                if on_result:
+                    on_result(result)
+        wall_seconds = time.monotonic() - start
+
+        # Keep the requested order so reports read the same as a serial run
+        ordered = [results[t] for t in config_types]
+        entries = {r['item']: self.summary_entry(r) for r in ordered}
+        summary = {
+            'schema': SUMMARY_SCHEMA,
+            'operation': self.operation,
+            'timestamp': datetime.now().isoformat(),
+            'vmanage_host': self.host,
+            'config_types': entries,
+            'totals': {
+                'types': len(entries),
+                'succeeded': sum(1 for e in entries.values() if e['rc'] == 0),
+                'failed': sum(1 for e in entries.values() if e['rc'] != 0),
+                'items': sum(e['count'] for e in entries.values()),
+                'errors': sum(e['errors'] for e in entries.values()),
+                'duration_seconds': round(sum(e['duration_seconds'] for e in entries.values()), 3),
+                'wall_seconds': round(wall_seconds, 3),
+                'workers': self.workers
+            }
+        }
+        path = os.path.join(self.reports_dir, f"{self.operation}_summary_{self.timestamp}.json")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(summary, f, indent=2)
+        os.replace(tmp_path, path)
+        return summary, ordered
+
+def print_result(result):
+    """Print one per-type result line"""
+    if result['rc'] == 0:
+        print(f"{Colors.GREEN}✓{Colors.END} {result['item']} ({result['duration_seconds']}s, "
+              f"{count_table_rows(result['stdout'])} items)", file=sys.stderr)
+    else:
+        print(f"{Colors.RED}✗{Colors.END} {result['item']}: rc={result['rc']} ({result['duration_seconds']}s)",
+              file=sys.stderr)
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='SD-WAN Parallel Sastre Runner')
+    parser.add_argument('operation', choices=OPERATIONS,
+                       help='Sastre operation to run per configuration type')
+    parser.add_argument('config_types', nargs='+',
+                       help='Configuration types, e.g. device_template feature_template')
+    parser.add_argument('--output-dir', '-d', required=True,
+                       help='Dated list/backup directory holding data/ and reports/')
+    parser.add_argument('--timestamp',
+                       help='Timestamp used in file names (default: current epoch)')
+    parser.add_argument('--workers', '-w', type=int, default=4,
+                       help='Maximum concurrent sastre processes (default: 4)')
+    parser.add_argument('--timeout', '-t', type=int, default=300,
+                       help='sastre --timeout value in seconds (default: 300)')
+    parser.add_argument('--sastre', default='sastre',
+                       help='sastre executable (default: sastre)')
+    parser.add_argument('--snapshot', action='store_true',
+                       help='After a backup, store the run in the deduplicated object store and hard-link it')
+    parser.add_argument('--ansible-results', action='store_true',
+                       help='Print per-type results as JSON shaped like a registered command loop')
+
+    try:
+        args = parser.parse_args()
+        configure(os.path.join(args.output_dir, TRACE_FILE_NAME))
+        runner = SastreRunner(args.operation, args.output_dir, timestamp=args.timestamp,
+                              workers=args.workers, timeout=args.timeout, sastre=args.sastre)
+        summary, results = runner.run(args.config_types, on_result=print_result)
+
+        totals = summary['totals']
+        if args.snapshot and args.operation == 'backup':
+            run = BackupStore(store_for(args.output_dir)).snapshot(args.output_dir, link=True)
+            print(f"Stored {run['stats']['files']} files, {run['stats']['new_objects']} new objects",
+                  file=sys.stderr)
+
+        catalog = open_catalog()
+        if catalog:
+            # Backups hold configuration items rather than device data, so files are listed without parsing
+            with catalog:
+                catalog.index_directory(args.output_dir, args.operation, parse=False)
+
+        if args.ansible_results:
+            print(json.dumps(results))
+        else:
+            color = Colors.GREEN if totals['failed'] == 0 else Colors.YELLOW
+            print(f"\n{color}{totals['succeeded']}/{totals['types']} types, {totals['items']} items "
+                  f"in {totals['wall_seconds']}s wall ({totals['duration_seconds']}s serial){Colors.END}")
+        sys.exit(0 if totals['failed'] == 0 else 1)
+
+    except KeyboardInterrupt:
+        print(f"\n{Colors.YELLOW}Run interrupted by user{Colors.END}", file=sys.stderr)
+        sys.exit(1)
+    except ValueError as e:
+        print(f"\n{Colors.RED}Error: {str(e)}{Colors.END}", file=sys.stderr)
+        sys.exit(2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,556 @@
+#!/usr/bin/env python3
+"""
+SD-WAN Sharded Collector
+========================
+
+Spreads the per-device queries of device_collector.py over several worker
+processes or hosts, so one controller no longer caps collection
+throughput. It:
+- Splits the /dataservice/device inventory into shards by site-id,
+  region or a stable hash of system-ip
+- Hands the shards out through a file queue (pending/ -> claimed/ ->
+  done/) that workers claim with an atomic rename; a directory on a
+  shared mount lets workers on other hosts take part
+- Returns shards whose worker stopped renewing its lease to the queue
+- Has each worker write a partial result per shard, in a directory of
+  its own per claim so a requeued shard never shares files
+- Splits the VMANAGE_RATE request budget evenly across local workers;
+  the limiter is per process, so remote workers should be given their
+  share in VMANAGE_RATE as well
+- Merges the partial results into the usual generated/<use case>/ files,
+  results NDJSON and collection summary that post_check validates
+
+Author: SD-WAN Automation Team
+Version: 1.0
+"""
+
+import os
+import sys
+import json
+import time
+import zlib
+import heapq
+import shutil
+import socket
+import argparse
+import subprocess
+from datetime import datetime
+from vmanage_client import VManageClient, VManageError
+from tracing import TRACE_FILE_NAME, configure
+from response_cache import ResponseCache
+from compressed_io import available_codecs, resolve_codec, open_input
+from rate_limiter import DEFAULT_BURST, DEFAULT_RATE
+from device_collector import DeviceCollector
+from device_queries import DEVICE_QUERIES, device_id_of
+from catalog import open_catalog
+
+class Colors:
+    """Color codes for terminal output"""
+    GREEN = '\033[92m'
+    RED = '\033[91m'
+    YELLOW = '\033[93m'
+    BLUE = '\033[94m'
+    CYAN = '\033[96m'
+    WHITE = '\033[97m'
+    BOLD = '\033[1m'
+    END = '\033[0m'
+
+INVENTORY_PATH = '/dataservice/device'
+QUEUE_STATES = ('pending', 'claimed', 'done', 'failed')
+PLAN_FILE = 'shard_plan.json'
+MERGE_SUMMARY_FILE = 'shard_merge_summary.json'
+RESULT_FILE = 'shard_result.json'
+
+# Inventory fields a shard key is read from; devices without a region are grouped by site
+SHARD_KEYS = {
+    'site': ('site-id', 'siteId'),
+    'region': ('region-id', 'regionId', 'region', 'site-id', 'siteId')
+}
+# Inventory fields carried in a shard; the per-device queries need nothing else
+SHARD_FIELDS = ('deviceId', 'system-ip', 'host-name', 'hostname', 'device-type',
+                'site-id', 'region-id', 'regionId', 'region')
+
+def write_json(path, data):
+    """Write JSON atomically so workers never read a partial file"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+def read_json(path):
+    """Read a JSON file"""
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def shard_key(device, by):
+    """Return the site or region a device is grouped by"""
+    for field in SHARD_KEYS[by]:
+        if device.get(field) not in (None, ''):
+            return str(device[field])
+    return ''
+
+def split_inventory(devices, shards, by='site'):
+    """Split devices into at most `shards` groups, never splitting a site or region"""
+    devices = [{k: d[k] for k in SHARD_FIELDS if k in d} for d in devices if device_id_of(d)]
+    if by == 'hash':
+        # crc32 rather than hash(): the assignment must not change between runs or hosts
+        buckets = [[] for _ in range(shards)]
+        for device in devices:
+            buckets[zlib.crc32(str(device_id_of(device)).encode()) % shards].append(device)
+        return [{'keys': [], 'devices': bucket} for bucket in buckets if bucket]
+
+    groups = {}
+    for device in devices:
+        groups.setdefault(shard_key(device, by), []).append(device)
+    # Largest group first onto the emptiest shard keeps shard sizes close together
+    heap = [(0, n) for n in range(min(shards, len(groups)))]
+    assigned = [{'keys': [], 'devices': []} for _ in heap]
+    for key, members in sorted(groups.items(), key=lambda item: (-len(item[1]), item[0])):
+        size, n = heapq.heappop(heap)
+        assigned[n]['keys'].append(key)
+        assigned[n]['devices'].extend(members)
+        heapq.heappush(heap, (size + len(members), n))
+    return assigned
+
+class ShardQueue:
+    """File queue of shard tasks; a rename moves a task between states atomically"""
+
+    def __init__(self, queue_dir, lease=600):
+        self.queue_dir = queue_dir
+        self.lease = lease
+
+    def state_dir(self, state):
+        return os.path.join(self.queue_dir, state)
+
+    def task_path(self, state, name):
+        return os.path.join(self.state_dir(state), name)
+
+    def parts_dir(self, shard, attempt=None):
+        """Return a shard's parts directory, or the one of a single claim of it"""
+        path = os.path.join(self.queue_dir, 'parts', f"shard-{shard:03d}")
+        return path if attempt is None else os.path.join(path, f"attempt-{attempt}")
+
+    def tasks(self, state):
+        """Return the task file names in one state"""
+        try:
+            return sorted(n for n in os.listdir(self.state_dir(state)) if n.endswith('.json'))
+        except FileNotFoundError:
+            return []
+
+    def counts(self):
+        return {state: len(self.tasks(state)) for state in QUEUE_STATES}
+
+    def reset(self, force=False):
+        """Empty the queue before a new plan, refusing while shards are outstanding"""
+        outstanding = len(self.tasks('pending')) + len(self.tasks('claimed'))
+        if outstanding and not force:
+            raise ValueError(f"{outstanding} shards of the previous plan are not finished "
+                             f"(merge them or use --force)")
+        for name in QUEUE_STATES + ('parts',):
+            shutil.rmtree(os.path.join(self.queue_dir, name), ignore_errors=True)
+        for state in QUEUE_STATES:
+            os.makedirs(self.state_dir(state), exist_ok=True)
+
+    def put(self, task):
+        write_json(self.task_path('pending', f"shard-{task['shard']:03d}.json"), task)
+
+    def claim(self, worker):
+        """Take the next pending task, or None when the queue is empty"""
+        for name in self.tasks('pending'):
+            claimed = self.task_path('claimed', name)
+            try:
+                os.rename(self.task_path('pending', name), claimed)
+            except FileNotFoundError:
+                continue  # another worker won the race
+            # A rename keeps the planning time as mtime; restart the lease before anything else
+            os.utime(claimed)
+            task = read_json(claimed)
+            task['attempts'] = task.get('attempts', 0) + 1
+            task['worker'] = worker
+            task['claimed'] = datetime.now().isoformat()
+            write_json(claimed, task)
+            return task
+        return None
+
+    def renew(self, task):
+        """Extend the lease on a claimed task"""
+        try:
+            os.utime(self.task_path('claimed', f"shard-{task['shard']:03d}.json"))
+        except FileNotFoundError:
+            pass
+
+    def finish(self, task, state, **detail):
+        """Move a claimed task to done or failed; False if the lease was lost to another worker"""
+        name = f"shard-{task['shard']:03d}.json"
+        path = self.task_path('claimed', name)
+        try:
+            current = read_json(path)
+        except (FileNotFoundError, ValueError):
+            return False
+        if (current.get('worker'), current.get('attempts')) != (task['worker'], task['attempts']):
+            return False
+        task.update(detail, finished=datetime.now().isoformat())
+        write_json(path, task)
+        os.replace(path, self.task_path(state, name))
+        return True
+
+    def reclaim(self, max_attempts=3):
+        """Requeue claimed tasks whose lease expired; returns their shard files"""
+        requeued = []
+        for name in self.tasks('claimed'):
+            path = self.task_path('claimed', name)
+            try:
+                if time.time() - os.path.getmtime(path) < self.lease:
+                    continue
+                task = read_json(path)
+            except (FileNotFoundError, ValueError):
+                continue
+            state = 'pending' if task.get('attempts', 0) < max_attempts else 'failed'
+            if state == 'failed':
+                task['error'] = f"Lease expired after {task.get('attempts', 0)} attempts"
+                write_json(path, task)
+            try:
+                os.rename(path, self.task_path(state, name))
+            except FileNotFoundError:
+                continue
+            requeued.append(name)
+        return requeued
+
+class ShardWorker:
+    def __init__(self, client, queue, worker_id=None, max_in_flight=20, request_timeout=60,
+                 device_timeout=180, retries=3, codec=None, max_attempts=3):
+        self.client = client
+        self.queue = queue
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.max_in_flight = max_in_flight
+        self.request_timeout = request_timeout
+        self.device_timeout = device_timeout
+        self.retries = retries
+        self.codec = codec
+        self.max_attempts = max_attempts
+
+    def collect_shard(self, task):
+        """Run every planned query for the shard's devices into its parts directory"""
+        # A worker whose lease expired may still be writing into the previous attempt's directory
+        parts_dir = self.queue.parts_dir(task['shard'], task['attempts'])
+        renewed = [time.monotonic()]
+
+        def heartbeat(record):
+            # Renew at a tenth of the lease so a slow device never loses the shard
+            if time.monotonic() - renewed[0] > self.queue.lease / 10:
+                self.queue.renew(task)
+                renewed[0] = time.monotonic()
+
+        start = time.monotonic()
+        summaries = {}
+        for query in task['queries']:
+            collector = DeviceCollector(self.client, query,
+                                        os.path.join(parts_dir, DEVICE_QUERIES[query]['output_dir']),
+                                        max_in_flight=self.max_in_flight,
+                                        request_timeout=self.request_timeout,
+                                        device_timeout=self.device_timeout,
+                                        retries=self.retries, codec=self.codec)
+            summaries[query] = collector.run(devices=task['devices'], on_result=heartbeat)
+
+        result = {
+            'shard': task['shard'],
+            'worker': self.worker_id,
+            'attempt': task['attempts'],
+            'devices': len(task['devices']),
+            'queries': summaries,
+            'wall_seconds': round(time.monotonic() - start, 3)
+        }
+        write_json(os.path.join(parts_dir, RESULT_FILE), result)
+        return result
+
+    def run(self, on_shard=None):
+        """Claim and collect shards until the queue is empty"""
+        processed = []
+        while True:
+            self.queue.reclaim(self.max_attempts)
+            task = self.queue.claim(self.worker_id)
+            if task is None:
+                return processed
+            try:
+                result = self.collect_shard(task)
+            except (VManageError, OSError) as e:
+                self.queue.finish(task, 'failed', error=str(e))
+                result = {'shard': task['shard'], 'devices': len(task['devices']), 'error': str(e)}
+            else:
+                failed = sum(s['failed'] for s in result['queries'].values())
+                if not self.queue.finish(task, 'done', failed_devices=failed, wall_seconds=result['wall_seconds']):
+                    result['error'] = 'Lease expired; the shard was requeued for another worker'
+            processed.append(result)
+            if on_shard:
+                on_shard(result)
+
+def plan_shards(client, queue, queries, shards, by='site', force=False):
+    """Fetch the inventory once and queue one task per shard"""
+    if shards < 1:
+        raise ValueError("--shards must be at least 1")
+    inventory = client.get_json(INVENTORY_PATH).get('data', [])
+    groups = split_inventory(inventory, shards, by)
+    queue.reset(force=force)
+    for n, group in enumerate(groups):
+        queue.put({'shard': n, 'queries': queries, 'keys': group['keys'],
+                   'devices': group['devices'], 'attempts': 0})
+    plan = {
+        'timestamp': datetime.now().isoformat(),
+        'queries': queries,
+        'shard_by': by,
+        'devices': sum(len(g['devices']) for g in groups),
+        'shards': [{'shard': n, 'devices': len(g['devices']), 'keys': len(g['keys'])}
+                   for n, g in enumerate(groups)]
+    }
+    write_json(os.path.join(queue.queue_dir, PLAN_FILE), plan)
+    return plan
+
+def failed_shards(queue):
+    """Summarize the failed tasks without their device lists"""
+    failed = []
+    for name in queue.tasks('failed'):
+        task = read_json(queue.task_path('failed', name))
+        failed.append({k: task.get(k) for k in ('shard', 'worker', 'attempts', 'error')})
+    return failed
+
+def merge_shards(queue, generated_dir='generated', partial=False, catalog_run=None):
+    """Move each shard's per-device files into generated/ and build the combined results"""
+    plan = read_json(os.path.join(queue.queue_dir, PLAN_FILE))
+    counts = queue.counts()
+    if (counts['pending'] or counts['claimed']) and not partial:
+        raise ValueError(f"{counts['pending']} pending and {counts['claimed']} claimed shards "
+                         f"are not finished (use --partial to merge what is done)")
+
+    results = []
+    for name in queue.tasks('done'):
+        task = read_json(queue.task_path('done', name))
+        result_path = os.path.join(queue.parts_dir(task['shard'], task['attempts']), RESULT_FILE)
+        if os.path.exists(result_path):
+            results.append(read_json(result_path))
+
+    start = time.monotonic()
+    summaries = {}
+    for query in plan['queries']:
+        spec = DEVICE_QUERIES[query]
+        output_dir = os.path.join(generated_dir, spec['output_dir'])
+        os.makedirs(output_dir, exist_ok=True)
+        records = []
+        for result in results:
+            part_dir = os.path.join(queue.parts_dir(result['shard'], result['attempt']), spec['output_dir'])
+            part_results = os.path.join(part_dir, f"{query}_collection_results.ndjson")
+            if not os.path.exists(part_results):
+                continue
+            with open(part_results, 'r') as f:
+                for line in f:
+                    record = json.loads(line)
+                    if record.get('file'):
+                        dest = os.path.join(output_dir, os.path.basename(record['file']))
+                        os.replace(os.path.join(part_dir, os.path.basename(record['file'])), dest)
+                        record['file'] = dest
+                        if catalog_run:
+                            with open_input(dest) as written:
+                                data = json.load(written)
+                            catalog_run.add(dest, data=data, device=str(record['device_id']),
+                                            hostname=record['hostname'])
+                    record['shard'] = result['shard']
+                    records.append(record)
+
+        results_path = os.path.join(output_dir, f"{query}_collection_results.ndjson")
+        with open(f"{results_path}.tmp", 'w') as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+        os.replace(f"{results_path}.tmp", results_path)
+
+        shard_summaries = [r['queries'][query] for r in results if query in r['queries']]
+        summaries[query] = {
+            'query': query,
+            'path': spec['path'],
+            'timestamp': datetime.now().isoformat(),
+            'devices': plan['devices'],
+            'succeeded': sum(1 for r in records if r['status'] == 200),
+            'failed': plan['devices'] - sum(1 for r in records if r['status'] == 200),
+            'retried': sum(1 for r in records if r['attempts'] > 1),
+            'shard_by': plan['shard_by'],
+            'shards': len(plan['shards']),
+            'shards_merged': len(shard_summaries),
+            'max_in_flight': max((s['max_in_flight'] for s in shard_summaries), default=0),
+            'wall_seconds': max((s['wall_seconds'] for s in shard_summaries), default=0),
+            'results_file': results_path
+        }
+        write_json(os.path.join(output_dir, f"{query}_collection_summary.json"), summaries[query])
+
+    for result in results:
+        shutil.rmtree(queue.parts_dir(result['shard']), ignore_errors=True)
+
+    summary = {
+        'timestamp': datetime.now().isoformat(),
+        'generated_dir': generated_dir,
+        'shards': len(plan['shards']),
+        'merged': len(results),
+        'failed_shards': failed_shards(queue),
+        'workers': sorted({r['worker'] for r in results}),
+        'queries': summaries,
+        'merge_seconds': round(time.monotonic() - start, 3)
+    }
+    write_json(os.path.join(queue.queue_dir, MERGE_SUMMARY_FILE), summary)
+    return summary
+
+def print_shard(result):
+    """Print one finished shard"""
+    if result.get('error'):
+        print(f"{Colors.RED}✗{Colors.END} shard {result['shard']}: {result['error']}")
+        return
+    failed = sum(s['failed'] for s in result['queries'].values())
+    color = Colors.GREEN if not failed else Colors.YELLOW
+    print(f"{color}✓{Colors.END} shard {result['shard']}: {result['devices']} devices "
+          f"in {result['wall_seconds']}s{f' ({failed} failed)' if failed else ''} [{result['worker']}]")
+
+def print_merge(summary):
+    """Print the merged totals and return the exit status"""
+    for failed in summary['failed_shards']:
+        print(f"{Colors.RED}  ✗ shard {failed['shard']}: {failed.get('error', 'failed')}{Colors.END}")
+    ok = not summary['failed_shards'] and summary['merged'] == summary['shards']
+    for query, s in summary['queries'].items():
+        ok = ok and s['failed'] == 0
+        color = Colors.GREEN if s['failed'] == 0 else Colors.YELLOW
+        print(f"{color}{s['succeeded']}/{s['devices']} devices collected for {query} "
+              f"in {s['wall_seconds']}s across {s['shards_merged']}/{s['shards']} shards "
+              f"by {s['shard_by']} ({s['retried']} retried){Colors.END}")
+    return 0 if ok else 1
+
+def worker_args(args):
+    """Command-line options passed on to locally started workers"""
+    options = ['--max-in-flight', str(args.max_in_flight), '--timeout', str(args.timeout),
+               '--device-timeout', str(args.device_timeout), '--retries', str(args.retries),
+               '--lease', str(args.lease), '--max-attempts', str(args.max_attempts)]
+    if args.compress:
+        options += ['--compress', args.compress]
+    return options
+
+def worker_env(workers):
+    """Environment for locally started workers, each limited to its share of the request rate"""
+    # Every worker process has its own token bucket; without a split, N workers send N times the rate
+    rate = float(os.environ.get('VMANAGE_RATE', DEFAULT_RATE))
+    burst = int(os.environ.get('VMANAGE_BURST', DEFAULT_BURST))
+    return dict(os.environ, VMANAGE_RATE=str(rate / workers), VMANAGE_BURST=str(max(burst // workers, 1)))
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='SD-WAN Sharded Collector')
+    parser.add_argument('--queue-dir', '-Q', default=os.path.join('generated', 'shards'),
+                       help='Shard queue directory; use a shared mount for remote workers (default: generated/shards)')
+    parser.add_argument('--generated-dir', '-d', default='generated',
+                       help='Output root the merge writes to (default: generated)')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    def add_plan_options(sub):
+        sub.add_argument('query', nargs='+', choices=sorted(DEVICE_QUERIES),
+                         help='Per-device queries to run for every shard')
+        sub.add_argument('--shards', '-s', type=int, default=8,
+                         help='Number of shards (default: 8)')
+        sub.add_argument('--shard-by', choices=['site', 'region', 'hash'], default='site',
+                         help='Group devices by site-id, region or a hash of system-ip (default: site)')
+        sub.add_argument('--force', action='store_true',
+                         help='Discard an unfinished previous plan')
+
+    def add_worker_options(sub):
+        sub.add_argument('--max-in-flight', '-n', type=int, default=20,
+                         help='Concurrent device requests per worker (default: 20)')
+        sub.add_argument('--timeout', '-t', type=int, default=60,
+                         help='Per-request timeout in seconds (default: 60)')
+        sub.add_argument('--device-timeout', type=int, default=180,
+                         help='Total time budget per device including retries (default: 180)')
+        sub.add_argument('--retries', '-r', type=int, default=3,
+                         help='Retries for throttled or failed requests (default: 3)')
+        sub.add_argument('--lease', type=int, default=600,
+                         help='Seconds without progress before a claimed shard is requeued (default: 600)')
+        sub.add_argument('--max-attempts', type=int, default=3,
+                         help='Claims per shard before it is marked failed (default: 3)')
+        sub.add_argument('--compress', choices=available_codecs() + ['off'],
+                         help='Write per-device files as framed .gz/.zst (default: $SDWAN_COMPRESS or off)')
+
+    plan_parser = subparsers.add_parser('plan', help='Fetch the inventory and queue the shards')
+    add_plan_options(plan_parser)
+
+    worker_parser = subparsers.add_parser('worker', help='Collect queued shards until the queue is empty')
+    add_worker_options(worker_parser)
+    worker_parser.add_argument('--worker-id', help='Name recorded with each shard (default: <host>-<pid>)')
+
+    merge_parser = subparsers.add_parser('merge', help='Build the per-use-case output from the shard results')
+    merge_parser.add_argument('--partial', action='store_true',
+                              help='Merge the finished shards even if others are outstanding')
+
+    run_parser = subparsers.add_parser('run', help='Plan, start local workers and merge in one step')
+    add_plan_options(run_parser)
+    add_worker_options(run_parser)
+    run_parser.add_argument('--workers', '-w', type=int, default=4,
+                            help='Local worker processes, splitting VMANAGE_RATE between them (default: 4)')
+    run_parser.add_argument('--quiet', '-q', action='store_true',
+                            help='Do not print a line per shard')
+
+    try:
+        args = parser.parse_args()
+        queue = ShardQueue(args.queue_dir, lease=getattr(args, 'lease', 600))
+
+        if args.command in ('plan', 'run'):
+            # Shards must cover the current inventory, not a cached copy
+            with VManageClient.from_env(timeout=getattr(args, 'timeout', 60),
+                                        cache=ResponseCache.from_env(bypass=True)) as client:
+                plan = plan_shards(client, queue, args.query, args.shards, by=args.shard_by, force=args.force)
+            sizes = [s['devices'] for s in plan['shards']]
+            print(f"{Colors.CYAN}{plan['devices']} devices in {len(sizes)} shards by {plan['shard_by']} "
+                  f"({min(sizes, default=0)}-{max(sizes, default=0)} devices each){Colors.END}")
+            if args.command == 'plan':
+                sys.exit(0)
+
+        if args.command == 'worker':
+            configure(os.path.join(args.queue_dir, TRACE_FILE_NAME))
+            with VManageClient.from_env(timeout=args.timeout, pool_size=args.max_in_flight) as client:
+                worker = ShardWorker(client, queue, worker_id=args.worker_id,
+                                     max_in_flight=args.max_in_flight,
+                                     request_timeout=args.timeout,
+                                     device_timeout=args.device_timeout,
+                                     retries=args.retries,
+                                     codec=resolve_codec(args.compress),
+                                     max_attempts=args.max_attempts)
+                processed = worker.run(on_shard=print_shard)
+            print(f"{Colors.CYAN}Worker {worker.worker_id} collected {len(processed)} shards{Colors.END}")
+            sys.exit(0 if not any(r.get('error') for r in processed) else 1)
+
+        if args.command == 'run':
+            # Local workers inherit the trace file and run id, so their spans form one run
+            configure(os.path.join(args.queue_dir, TRACE_FILE_NAME))
+            start = time.monotonic()
+            command = [sys.executable, os.path.abspath(__file__), '--queue-dir', args.queue_dir, 'worker']
+            count = min(args.workers, queue.counts()['pending'])
+            env = worker_env(count) if count else None
+            workers = [subprocess.Popen(command + worker_args(args) + ['--worker-id', f"local-{n}"],
+                                        stdout=subprocess.DEVNULL if args.quiet else None, env=env)
+                       for n in range(count)]
+            for process in workers:
+                process.wait()
+            print(f"{Colors.CYAN}{len(workers)} workers finished in {time.monotonic() - start:.2f}s{Colors.END}")
+
+        catalog = open_catalog()
+        catalog_run = catalog.begin_run(f"shards_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
+                                        'collect', args.generated_dir) if catalog else None
+        summary = merge_shards(queue, args.generated_dir, partial=getattr(args, 'partial', False),
+                               catalog_run=catalog_run)
+        status = print_merge(summary)
+        if catalog:
+            with catalog:
+                catalog.finish_run(catalog_run, status='ok' if status == 0 else 'partial')
+        sys.exit(status)
+
+    except KeyboardInterrupt:
+        print(f"\n{Colors.YELLOW}Interrupted by user{Colors.END}")
+        sys.exit(1)
+    except VManageError as e:
+        print(f"\n{Colors.RED}vManage error: {str(e)}{Colors.END}")
+        sys.exit(1)
+    except (ValueError, FileNotFoundError) as e:
+        print(f"{Colors.RED}Error: {str(e)}{Colors.END}", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
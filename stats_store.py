@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+"""
+SD-WAN Statistics Time-Series Store
+===================================
+
+Appends every statistics collection (use cases 33-36 and collect_all) to
+an indexed SQLite store, so history can be queried without re-parsing
+the JSON snapshots. It provides:
+- One numeric sample row per device, entity (interface, tunnel, peer) and metric
+- Indexes by day and by device, plus retention pruning by day
+- Idempotent ingest: an unchanged snapshot file is never loaded twice, and
+  an endpoint saved under several file names (fabric-wide copies, _all
+  variants and per-device files) is one dataset whose samples are kept once
+- Queries such as "cpu of device X over 30 days" or "top 20 interfaces by errors"
+
+Author: SD-WAN Automation Team
+Version: 1.0
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import sqlite3
+import argparse
+from datetime import datetime, timezone, timedelta
+from stream_writer import JSONRecordStream, StreamParseError, iter_file_chunks
+from compressed_io import plain_name, open_input
+from device_queries import DEVICE_QUERIES
+
+class Colors:
+    """Color codes for terminal output"""
+    GREEN = '\033[92m'
+    RED = '\033[91m'
+    YELLOW = '\033[93m'
+    BLUE = '\033[94m'
+    CYAN = '\033[96m'
+    WHITE = '\033[97m'
+    BOLD = '\033[1m'
+    END = '\033[0m'
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'generated', 'stats_store.sqlite')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY,
+    dataset TEXT NOT NULL,
+    source TEXT NOT NULL,
+    source_mtime_ns INTEGER NOT NULL,
+    collected_ms INTEGER NOT NULL,
+    records INTEGER NOT NULL,
+    samples INTEGER NOT NULL,
+    UNIQUE (source, source_mtime_ns)
+);
+CREATE TABLE IF NOT EXISTS samples (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots(id),
+    day TEXT NOT NULL,
+    device TEXT NOT NULL,
+    hostname TEXT,
+    dataset TEXT NOT NULL,
+    entity TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    ts_ms INTEGER NOT NULL,
+    value REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_samples_device ON samples (device, metric, ts_ms);
+CREATE INDEX IF NOT EXISTS idx_samples_hostname ON samples (hostname, metric, ts_ms);
+CREATE INDEX IF NOT EXISTS idx_samples_day ON samples (day, dataset, metric);
+CREATE INDEX IF NOT EXISTS idx_samples_metric ON samples (dataset, metric, ts_ms);
+"""
+
+# One sample per dataset, device, entity, metric and time, whichever file it came from
+SAMPLE_KEY = 'dataset, device, entity, metric, ts_ms'
+UNIQUE_SAMPLE_INDEX = f"CREATE UNIQUE INDEX IF NOT EXISTS idx_samples_key ON samples ({SAMPLE_KEY})"
+
+DEVICE_FIELDS = ('vdevice-name', 'system-ip', 'deviceId', 'vmanage-system-ip')
+HOSTNAME_FIELDS = ('vdevice-host-name', 'host-name', 'hostname')
+ENTITY_FIELDS = ('ifname', 'interface-name', 'tunnel-name', 'peer', 'peer-system-ip')
+TIME_FIELDS = ('lastupdated', 'statcycletime', 'entry_time')
+
+# Numeric-looking fields that are identifiers or times rather than measurements
+NON_METRIC_FIELDS = set(DEVICE_FIELDS + TIME_FIELDS) | {'site-id', 'vdevice-dataKey', 'system-ip', 'uuid'}
+NUMBER_RE = re.compile(r'^-?\d+(\.\d+)?$')
+
+# Files under generated/ that are bookkeeping rather than statistics
+SKIPPED_SUFFIXES = ('.meta.json', '.manifest.json', '_collection_summary.json',
+                    'collect_all_summary.json', 'events_harvest_summary.json', 'events_cursor.json',
+                    'trace.ndjson', 'monitor_state.json', 'monitor_summary.json', 'state_changes.ndjson')
+
+# Inventory copies the playbooks save next to their statistics
+INVENTORY_FILES = ('device_list.json', 'devices_list.json')
+
+# Datasets that are another file name for the same endpoint, folded onto one dataset
+DATASET_ALIASES = {
+    'interface_statistics_all': 'interface_statistics',
+    'interface_stats': 'interface_statistics',
+    'tunnel_statistics_all': 'tunnel_statistics',
+    'tunnel_stats': 'tunnel_statistics',
+    'device_bfd_sessions': 'bfd_sessions',
+    'device_omp_peers': 'omp_peers',
+    'device_control_connections': 'control_connections'
+}
+
+def dataset_for(path):
+    """Name the dataset after the file, folding per-device files onto their query prefix"""
+    stem = os.path.basename(path).split('.', 1)[0]
+    for spec in DEVICE_QUERIES.values():
+        if stem.startswith(spec['prefix'] + '_'):
+            return spec['prefix']
+    return stem
+
+def numeric(value):
+    """Return a float for numbers and numeric strings, otherwise None"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str) and NUMBER_RE.match(value):
+        return float(value)
+    return None
+
+def entity_of(record):
+    """Name the interface, tunnel or peer a record describes"""
+    for field in ENTITY_FIELDS:
+        if record.get(field) not in (None, ''):
+            return str(record[field])
+    if record.get('source-ip') and record.get('dest-ip'):
+        return f"{record['source-ip']}->{record['dest-ip']}"
+    return ''
+
+def iter_records(path):
+    """Yield the data[] records of a .json or .ndjson snapshot, compressed or not"""
+    if plain_name(path).endswith('.ndjson'):
+        with open_input(path, 'r') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        return
+    yield from JSONRecordStream(iter_file_chunks(path))
+
+class StatsStore:
+    def __init__(self, db_path=DEFAULT_DB_PATH):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA foreign_keys=ON')
+        self.conn.executescript(SCHEMA)
+        self.add_unique_index()
+
+    def add_unique_index(self):
+        """Create the unique sample index, first merging aliases and duplicates stored before it existed"""
+        if self.conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'idx_samples_key'").fetchone():
+            return
+        with self.conn:
+            # Stores from before the dataset was part of the key
+            self.conn.execute('DROP INDEX IF EXISTS idx_samples_unique')
+            for table in ('snapshots', 'samples'):
+                self.conn.executemany(f"UPDATE {table} SET dataset = ? WHERE dataset = ?",
+                                      [(canonical, alias) for alias, canonical in DATASET_ALIASES.items()])
+            self.conn.execute('DELETE FROM samples WHERE rowid NOT IN '
+                              f"(SELECT MIN(rowid) FROM samples GROUP BY {SAMPLE_KEY})")
+            self.conn.execute(UNIQUE_SAMPLE_INDEX)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Close the database connection"""
+        self.conn.close()
+
+    def sample_rows(self, record, dataset, collected_ms):
+        """Turn one record into (day, device, hostname, dataset, entity, metric, ts_ms, value) rows"""
+        device = next((str(record[f]) for f in DEVICE_FIELDS if record.get(f)), None)
+        if device is None:
+            return []
+        hostname = next((str(record[f]) for f in HOSTNAME_FIELDS if record.get(f)), None)
+        ts_ms = next((int(numeric(record[f])) for f in TIME_FIELDS if numeric(record.get(f)) is not None),
+                     collected_ms)
+        day = datetime.fromtimestamp(ts_ms / 1000, tz=timezone.utc).strftime('%Y-%m-%d')
+        entity = entity_of(record)
+
+        rows = []
+        for metric, raw in record.items():
+            if metric in NON_METRIC_FIELDS:
+                continue
+            value = numeric(raw)
+            if value is not None:
+                rows.append((day, device, hostname, dataset, entity, metric, ts_ms, value))
+        return rows
+
+    def insert_samples(self, batch):
+        """Insert sample rows, ignoring samples already stored; returns the rows added"""
+        before = self.conn.total_changes
+        self.conn.executemany('INSERT OR IGNORE INTO samples VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', batch)
+        return self.conn.total_changes - before
+
+    def ingest_file(self, path, dataset=None):
+        """Append one snapshot file; returns new sample count, or None if already stored"""
+        stat = os.stat(path)
+        source = os.path.abspath(path)
+        if self.conn.execute('SELECT 1 FROM snapshots WHERE source = ? AND source_mtime_ns = ?',
+                             (source, stat.st_mtime_ns)).fetchone():
+            return None
+
+        if not dataset:
+            dataset = dataset_for(path)
+            dataset = DATASET_ALIASES.get(dataset, dataset)
+        collected_ms = stat.st_mtime_ns // 1_000_000
+        with self.conn:
+            cursor = self.conn.execute(
+                'INSERT INTO snapshots (dataset, source, source_mtime_ns, collected_ms, records, samples) '
+                'VALUES (?, ?, ?, ?, 0, 0)', (dataset, source, stat.st_mtime_ns, collected_ms))
+            snapshot_id = cursor.lastrowid
+            records = samples = 0
+            batch = []
+            for record in iter_records(path):
+                if not isinstance(record, dict):
+                    continue
+                records += 1
+                batch.extend((snapshot_id,) + row for row in self.sample_rows(record, dataset, collected_ms))
+                if len(batch) >= 5000:
+                    samples += self.insert_samples(batch)
+                    batch = []
+            if batch:
+                samples += self.insert_samples(batch)
+            self.conn.execute('UPDATE snapshots SET records = ?, samples = ? WHERE id = ?',
+                              (records, samples, snapshot_id))
+        return samples
+
+    def ingest(self, paths, dataset=None):
+        """Ingest files and directories of snapshots; returns counts and errors"""
+        files = []
+        for path in paths:
+            if os.path.isdir(path):
+                for root, _, names in os.walk(path):
+                    files.extend(os.path.join(root, n) for n in sorted(names))
+            else:
+                files.append(path)
+
+        result = {'files': 0, 'skipped': 0, 'samples': 0, 'errors': []}
+        for path in files:
+            name = plain_name(path)
+            if not name.endswith(('.json', '.ndjson')) or name.endswith(SKIPPED_SUFFIXES):
+                continue
+            if os.path.basename(name) in INVENTORY_FILES:
+                continue
+            try:
+                samples = self.ingest_file(path, dataset)
+            except (StreamParseError, ValueError, OSError, sqlite3.Error) as e:
+                result['errors'].append(f"{path}: {str(e)}")
+                continue
+            if samples is None:
+                result['skipped'] += 1
+            else:
+                result['files'] += 1
+                result['samples'] += samples
+        return result
+
+    def series(self, device, metric, days=30, dataset=None, entity=None):
+        """Return (ts_ms, entity, value) samples of one device metric over the last N days"""
+        since_ms = int((time.time() - days * 86400) * 1000)
+        query = ('SELECT ts_ms, entity, value FROM samples '
+                 'WHERE (device = ? OR hostname = ?) AND metric = ? AND ts_ms >= ?')
+        params = [device, device, metric, since_ms]
+        if dataset:
+            query += ' AND dataset = ?'
+            params.append(dataset)
+        if entity:
+            query += ' AND entity = ?'
+            params.append(entity)
+        return self.conn.execute(query + ' ORDER BY ts_ms, entity', params).fetchall()
+
+    def top(self, metric, limit=20, days=1, dataset=None, agg='max'):
+        """Rank device/entity pairs by a metric over the last N days"""
+        expressions = {
+            'max': 'MAX(value)',
+            'avg': 'AVG(value)',
+            'sum': 'SUM(value)',
+            'delta': 'MAX(value) - MIN(value)'
+        }
+        since_day = (datetime.now(timezone.utc) - timedelta(days=days)).strftime('%Y-%m-%d')
+        query = (f"SELECT device, MAX(hostname), entity, {expressions[agg]} AS score FROM samples "
+                 "WHERE day >= ? AND metric = ?")
+        params = [since_day, metric]
+        if dataset:
+            query += ' AND dataset = ?'
+            params.append(dataset)
+        query += ' GROUP BY device, entity ORDER BY score DESC LIMIT ?'
+        params.append(limit)
+        return self.conn.execute(query, params).fetchall()
+
+    def metrics(self, dataset=None):
+        """List (dataset, metric, sample count) known to the store"""
+        query = 'SELECT dataset, metric, COUNT(*) FROM samples'
+        params = []
+        if dataset:
+            query += ' WHERE dataset = ?'
+            params.append(dataset)
+        return self.conn.execute(query + ' GROUP BY dataset, metric ORDER BY dataset, metric', params).fetchall()
+
+    def prune(self, older_than_days):
+        """Drop whole days of samples older than the retention period"""
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=older_than_days)).strftime('%Y-%m-%d')
+        # Snapshot rows stay, so pruned files are not ingested again
+        with self.conn:
+            return self.conn.execute('DELETE FROM samples WHERE day < ?', (cutoff,)).rowcount
+
+def format_ms(ms):
+    """Format epoch milliseconds as a UTC timestamp"""
+    return datetime.fromtimestamp(ms / 1000, tz=timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='SD-WAN Statistics Time-Series Store')
+    parser.add_argument('--db', default=DEFAULT_DB_PATH,
+                       help='SQLite store path (default: generated/stats_store.sqlite)')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    ingest_parser = subparsers.add_parser('ingest', help='Append snapshot files or directories')
+    ingest_parser.add_argument('paths', nargs='+')
+    ingest_parser.add_argument('--dataset', help='Dataset name (default: derived from file names)')
+
+    series_parser = subparsers.add_parser('series', help='One device metric over time')
+    series_parser.add_argument('device', help='System IP, device id or hostname')
+    series_parser.add_argument('metric', help='Metric name, e.g. cpu_user')
+    series_parser.add_argument('--days', type=int, default=30)
+    series_parser.add_argument('--dataset')
+    series_parser.add_argument('--entity', help='Interface, tunnel or peer')
+
+    top_parser = subparsers.add_parser('top', help='Top devices/entities by a metric')
+    top_parser.add_argument('metric', help='Metric name, e.g. rx-errors')
+    top_parser.add_argument('--limit', type=int, default=20)
+    top_parser.add_argument('--days', type=int, default=1)
+    top_parser.add_argument('--dataset')
+    top_parser.add_argument('--agg', choices=['max', 'avg', 'sum', 'delta'], default='max',
+                           help='delta ranks cumulative counters by growth (default: max)')
+
+    metrics_parser = subparsers.add_parser('metrics', help='List stored datasets and metrics')
+    metrics_parser.add_argument('--dataset')
+
+    prune_parser = subparsers.add_parser('prune', help='Drop days older than the retention period')
+    prune_parser.add_argument('--older-than', type=int, default=90, help='Days to keep (default: 90)')
+
+    try:
+        args = parser.parse_args()
+        with StatsStore(args.db) as store:
+            if args.command == 'ingest':
+                result = store.ingest(args.paths, dataset=args.dataset)
+                color = Colors.GREEN if not result['errors'] else Colors.YELLOW
+                print(f"{color}{result['samples']} samples from {result['files']} files "
+                      f"({result['skipped']} unchanged){Colors.END}")
+                for error in result['errors'][:5]:
+                    print(f"  {Colors.RED}• {error}{Colors.END}")
+                sys.exit(0 if not result['errors'] else 1)
+            elif args.command == 'series':
+                for ts_ms, entity, value in store.series(args.device, args.metric, args.days,
+                                                         args.dataset, args.entity):
+                    print(f"{format_ms(ts_ms)}  {entity or '-':<24} {value:g}")
+            elif args.command == 'top':
+                for device, hostname, entity, score in store.top(args.metric, args.limit, args.days,
+                                                                 args.dataset, args.agg):
+                    print(f"{score:>14g}  {hostname or device:<24} {entity or '-'}")
+            elif args.command == 'metrics':
+                for dataset, metric, count in store.metrics(args.dataset):
+                    print(f"{dataset:<28} {metric:<32} {count}")
+            elif args.command == 'prune':
+                print(f"Removed {store.prune(args.older_than)} samples")
+
+    except KeyboardInterrupt:
+        sys.exit(1)
+    except sqlite3.Error as e:
+        print(f"{Colors.RED}Store error: {str(e)}{Colors.END}", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
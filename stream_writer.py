@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+SD-WAN Streaming Response Writer
+================================
+
+Writes large dataservice responses (tunnel statistics, events, BFD
+sessions) to disk without holding the whole document in memory. Modes:
+- raw:    copy the HTTP body to disk in chunks
+- ndjson: emit one data[] record per line, plus a small .meta.json sidecar
+
+Either mode can write framed gzip/zstd output (see compressed_io). The
+same incremental parser is used by post_check to validate the files.
+
+Author: SD-WAN Automation Team
+Version: 1.0
+"""
+
+import os
+import sys
+import json
+import codecs
+import argparse
+from datetime import datetime
+from tracing import get_tracer
+from compressed_io import (CompressedDataError, available_codecs, resolve_codec, output_path,
+                           plain_name, publish, open_output, open_input)
+
+CHUNK_SIZE = 1024 * 1024
+# Characters that may follow a complete number in a JSON document
+NUMBER_DELIMITERS = ',]} \t\r\n'
+STREAMED_ENDPOINTS = {
+    'tunnel': '/dataservice/device/tunnel/statistics',
+    'events': '/dataservice/event',
+    'bfd': '/dataservice/device/bfd/sessions'
+}
+
+class StreamParseError(ValueError):
+    """Raised when a streamed JSON document is malformed or truncated"""
+
+class JSONRecordStream:
+    """Incrementally parse a JSON document and yield its data[] records"""
+
+    def __init__(self, chunks, records_key='data'):
+        self.chunks = iter(chunks)
+        self.records_key = records_key
+        self.decoder = json.JSONDecoder()
+        self.utf8 = codecs.getincrementaldecoder('utf-8')()
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+        self.metadata = {}
+        self.record_count = 0
+
+    def _fill(self):
+        """Read the next chunk into the buffer; return False at end of input"""
+        if self.eof:
+            return False
+        # Drop consumed text so the buffer only ever holds the unparsed tail
+        if self.pos:
+            self.buffer = self.buffer[self.pos:]
+            self.pos = 0
+        for chunk in self.chunks:
+            if isinstance(chunk, bytes):
+                chunk = self.utf8.decode(chunk)
+            if chunk:
+                self.buffer += chunk
+                return True
+        self.buffer += self.utf8.decode(b'', final=True)
+        self.eof = True
+        return False
+
+    def _peek(self):
+        """Return the next non-whitespace character without consuming it"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in ' \t\r\n':
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                raise StreamParseError("Unexpected end of JSON document (truncated?)")
+
+    def _expect(self, char):
+        if self._peek() != char:
+            raise StreamParseError(f"Expected '{char}' but found '{self.buffer[self.pos]}'")
+        self.pos += 1
+
+    def _value(self):
+        """Decode one complete JSON value, reading more input as needed"""
+        self._peek()
+        at_eof = False
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except ValueError:
+                pass
+            else:
+                # A number may continue in the next chunk ("-2500." + "0"), so it is only
+                # complete once a delimiter or the end of the input follows it
+                if (self.buffer[self.pos] in '{["tfn' or self.eof
+                        or (end < len(self.buffer) and self.buffer[end] in NUMBER_DELIMITERS)):
+                    self.pos = end
+                    return value
+            if self._fill():
+                continue
+            # Decode once more at end of input, where a trailing bare number is complete
+            if at_eof:
+                raise StreamParseError("Invalid or truncated JSON value")
+            at_eof = True
+
+    def _array(self):
+        """Yield the elements of the array at the current position"""
+        self._expect('[')
+        if self._peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self._value()
+            separator = self._peek()
+            self.pos += 1
+            if separator == ']':
+                return
+            if separator != ',':
+                raise StreamParseError(f"Expected ',' or ']' in array but found '{separator}'")
+
+    def __iter__(self):
+        first = self._peek()
+        if first == '[':
+            for record in self._array():
+                self.record_count += 1
+                yield record
+        elif first == '{':
+            self.pos += 1
+            if self._peek() == '}':
+                self.pos += 1
+            else:
+                while True:
+                    key = self._value()
+                    self._expect(':')
+                    if key == self.records_key and self._peek() == '[':
+                        for record in self._array():
+                            self.record_count += 1
+                            yield record
+                    else:
+                        self.metadata[key] = self._value()
+                    separator = self._peek()
+                    self.pos += 1
+                    if separator == '}':
+                        break
+                    if separator != ',':
+                        raise StreamParseError(f"Expected ',' or '}}' in object but found '{separator}'")
+        else:
+            self.metadata['value'] = self._value()
+
+        # Anything but whitespace after the document means the file is corrupt
+        while True:
+            if self.buffer[self.pos:].strip():
+                raise StreamParseError("Unexpected data after end of JSON document")
+            self.pos = len(self.buffer)
+            if not self._fill():
+                break
+
+def iter_file_chunks(path, chunk_size=CHUNK_SIZE):
+    """Yield a file's contents in binary chunks, decompressing .gz/.zst files"""
+    with open_input(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            yield chunk
+
+def stream_raw(response, dest, chunk_size=CHUNK_SIZE, codec=None):
+    """Copy an HTTP response body to disk in chunks and return the byte count"""
+    written = 0
+    tmp_path = f"{dest}.tmp"
+    with open_output(tmp_path, codec, 'wb') as f:
+        for chunk in response.iter_content(chunk_size=chunk_size):
+            f.write(chunk)
+            written += len(chunk)
+    publish(tmp_path, dest)
+    return written
+
+def stream_ndjson(chunks, dest, source=None, codec=None):
+    """Write one data[] record per line and return the sidecar metadata"""
+    stream = JSONRecordStream(chunks)
+    tmp_path = f"{dest}.tmp"
+    try:
+        with open_output(tmp_path, codec) as f:
+            for record in stream:
+                f.write(json.dumps(record, separators=(',', ':')))
+                f.write('\n')
+    except StreamParseError:
+        os.remove(tmp_path)
+        raise
+    publish(tmp_path, dest)
+
+    meta = {
+        'source': source,
+        'records': stream.record_count,
+        'written': datetime.now().isoformat(),
+        'metadata': stream.metadata
+    }
+    with open(f"{dest}.meta.json", 'w') as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+def download(client, path, dest, fmt='ndjson', params=None, timeout=None, codec=None):
+    """Stream an API path to disk in raw or NDJSON form, compressed when a codec is given"""
+    dest = output_path(dest, codec)
+    os.makedirs(os.path.dirname(os.path.abspath(dest)), exist_ok=True)
+    response = client.get(path, params=params, timeout=timeout, stream=True)
+    try:
+        if response.status_code != 200:
+            return {'status': response.status_code, 'dest': None, 'records': None, 'bytes': None}
+        # The API span ends at the headers; the body is read while writing
+        with get_tracer().span('write', os.path.basename(dest), device=(params or {}).get('deviceId')) as span:
+            if fmt == 'raw':
+                written = stream_raw(response, dest, codec=codec)
+                span['bytes'] = os.path.getsize(dest)
+                return {'status': 200, 'dest': dest, 'records': None, 'bytes': written}
+            meta = stream_ndjson(response.iter_content(chunk_size=CHUNK_SIZE), dest, source=path, codec=codec)
+            span['bytes'] = os.path.getsize(dest)
+            return {'status': 200, 'dest': dest, 'records': meta['records'], 'bytes': span['bytes']}
+    finally:
+        response.close()
+
+def validate_json_file(path):
+    """Validate a .json or .ndjson file in a streaming pass; return (ok, records, error)"""
+    try:
+        if plain_name(path).endswith('.ndjson'):
+            records = 0
+            with open_input(path, 'r') as f:
+                for line_number, line in enumerate(f, 1):
+                    if not line.strip():
+                        continue
+                    try:
+                        json.loads(line)
+                    except ValueError as e:
+                        return False, records, f"line {line_number}: {str(e)}"
+                    records += 1
+
+            # Cross-check against the sidecar written at collection time
+            meta_path = f"{path}.meta.json"
+            if os.path.exists(meta_path):
+                with open(meta_path, 'r') as f:
+                    expected = json.load(f).get('records')
+                if expected is not None and expected != records:
+                    return False, records, f"expected {expected} records, found {records}"
+            return True, records, None
+
+        stream = JSONRecordStream(iter_file_chunks(path))
+        for _ in stream:
+            pass
+        return True, stream.record_count, None
+    except (StreamParseError, CompressedDataError, UnicodeDecodeError, OSError) as e:
+        return False, 0, str(e)
+
+def main():
+    """Main function"""
+    from vmanage_client import VManageClient, VManageError
+
+    parser = argparse.ArgumentParser(description='SD-WAN Streaming Response Writer')
+    parser.add_argument('endpoint',
+                       help=f"API path or shortcut ({', '.join(sorted(STREAMED_ENDPOINTS))})")
+    parser.add_argument('--output', '-o', required=True,
+                       help='Destination file')
+    parser.add_argument('--format', '-f', choices=['ndjson', 'raw'], default='ndjson',
+                       help='ndjson: one data[] record per line; raw: body as received (default: ndjson)')
+    parser.add_argument('--timeout', '-t', type=int, default=300,
+                       help='Request timeout in seconds (default: 300)')
+    parser.add_argument('--compress', choices=available_codecs() + ['off'],
+                       help='Write framed compressed output, adding .gz/.zst (default: $SDWAN_COMPRESS or off)')
+
+    try:
+        args = parser.parse_args()
+        path = STREAMED_ENDPOINTS.get(args.endpoint, args.endpoint)
+        codec = resolve_codec(args.compress)
+
+        with VManageClient.from_env(timeout=args.timeout) as client:
+            result = download(client, path, args.output, fmt=args.format, codec=codec)
+
+        if result['status'] != 200:
+            print(f"{path}: HTTP {result['status']}", file=sys.stderr)
+            sys.exit(1)
+        records = f", {result['records']} records" if result['records'] is not None else ""
+        print(f"{path} -> {result['dest']} ({result['bytes']} bytes{records})")
+
+    except KeyboardInterrupt:
+        sys.exit(1)
+    except (VManageError, ValueError) as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+SD-WAN Incremental Template Collector
+=====================================
+
+Version-aware collection of device and feature template details for use
+cases 16, 17 and 19. Every run fetches the two template lists, but only
+templates whose version changed since the last run get their detail call
+(config/input for device templates, feature/object for feature
+templates). Detail calls run concurrently. Each run:
+- Writes device_templates.json / feature_templates.json like the playbooks
+- Fetches details for new and changed templates only; --full refetches all
+- Removes detail files of templates that were deleted on vManage
+- Writes template_changeset.json and appends to template_changes.ndjson
+
+A template's version is its lastUpdatedOn and templateVersion, plus the
+attached device count for device templates (the input variables change
+when devices are attached). State lives in templates/template_state.json.
+
+Author: SD-WAN Automation Team
+Version: 1.0
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from vmanage_client import VManageClient, VManageError
+from response_cache import ResponseCache
+from tracing import TRACE_FILE_NAME, configure, get_tracer
+from device_queries import RETRYABLE_STATUS, safe_name
+from catalog import open_catalog
+
+class Colors:
+    """Color codes for terminal output"""
+    GREEN = '\033[92m'
+    RED = '\033[91m'
+    YELLOW = '\033[93m'
+    BLUE = '\033[94m'
+    CYAN = '\033[96m'
+    WHITE = '\033[97m'
+    BOLD = '\033[1m'
+    END = '\033[0m'
+
+TEMPLATE_KINDS = {
+    'device': {
+        'list_path': '/dataservice/template/device',
+        'detail_path': '/dataservice/template/device/config/input/{template_id}',
+        'list_file': 'device_templates.json',
+        'detail_prefix': 'device_template_input',
+        'version_fields': ('lastUpdatedOn', 'templateVersion', 'version', 'devicesAttached')
+    },
+    'feature': {
+        'list_path': '/dataservice/template/feature',
+        'detail_path': '/dataservice/template/feature/object/{template_id}',
+        'list_file': 'feature_templates.json',
+        'detail_prefix': 'feature_template_details',
+        'version_fields': ('lastUpdatedOn', 'templateVersion', 'version')
+    }
+}
+
+TEMPLATES_DIR = 'templates'
+STATE_FILE = 'template_state.json'
+CHANGESET_FILE = 'template_changeset.json'
+HISTORY_FILE = 'template_changes.ndjson'
+
+def write_json(path, data):
+    """Write JSON atomically, formatted like Ansible's to_nice_json"""
+    tmp_path = f"{path}.tmp"
+    with get_tracer().span('write', os.path.basename(os.path.dirname(path)) or '.') as span:
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, indent=4, sort_keys=True)
+        span['bytes'] = os.path.getsize(tmp_path)
+        os.replace(tmp_path, path)
+    return path
+
+class TemplateCollector:
+    def __init__(self, client, generated_dir='generated', kinds=None, max_in_flight=16,
+                 full=False, retries=2, backoff=1.0, catalog_run=None):
+        self.client = client
+        self.generated_dir = generated_dir
+        self.templates_dir = os.path.join(generated_dir, TEMPLATES_DIR)
+        self.kinds = kinds or list(TEMPLATE_KINDS)
+        self.max_in_flight = max_in_flight
+        self.full = full
+        self.retries = retries
+        self.backoff = backoff
+        self.catalog_run = catalog_run
+        self.state_path = os.path.join(self.templates_dir, STATE_FILE)
+        self.state = {kind: {} for kind in TEMPLATE_KINDS}
+        self._state_lock = threading.Lock()
+
+    def load_state(self):
+        """Load the versions seen by the previous run"""
+        if os.path.exists(self.state_path):
+            with open(self.state_path, 'r') as f:
+                saved = json.load(f)
+            for kind in TEMPLATE_KINDS:
+                self.state[kind] = saved.get('templates', {}).get(kind, {})
+
+    def save_state(self):
+        """Write the version state atomically"""
+        with self._state_lock:
+            write_json(self.state_path, {'updated': datetime.now().isoformat(), 'templates': self.state})
+
+    def version_of(self, kind, template):
+        """Return the fields that identify a template revision"""
+        return {f: template[f] for f in TEMPLATE_KINDS[kind]['version_fields'] if f in template}
+
+    def detail_file(self, kind, template_id):
+        """Return the detail file path of a template"""
+        return os.path.join(self.templates_dir, f"{TEMPLATE_KINDS[kind]['detail_prefix']}_{safe_name(template_id)}.json")
+
+    def fetch_list(self, kind):
+        """Fetch one template list and write it where the playbooks keep it"""
+        data = self.client.get_json(TEMPLATE_KINDS[kind]['list_path'])
+        path = write_json(os.path.join(self.generated_dir, TEMPLATE_KINDS[kind]['list_file']), data)
+        if self.catalog_run:
+            self.catalog_run.add(path, data=data, use_case='templates')
+        return [t for t in data.get('data', []) if t.get('templateId')]
+
+    def plan(self, kind, templates):
+        """Split a template list into fetches (new or changed), unchanged and removed templates"""
+        known = self.state[kind]
+        fetches, unchanged = [], []
+        for template in templates:
+            template_id = template['templateId']
+            previous = known.get(template_id)
+            version = self.version_of(kind, template)
+            if previous is None:
+                fetches.append(('added', template, None))
+            elif previous['version'] != version:
+                fetches.append(('changed', template, previous))
+            elif self.full or not os.path.exists(os.path.join(self.templates_dir, previous['file'])):
+                fetches.append(('refetched', template, previous))
+            else:
+                unchanged.append(template_id)
+        current = {t['templateId'] for t in templates}
+        removed = [(template_id, entry) for template_id, entry in known.items() if template_id not in current]
+        return fetches, unchanged, removed
+
+    def fetch_detail(self, kind, change, template, previous):
+        """Fetch and write one template's details, retrying throttled or failed requests"""
+        template_id = template['templateId']
+        record = {
+            'kind': kind,
+            'templateId': template_id,
+            'templateName': template.get('templateName'),
+            'change': change,
+            'previous': previous['version'] if previous else None,
+            'current': self.version_of(kind, template),
+            'file': None,
+            'status': None,
+            'error': None
+        }
+        path = TEMPLATE_KINDS[kind]['detail_path'].format(template_id=template_id)
+        for attempt in range(self.retries + 1):
+            result = self.client.fetch(path)
+            record['status'] = result['status']
+            if result['status'] == 200 and 'json' in result:
+                record['file'] = write_json(self.detail_file(kind, template_id), result['json'])
+                with self._state_lock:
+                    self.state[kind][template_id] = {'version': record['current'], 'name': record['templateName'],
+                                                     'file': os.path.basename(record['file'])}
+                if self.catalog_run:
+                    self.catalog_run.add(record['file'], data=result['json'], use_case='templates')
+                return record
+            record['error'] = result.get('msg') or f"HTTP {result['status']}"
+            if result['status'] not in RETRYABLE_STATUS:
+                break
+            if attempt < self.retries:
+                time.sleep(self.backoff * (2 ** attempt) * random.uniform(0.5, 1.5))
+        # The previous version stays in the state, so the next run tries again
+        return record
+
+    def remove(self, kind, template_id, entry):
+        """Forget a template deleted on vManage and remove its detail file"""
+        path = os.path.join(self.templates_dir, entry.get('file') or '')
+        if entry.get('file') and os.path.exists(path):
+            os.remove(path)
+        with self._state_lock:
+            self.state[kind].pop(template_id, None)
+        return {'kind': kind, 'templateId': template_id, 'templateName': entry.get('name'), 'change': 'removed',
+                'previous': entry.get('version'), 'current': None, 'file': None, 'status': None, 'error': None}
+
+    def run(self, on_result=None):
+        """Collect every requested kind and return the changeset"""
+        os.makedirs(self.templates_dir, exist_ok=True)
+        self.load_state()
+        start = time.monotonic()
+        changes, failures, summary = [], [], {}
+
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as executor:
+            futures = {}
+            for kind in self.kinds:
+                templates = self.fetch_list(kind)
+                fetches, unchanged, removed = self.plan(kind, templates)
+                summary[kind] = {'templates': len(templates), 'fetched': len(fetches), 'unchanged': len(unchanged),
+                                 'added': 0, 'changed': 0, 'refetched': 0, 'removed': len(removed), 'failed': 0}
+                for change, template, previous in fetches:
+                    futures[executor.submit(self.fetch_detail, kind, change, template, previous)] = kind
+                for template_id, entry in removed:
+                    changes.append(self.remove(kind, template_id, entry))
+                    if on_result:
+                        on_result(changes[-1])
+
+            for future in as_completed(futures):
+                record = future.result()
+                if record['file']:
+                    changes.append(record)
+                    summary[record['kind']][record['change']] += 1
+                else:
+                    failures.append(record)
+                    summary[record['kind']]['failed'] += 1
+                if on_result:
+                    on_result(record)
+
+        self.save_state()
+        changeset = {
+            'timestamp': datetime.now().isoformat(),
+            'mode': 'full' if self.full else 'incremental',
+            'kinds': self.kinds,
+            'summary': summary,
+            'changes': sorted(changes, key=lambda c: (c['kind'], c['change'], c['templateId'])),
+            'failed': failures,
+            'wall_seconds': round(time.monotonic() - start, 3),
+            'rate_limiter': self.client.limiter.stats() if self.client.limiter else None
+        }
+        write_json(os.path.join(self.templates_dir, CHANGESET_FILE), changeset)
+        if changeset['changes']:
+            with open(os.path.join(self.templates_dir, HISTORY_FILE), 'a') as f:
+                for change in changeset['changes']:
+                    f.write(json.dumps(dict(change, timestamp=changeset['timestamp'])) + "\n")
+        return changeset
+
+def print_change(record):
+    """Print one changed, removed or failed template"""
+    name = record['templateName'] or record['templateId']
+    if record['error']:
+        print(f"{Colors.RED}✗{Colors.END} {record['kind']} {name}: {record['error']}")
+    elif record['change'] == 'removed':
+        print(f"{Colors.YELLOW}-{Colors.END} {record['kind']} {name} removed")
+    else:
+        symbol = '+' if record['change'] == 'added' else '~'
+        print(f"{Colors.GREEN}{symbol}{Colors.END} {record['kind']} {name} {record['change']}")
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='SD-WAN Incremental Template Collector')
+    parser.add_argument('--kind', '-k', action='append', choices=sorted(TEMPLATE_KINDS),
+                       help='Template kind to collect (repeatable, default: device and feature)')
+    parser.add_argument('--generated-dir', '-d', default='generated',
+                       help='Output root shared with the playbooks (default: generated)')
+    parser.add_argument('--max-in-flight', '-n', type=int, default=16,
+                       help='Concurrent template detail requests (default: 16)')
+    parser.add_argument('--full', action='store_true',
+                       help='Refetch every template instead of only changed ones')
+    parser.add_argument('--timeout', '-t', type=int, default=60,
+                       help='Per-request timeout in seconds (default: 60)')
+    parser.add_argument('--retries', '-r', type=int, default=2,
+                       help='Retries for throttled or failed detail requests (default: 2)')
+    parser.add_argument('--quiet', '-q', action='store_true',
+                       help='Do not print a line per changed template')
+
+    try:
+        args = parser.parse_args()
+        configure(os.path.join(args.generated_dir, TEMPLATES_DIR, TRACE_FILE_NAME))
+        catalog = open_catalog()
+        catalog_run = catalog.begin_run(f"templates_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
+                                        'templates', args.generated_dir) if catalog else None
+
+        # Version checks need the live template lists; the cache is refreshed but not read
+        with VManageClient.from_env(timeout=args.timeout, pool_size=args.max_in_flight,
+                                    cache=ResponseCache.from_env(bypass=True)) as client:
+            collector = TemplateCollector(client, args.generated_dir, kinds=args.kind,
+                                          max_in_flight=args.max_in_flight, full=args.full,
+                                          retries=args.retries, catalog_run=catalog_run)
+            changeset = collector.run(on_result=None if args.quiet else print_change)
+
+        if catalog:
+            with catalog:
+                catalog.finish_run(catalog_run, status='ok' if not changeset['failed'] else 'partial')
+
+        for kind, counts in changeset['summary'].items():
+            print(f"{Colors.CYAN}{kind}: {counts['templates']} templates, {counts['added']} added, "
+                  f"{counts['changed']} changed, {counts['removed']} removed, {counts['unchanged']} unchanged"
+                  f"{', ' + str(counts['refetched']) + ' refetched' if counts['refetched'] else ''}"
+                  f"{', ' + str(counts['failed']) + ' failed' if counts['failed'] else ''}{Colors.END}")
+        if not changeset['changes'] and not changeset['failed']:
+            print(f"{Colors.GREEN}No template changes since the last run{Colors.END}")
+        color = Colors.GREEN if not changeset['failed'] else Colors.YELLOW
+        print(f"{color}{changeset['mode'].capitalize()} collection finished in {changeset['wall_seconds']}s; "
+              f"changeset in {os.path.join(args.generated_dir, TEMPLATES_DIR, CHANGESET_FILE)}{Colors.END}")
+        sys.exit(0 if not changeset['failed'] else 1)
+
+    except KeyboardInterrupt:
+        print(f"\n{Colors.YELLOW}Collection interrupted by user{Colors.END}")
+        sys.exit(1)
+    except VManageError as e:
+        print(f"\n{Colors.RED}vManage error: {str(e)}{Colors.END}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Stats store ingestion of a collect_all output tree"""
+
+import os
+import sys
+import shutil
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from collect_all import STATS_USE_CASES, CollectAll
+from mock_vmanage import Fabric, MockVManageServer
+from stats_store import DATASET_ALIASES, StatsStore
+from vmanage_client import VManageClient
+
+class CollectAllIngestTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        if not shutil.which('openssl'):
+            raise unittest.SkipTest('openssl is needed for the mock vManage certificate')
+        cls.server = MockVManageServer(('127.0.0.1', 0), Fabric(devices=12, seed=3))
+        cls.server.enable_tls()
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+        cls.tmp_dir = tempfile.mkdtemp(prefix='stats_store_test_')
+        cls.generated_dir = os.path.join(cls.tmp_dir, 'generated')
+        with VManageClient('127.0.0.1', 'admin', 'admin', port=cls.server.server_address[1], cache=None) as client:
+            cls.orchestrator = CollectAll(client, cls.generated_dir, use_cases=list(STATS_USE_CASES))
+            summary = cls.orchestrator.run()
+        assert summary['failed'] == 0, summary
+        cls.stats_dirs = [cls.orchestrator.use_case_dir(u) for u in STATS_USE_CASES]
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        shutil.rmtree(cls.tmp_dir, ignore_errors=True)
+
+    def setUp(self):
+        self.store = StatsStore(os.path.join(self.tmp_dir, f"{self.id().rsplit('.', 1)[-1]}.sqlite"))
+        self.addCleanup(self.store.close)
+
+    def duplicate_keys(self):
+        return self.store.conn.execute(
+            'SELECT COUNT(*) FROM (SELECT 1 FROM samples GROUP BY dataset, device, entity, metric, ts_ms '
+            'HAVING COUNT(*) > 1)').fetchone()[0]
+
+    def datasets(self):
+        return {row[0] for row in self.store.conn.execute('SELECT DISTINCT dataset FROM samples')}
+
+    def test_one_sample_per_key(self):
+        result = self.store.ingest(self.stats_dirs)
+        self.assertEqual(result['errors'], [])
+        self.assertGreater(result['samples'], 0)
+        self.assertEqual(self.duplicate_keys(), 0)
+        total = self.store.conn.execute('SELECT COUNT(*) FROM samples').fetchone()[0]
+        self.assertEqual(total, result['samples'])
+
+    def test_inventory_copies_are_not_ingested(self):
+        self.store.ingest(self.stats_dirs)
+        self.assertFalse(self.datasets() & {'device_list', 'devices_list'})
+
+    def test_endpoint_aliases_fold_onto_one_dataset(self):
+        self.store.ingest(self.stats_dirs)
+        datasets = self.datasets()
+        self.assertFalse(datasets & set(DATASET_ALIASES))
+        self.assertIn('interface_statistics', datasets)
+        self.assertIn('tunnel_statistics', datasets)
+        # Every per-device interface sample is found under the dataset filter
+        devices = self.store.conn.execute(
+            "SELECT COUNT(DISTINCT device) FROM samples WHERE dataset = 'interface_statistics'").fetchone()[0]
+        self.assertEqual(devices, 12)
+
+    def test_reingest_adds_nothing(self):
+        first = self.store.ingest(self.stats_dirs)
+        second = self.store.ingest(self.stats_dirs)
+        self.assertEqual(second['files'], 0)
+        self.assertEqual(second['skipped'], first['files'])
+
+    def test_existing_duplicates_are_dropped(self):
+        self.store.ingest(self.stats_dirs)
+        before = self.store.conn.execute('SELECT COUNT(*) FROM samples').fetchone()[0]
+        with self.store.conn:
+            self.store.conn.execute('DROP INDEX idx_samples_key')
+            self.store.conn.execute('INSERT INTO samples SELECT * FROM samples')
+            self.store.conn.execute("INSERT INTO samples SELECT snapshot_id, day, device, hostname, "
+                                    "'interface_statistics_all', entity, metric, ts_ms, value FROM samples "
+                                    "WHERE dataset = 'interface_statistics'")
+        self.store.add_unique_index()
+        self.assertNotIn('interface_statistics_all', self.datasets())
+        self.assertEqual(self.duplicate_keys(), 0)
+        self.assertEqual(self.store.conn.execute('SELECT COUNT(*) FROM samples').fetchone()[0], before)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+"""JSONRecordStream parsing across read-chunk boundaries"""
+
+import os
+import sys
+import json
+import random
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stream_writer import JSONRecordStream, StreamParseError
+
+DOCUMENT = json.dumps({
+    'header': {'generatedOn': 1700000000000, 'ratio': 0.25},
+    'data': [1, -2500.0, 3, 1.5e-3, -0.0, 12345678901234567890, True, False, None, 'x', [],
+             {'rx_octets': 12.75, 'tx_errors': -3, 'ifname': 'ge0/0', 'nested': [0.5, {'a': 1e10}]}],
+    'pageInfo': {'count': 12, 'moreEntries': False}
+})
+
+def split(text, cuts):
+    """Split text at the given offsets"""
+    bounds = [0] + sorted(cuts) + [len(text)]
+    return [text[a:b] for a, b in zip(bounds, bounds[1:])]
+
+def parse(chunks):
+    stream = JSONRecordStream(chunks)
+    return list(stream), stream.metadata
+
+class ChunkBoundaryTest(unittest.TestCase):
+    def setUp(self):
+        expected = json.loads(DOCUMENT)
+        self.records = expected.pop('data')
+        self.metadata = expected
+
+    def test_float_split_after_decimal_point(self):
+        records, _ = parse(['{"data": [1, -2500.', '0, 3]}'])
+        self.assertEqual(records, [1, -2500.0, 3])
+
+    def test_exponent_split(self):
+        records, _ = parse(['{"data": [1e', '5, 2E-', '2]}'])
+        self.assertEqual(records, [1e5, 2e-2])
+
+    def test_bare_number_at_end_of_input(self):
+        for chunks in (['12.5'], ['12', '.5'], ['-', '7']):
+            stream = JSONRecordStream(chunks)
+            self.assertEqual(list(stream), [])
+            self.assertEqual(stream.metadata['value'], float(''.join(chunks)))
+
+    def test_every_single_split(self):
+        for cut in range(1, len(DOCUMENT)):
+            records, metadata = parse(split(DOCUMENT, [cut]))
+            self.assertEqual(records, self.records, f"split at {cut}")
+            self.assertEqual(metadata, self.metadata, f"split at {cut}")
+
+    def test_random_splits_and_bytes(self):
+        rng = random.Random(7)
+        raw = DOCUMENT.encode('utf-8')
+        for _ in range(300):
+            cuts = rng.sample(range(1, len(raw)), rng.randint(1, 20))
+            bounds = [0] + sorted(cuts) + [len(raw)]
+            records, _ = parse(raw[a:b] for a, b in zip(bounds, bounds[1:]))
+            self.assertEqual(records, self.records)
+
+    def test_truncated_number_still_fails(self):
+        with self.assertRaises(StreamParseError):
+            parse(['{"data": [1, -'])
+        with self.assertRaises(StreamParseError):
+            parse(['{"data": [1, 2.', '5'])
+
+if __name__ == '__main__':
+    unittest.main()
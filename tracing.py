@@ -0,0 +1,247 @@
+"""
+SD-WAN Operation Tracing
+========================
+
+Per-request spans written to <operation_dir>/trace.ndjson so post_check
+can report where an operation spent its time. Each span records:
+- kind (api, sastre, write, step), endpoint and device
+- start (epoch seconds), duration, bytes and status
+- the run it belongs to, shared with the child processes of that run
+
+Tracing is enabled by the collector and runner scripts for their output
+directory, or for any process by SDWAN_TRACE_FILE; SDWAN_TRACE=off turns
+it off. Spans are appended one line at a time, so several threads and
+processes can share a trace file. A file larger than SDWAN_TRACE_MAX_MB
+(default 64) is moved to trace.ndjson.1, so long-running processes such
+as the job scheduler keep at most two files.
+
+Author: SD-WAN Automation Team
+Version: 1.0
+"""
+
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+TRACE_FILE_NAME = 'trace.ndjson'
+DEFAULT_MAX_BYTES = int(float(os.environ.get('SDWAN_TRACE_MAX_MB', '64')) * 1024 * 1024)
+# Coarse spans that chain into a critical path when present
+PHASE_KINDS = ('step', 'sastre')
+
+class Tracer:
+    """Append-only NDJSON span writer; a no-op until opened"""
+
+    def __init__(self, path=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = None
+        self.run_id = None
+        self.max_bytes = max_bytes
+        self._file = None
+        self._lock = threading.Lock()
+        if path:
+            self.open(path)
+
+    @property
+    def enabled(self):
+        return self._file is not None
+
+    def open(self, path):
+        """Start appending spans to path"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self.path = path
+            self._file = open(path, 'a', buffering=1)
+            self._rotate_if_full()
+
+    def _rotate_if_full(self):
+        """Move a full trace file to <path>.1 and start a new one; call with the lock held"""
+        if not self.max_bytes or self._file.tell() < self.max_bytes:
+            return
+        self._file.close()
+        # Other processes appending to the old file finish their lines in <path>.1
+        os.replace(self.path, f"{self.path}.1")
+        self._file = open(self.path, 'a', buffering=1)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+            self._file = None
+
+    def record(self, kind, endpoint, start, duration, device=None, nbytes=None, status=None, **extra):
+        """Write one finished span"""
+        if self._file is None:
+            return
+        span = {
+            'kind': kind,
+            'endpoint': endpoint,
+            'device': device,
+            'start': round(start, 6),
+            'duration': round(duration, 6),
+            'bytes': nbytes,
+            'status': status,
+            'pid': os.getpid(),
+            'run': self.run_id
+        }
+        span.update(extra)
+        line = json.dumps(span, separators=(',', ':')) + '\n'
+        with self._lock:
+            if self._file is not None:
+                self._file.write(line)
+                self._rotate_if_full()
+
+    @contextmanager
+    def span(self, kind, endpoint, device=None, **extra):
+        """Time a block; the caller may set 'bytes' and 'status' on the yielded dict"""
+        info = {'bytes': None, 'status': None}
+        start = time.time()
+        started = time.monotonic()
+        try:
+            yield info
+        except Exception:
+            if info['status'] is None:
+                info['status'] = 'error'
+            raise
+        finally:
+            self.record(kind, endpoint, start, time.monotonic() - started, device=device,
+                        nbytes=info['bytes'], status=info['status'], **extra)
+
+_tracer = Tracer()
+
+def get_tracer():
+    """Return the process-wide tracer"""
+    return _tracer
+
+def configure(default_path=None):
+    """Enable tracing to SDWAN_TRACE_FILE or default_path unless SDWAN_TRACE=off"""
+    if os.environ.get('SDWAN_TRACE', '').strip().lower() in ('0', 'off', 'false', 'no'):
+        return _tracer
+    path = os.environ.get('SDWAN_TRACE_FILE') or default_path
+    if path and _tracer.path != path:
+        # A new run unless a parent process already started one
+        _tracer.run_id = os.environ.get('SDWAN_TRACE_RUN') or f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}"
+        _tracer.open(path)
+        # Child processes started from here append to the same file, as part of the same run
+        os.environ['SDWAN_TRACE_FILE'] = path
+        os.environ['SDWAN_TRACE_RUN'] = _tracer.run_id
+    return _tracer
+
+if os.environ.get('SDWAN_TRACE_FILE'):
+    configure()
+
+def load_spans(paths):
+    """Read spans from trace files, skipping unreadable lines"""
+    spans = []
+    for path in paths:
+        try:
+            with open(path, 'r') as f:
+                for line in f:
+                    try:
+                        spans.append(json.loads(line))
+                    except ValueError:
+                        continue
+        except OSError:
+            continue
+    return spans
+
+def latest_run(spans):
+    """Keep the spans of the run that recorded the most recent span"""
+    if not spans:
+        return []
+    run = max(spans, key=lambda s: s['start'] + s['duration']).get('run')
+    return [s for s in spans if s.get('run') == run]
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(int(-(-pct * len(sorted_values) // 100)), 1)
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+def is_error(span):
+    """Return True for spans that did not succeed"""
+    status = span.get('status')
+    if span.get('kind') == 'sastre':
+        return status != 0
+    return status == 'error' or (isinstance(status, int) and (status < 0 or status >= 400))
+
+def critical_path(spans):
+    """Walk back from the last span to finish, always to the latest span that ended before it started"""
+    phases = [s for s in spans if s.get('kind') in PHASE_KINDS]
+    candidates = sorted(phases or spans, key=lambda s: s['start'] + s['duration'])
+    if not candidates:
+        return []
+    ends = [s['start'] + s['duration'] for s in candidates]
+
+    path = [candidates[-1]]
+    current = candidates[-1]
+    position = len(candidates) - 1
+    while True:
+        # Latest finishing span that ended at or before the current span started
+        low, high = 0, position
+        while low < high:
+            middle = (low + high) // 2
+            if ends[middle] <= current['start'] + 1e-6:
+                low = middle + 1
+            else:
+                high = middle
+        if low == 0:
+            break
+        position = low - 1
+        current = candidates[position]
+        path.append(current)
+    return list(reversed(path))
+
+def summarize(spans, top=5):
+    """Per-endpoint latency percentiles, slowest devices and the critical path"""
+    if not spans:
+        return None
+    first_start = min(s['start'] for s in spans)
+    last_end = max(s['start'] + s['duration'] for s in spans)
+
+    groups = {}
+    devices = {}
+    for span in spans:
+        key = f"{span['kind']} {span['endpoint']}"
+        group = groups.setdefault(key, {'durations': [], 'bytes': 0, 'errors': 0})
+        group['durations'].append(span['duration'])
+        group['bytes'] += span.get('bytes') or 0
+        group['errors'] += 1 if is_error(span) else 0
+        if span.get('device') and span['kind'] == 'api':
+            device = devices.setdefault(span['device'], {'requests': 0, 'total': 0.0, 'max': 0.0})
+            device['requests'] += 1
+            device['total'] += span['duration']
+            device['max'] = max(device['max'], span['duration'])
+
+    endpoints = {}
+    for key, group in groups.items():
+        durations = sorted(group['durations'])
+        endpoints[key] = {
+            'count': len(durations),
+            'p50': percentile(durations, 50),
+            'p95': percentile(durations, 95),
+            'p99': percentile(durations, 99),
+            'max': durations[-1],
+            'total': round(sum(durations), 3),
+            'bytes': group['bytes'],
+            'errors': group['errors']
+        }
+
+    path = critical_path(spans)
+    return {
+        'spans': len(spans),
+        'wall_seconds': round(last_end - first_start, 3),
+        'endpoints': endpoints,
+        'slowest_devices': [
+            dict(device=name, total=round(stats['total'], 3), max=round(stats['max'], 3), requests=stats['requests'])
+            for name, stats in sorted(devices.items(), key=lambda item: item[1]['total'], reverse=True)[:top]
+        ],
+        'critical_path': {
+            'seconds': round(sum(s['duration'] for s in path), 3),
+            'spans': [{'kind': s['kind'], 'endpoint': s['endpoint'], 'device': s.get('device'),
+                       'duration': s['duration']} for s in path]
+        }
+    }
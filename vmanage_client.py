@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+SD-WAN vManage Session Client
+=============================
+
+Shared client for the vManage REST API used by the pre/post-check scripts
+and, through the vmanage_api lookup plugin, by the playbooks. It:
+- Logs in once via j_security_check
+- Fetches the CSRF token from /dataservice/client/token once
+- Reuses a keep-alive connection pool for every endpoint
+- Serves repeated inventory GETs from the shared response cache
+- Paces requests per host with the adaptive rate limiter
+- Records a trace span per request when tracing is enabled
+
+Author: SD-WAN Automation Team
+Version: 1.0
+"""
+
+import os
+import sys
+import json
+import argparse
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import InsecureRequestWarning
+from response_cache import ResponseCache
+from rate_limiter import THROTTLE_STATUS, limiter_for, parse_retry_after
+from tracing import get_tracer
+
+# Suppress SSL warnings for internal certificates
+requests.packages.urllib3.disable_warnings(InsecureRequestWarning)
+
+class VManageError(Exception):
+    """Raised when the vManage API cannot be used"""
+
+class VManageAuthError(VManageError):
+    """Raised when vManage rejects the supplied credentials"""
+
+class VManageClient:
+    """Pooled, session-authenticated vManage API client"""
+
+    def __init__(self, host, username, password, port=443, verify=False,
+                 timeout=30, pool_size=20, cache=None, limiter=None, throttle_retries=2):
+        self.host = host
+        self.port = int(port)
+        self.username = username
+        self.password = password
+        self.verify = verify
+        self.timeout = timeout
+        self.cache = cache
+        self.base_url = f"https://{host}:{self.port}"
+        # Clients of the same host share one limiter unless one is passed in
+        self.limiter = limiter if limiter is not None else limiter_for(self.base_url)
+        self.throttle_retries = throttle_retries
+        self.token = None
+        self.logged_in = False
+        self._login_lock = threading.Lock()
+
+        self.session = requests.Session()
+        # Passed on every request as well: REQUESTS_CA_BUNDLE would otherwise override session.verify
+        self.session.verify = verify
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({'Content-Type': 'application/json'})
+
+    @classmethod
+    def from_env(cls, **kwargs):
+        """Build a client from the VMANAGE_* environment variables"""
+        host = os.environ.get('VMANAGE_HOST')
+        username = os.environ.get('VMANAGE_USERNAME')
+        password = os.environ.get('VMANAGE_PASSWORD')
+        if not all([host, username, password]):
+            raise VManageError("VMANAGE_HOST, VMANAGE_USERNAME and VMANAGE_PASSWORD must be set")
+        kwargs.setdefault('cache', ResponseCache.from_env())
+        return cls(host, username, password,
+                   port=os.environ.get('VMANAGE_PORT', '443'), **kwargs)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def url(self, path):
+        """Return the absolute URL for an API path"""
+        if path.startswith('http://') or path.startswith('https://'):
+            return path
+        if not path.startswith('/'):
+            path = '/' + path
+        return self.base_url + path
+
+    def login(self):
+        """Authenticate once and store the session cookie and CSRF token"""
+        response = self.session.post(
+            self.url('/j_security_check'),
+            data={'j_username': self.username, 'j_password': self.password},
+            headers={'Content-Type': 'application/x-www-form-urlencoded'},
+            timeout=self.timeout, verify=self.verify,
+            allow_redirects=False
+        )
+
+        # vManage answers a bad login with the HTML login page instead of an error code
+        if response.status_code >= 400 or b'<html' in response.content.lower():
+            raise VManageAuthError(f"Login to {self.host} failed (HTTP {response.status_code})")
+
+        token_response = self.session.get(self.url('/dataservice/client/token'), timeout=self.timeout,
+                                         verify=self.verify)
+        if token_response.status_code == 200 and token_response.text:
+            self.token = token_response.text.strip()
+            self.session.headers['X-XSRF-TOKEN'] = self.token
+
+        self.logged_in = True
+        return self.token
+
+    def ensure_login(self, token=None, force=False):
+        """Log in unless another thread already did (or already refreshed a stale token)"""
+        with self._login_lock:
+            if self.logged_in and not (force and self.token == token):
+                return
+            self.logged_in = False
+            self.login()
+
+    def logout(self):
+        """End the vManage session"""
+        if not self.logged_in:
+            return
+        try:
+            self.session.get(self.url('/logout'), timeout=self.timeout, verify=self.verify,
+                             allow_redirects=False)
+        except requests.exceptions.RequestException:
+            pass
+        self.logged_in = False
+        self.token = None
+        self.session.headers.pop('X-XSRF-TOKEN', None)
+
+    def close(self):
+        """Log out and release pooled connections"""
+        self.logout()
+        self.session.close()
+
+    def traced_request(self, method, path, params=None, timeout=None, stream=False, **kwargs):
+        """Send one request and record its trace span"""
+        endpoint = f"{method} {path.split('?', 1)[0]}"
+        with get_tracer().span('api', endpoint, device=(params or {}).get('deviceId')) as span:
+            response = self.session.request(
+                method, self.url(path), params=params,
+                timeout=timeout or self.timeout, stream=stream, verify=self.verify, **kwargs
+            )
+            span['status'] = response.status_code
+            # A streamed body is read later by the caller, so only the header knows its size
+            length = response.headers.get('Content-Length', '')
+            span['bytes'] = int(length) if length.isdigit() else (None if stream else len(response.content))
+        return response
+
+    def send(self, method, path, params=None, timeout=None, stream=False, **kwargs):
+        """Send one request through the host's rate limiter"""
+        if self.limiter is None:
+            return self.traced_request(method, path, params=params, timeout=timeout, stream=stream, **kwargs)
+        with self.limiter.slot(endpoint=path) as ticket:
+            response = self.traced_request(method, path, params=params, timeout=timeout, stream=stream, **kwargs)
+            ticket['status'] = response.status_code
+            ticket['latency'] = response.elapsed.total_seconds()
+            ticket['retry_after'] = parse_retry_after(response.headers.get('Retry-After'))
+        return response
+
+    def request(self, method, path, params=None, timeout=None, stream=False, **kwargs):
+        """Send a request over the shared session, logging in when needed"""
+        self.ensure_login()
+
+        # Throttled requests are retried after the limiter has backed off
+        retries = self.throttle_retries if self.limiter is not None else 0
+        for attempt in range(retries + 1):
+            response = self.send(method, path, params=params, timeout=timeout, stream=stream, **kwargs)
+
+            # Expired sessions come back as 401/403 or the HTML login page; re-login once
+            if response.status_code in (401, 403) or self._is_login_page(response):
+                response.close()
+                self.ensure_login(token=self.token, force=True)
+                response = self.send(method, path, params=params, timeout=timeout, stream=stream, **kwargs)
+
+            if response.status_code not in THROTTLE_STATUS or attempt == retries:
+                return response
+            response.close()
+
+    def get(self, path, params=None, timeout=None, stream=False):
+        """GET an API path and return the raw response"""
+        return self.request('GET', path, params=params, timeout=timeout, stream=stream)
+
+    def get_json(self, path, params=None, timeout=None):
+        """GET an API path and return the decoded JSON body"""
+        if self.cache_key(path, params):
+            result = self.fetch(path, params=params, timeout=timeout)
+            if result['status'] != 200 or 'json' not in result:
+                raise VManageError(f"GET {path} returned HTTP {result['status']}")
+            return result['json']
+
+        response = self.get(path, params=params, timeout=timeout)
+        if response.status_code != 200:
+            raise VManageError(f"GET {path} returned HTTP {response.status_code}")
+        return response.json()
+
+    def cache_key(self, path, params=None):
+        """Return (key, ttl) when the response cache applies to a path, else None"""
+        if self.cache is None:
+            return None
+        ttl = self.cache.ttl_for(path)
+        if not ttl:
+            return None
+        return self.cache.key(self.base_url, self.username, path, params), ttl
+
+    def fetch(self, path, params=None, timeout=None, raise_errors=False):
+        """GET an API path and return a uri-module style result dict"""
+        # A cache hit is served without logging in, so it says nothing about the credentials;
+        # callers that must verify them (pre_check) build the client with bypass=True or no cache
+        cached = self.cache_key(path, params)
+        if cached:
+            result = self.cache.get(*cached)
+            if result is not None:
+                return dict(result, cached=True)
+
+        result = {'url': self.url(path), 'status': -1, 'msg': '', 'elapsed': 0}
+        try:
+            response = self.get(path, params=params, timeout=timeout)
+            result['url'] = response.url
+            result['status'] = response.status_code
+            result['elapsed'] = round(response.elapsed.total_seconds(), 3)
+            result['msg'] = f"OK ({len(response.content)} bytes)" if response.ok else response.reason
+            try:
+                result['json'] = response.json()
+            except ValueError:
+                result['content'] = response.text
+        except VManageAuthError:
+            # Bad credentials fail every path the same way; callers report them once, not per path
+            raise
+        except VManageError as e:
+            if raise_errors:
+                raise
+            result['msg'] = str(e)
+        except requests.exceptions.RequestException as e:
+            if raise_errors:
+                raise
+            result['msg'] = f"Request failed: {str(e)}"
+
+        if cached and result['status'] == 200:
+            self.cache.put(cached[0], path, result)
+        return result
+
+    def fetch_all(self, paths, timeout=None):
+        """Fetch several API paths over the same session"""
+        return [self.fetch(path, timeout=timeout) for path in paths]
+
+    @staticmethod
+    def _is_login_page(response):
+        content_type = response.headers.get('Content-Type', '')
+        return 'text/html' in content_type and 'j_security_check' in response.text
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='SD-WAN vManage API Client')
+    parser.add_argument('paths', nargs='+',
+                       help='API paths to GET, e.g. /dataservice/device')
+    parser.add_argument('--timeout', '-t', type=int, default=30,
+                       help='Per-request timeout in seconds (default: 30)')
+    parser.add_argument('--no-cache', action='store_true',
+                       help='Bypass the response cache for reads (still refreshes it)')
+
+    try:
+        args = parser.parse_args()
+
+        cache = ResponseCache.from_env(bypass=True) if args.no_cache else ResponseCache.from_env()
+        with VManageClient.from_env(timeout=args.timeout, cache=cache) as client:
+            results = client.fetch_all(args.paths)
+        print(json.dumps(results, indent=2))
+        sys.exit(0 if all(r['status'] == 200 for r in results) else 1)
+
+    except KeyboardInterrupt:
+        sys.exit(1)
+    except VManageError as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()